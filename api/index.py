@@ -1,17 +1,28 @@
-from typing import List
+import base64
+import json
+import threading
+from typing import Iterator, List, Literal, Optional
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy import Column, Integer, String, create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 DATABASE_URL = "sqlite:///./lms.db"
-
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = 1000
+STREAM_BATCH_SIZE = 500
+# Bump whenever the models below change shape; stored in SQLite's ``user_version``.
+SCHEMA_VERSION = 1
+
+# Every cold start of the serverless function imports this module, so the
+# engine is created, and the schema checked, on the first request instead.
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
 
 
@@ -35,19 +46,45 @@ class CourseRead(CourseCreate):
         orm_mode = True
 
 
-def create_db_tables() -> None:
-    Base.metadata.create_all(bind=engine)
+def create_db_tables(engine: Engine) -> None:
+    """Create the schema unless the database already records ``SCHEMA_VERSION``.
+
+    Reading ``PRAGMA user_version`` is one statement; ``create_all`` would
+    inspect every table on every cold start.
+    """
+    with engine.begin() as connection:
+        if connection.execute(text("PRAGMA user_version")).scalar() == SCHEMA_VERSION:
+            return
+        Base.metadata.create_all(bind=connection)
+        connection.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        # Sync endpoints run on a thread pool, so two first requests can race here.
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+                create_db_tables(engine)
+                SessionLocal.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def open_session() -> Session:
+    get_engine()
+    return SessionLocal()
 
 
 def get_db() -> Session:
-    db = SessionLocal()
+    db = open_session()
     try:
         yield db
     finally:
         db.close()
 
 
-create_db_tables()
 app = FastAPI(title="LMS Backend", version="1.0.0")
 
 
@@ -56,9 +93,66 @@ def healthcheck() -> dict:
     return {"status": "ok"}
 
 
+def encode_cursor(course_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": course_id}).encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["id"])
+    except (ValueError, TypeError, KeyError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def courses_after(db: Session, after: Optional[int], limit: int) -> List[Course]:
+    # Keyset on the integer primary key: ids are assigned in insertion order,
+    # and the primary key index serves both the filter and the ordering.
+    query = db.query(Course)
+    if after is not None:
+        query = query.filter(Course.id > after)
+    return query.order_by(Course.id).limit(limit).all()
+
+
+def stream_courses(after: Optional[int], limit: Optional[int]) -> Iterator[bytes]:
+    # Runs after the request's session is closed, so it opens its own and
+    # reads in keyset batches to keep memory flat however many rows remain.
+    db = open_session()
+    try:
+        while limit is None or limit > 0:
+            size = STREAM_BATCH_SIZE if limit is None else min(STREAM_BATCH_SIZE, limit)
+            batch = courses_after(db, after, size)
+            if not batch:
+                return
+            yield "".join(json.dumps(CourseRead.from_orm(course).dict(), separators=(",", ":")) + "\n" for course in batch).encode()
+            if len(batch) < size:
+                return
+            after = batch[-1].id
+            if limit is not None:
+                limit -= len(batch)
+    finally:
+        db.close()
+
+
 @app.get("/courses", response_model=List[CourseRead], tags=["courses"])
-def list_courses(db: Session = Depends(get_db)):
-    return db.query(Course).all()
+def list_courses(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX, description=f"Rows per page (default {PAGE_SIZE_DEFAULT})"),
+    format: Optional[Literal["json", "ndjson"]] = Query(None, description="`ndjson` streams every remaining course"),
+    db: Session = Depends(get_db),
+):
+    after = decode_cursor(cursor) if cursor else None
+    if format == "ndjson" or (format is None and "application/x-ndjson" in request.headers.get("accept", "")):
+        return StreamingResponse(stream_courses(after, limit), media_type="application/x-ndjson")
+
+    limit = limit or PAGE_SIZE_DEFAULT
+    courses = courses_after(db, after, limit + 1)
+    response = JSONResponse([CourseRead.from_orm(course).dict() for course in courses[:limit]])
+    if len(courses) > limit:
+        next_cursor = encode_cursor(courses[limit - 1].id)
+        response.headers["x-next-cursor"] = next_cursor
+        response.headers["link"] = f'<{request.url.include_query_params(cursor=next_cursor, limit=limit)}>; rel="next"'
+    return response
 
 
 @app.post("/courses", response_model=CourseRead, status_code=201, tags=["courses"])
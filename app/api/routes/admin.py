@@ -1,41 +1,122 @@
 from __future__ import annotations
 
-from typing import List
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
-from ....database import DB
-from ....dependencies import require_admin
-from ....schemas import AccessToggleRequest, AdminUserSummary, PermissionUpdate, Profile
+from ...database import DB, run_db
+from ...dependencies import require_admin
+from ...pagination import PageParams, paginate
+from ...profiling import PROFILER
+from ...responses import row_encoder
+from ...schemas import (
+    AccessToggleRequest,
+    AccountTotals,
+    AdminStats,
+    AdminUserSummary,
+    CaseTotals,
+    PermissionUpdate,
+    Profile,
+    ProfilingConfig,
+    ProfilingStatus,
+    StatusTotals,
+)
+from ...services.permissions import set_user_permissions
+from ...services.principals import PRINCIPALS
+from ...services.storage import collect_garbage
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
 @router.get("/users", response_model=List[AdminUserSummary])
-async def list_users(admin=Depends(require_admin)) -> List[AdminUserSummary]:
-    summaries: List[AdminUserSummary] = []
-    for user_id, profile in DB.profiles.items():
-        permissions = DB.permissions.get(user_id, [])
-        summaries.append(
-            AdminUserSummary(
-                profile=Profile(**profile),
-                permissions=permissions,
-                last_sign_in=None,
-            )
+async def list_users(page: PageParams = Depends(), admin=Depends(require_admin)) -> Response:
+    encode_profile = row_encoder(Profile)
+
+    def summary(profile: Dict[str, Any]) -> Dict[str, Any]:
+        return {"profile": encode_profile(profile), "permissions": DB.permissions.get(profile["user_id"], []), "last_sign_in": None}
+
+    return await run_db(paginate, page, lambda after, limit: DB.page_by(DB.profiles, None, None, after, limit), summary, key="user_id")
+
+
+def _case_totals(summary: Dict[Any, Tuple[int, float]]) -> CaseTotals:
+    return CaseTotals(
+        count=sum(count for count, _ in summary.values()),
+        amount=sum(amount for _, amount in summary.values()),
+        by_status={status: StatusTotals(count=count, amount=amount) for status, (count, amount) in summary.items()},
+    )
+
+
+@router.get("/stats", response_model=AdminStats)
+async def stats(
+    user_id: Optional[str] = Query(None, description="Restrict dispute and litigation totals to one user"),
+    admin=Depends(require_admin),
+) -> AdminStats:
+    def totals() -> AdminStats:
+        accounts = DB.account_totals()
+        return AdminStats(
+            user_id=user_id,
+            disputes=_case_totals(DB.status_totals(DB.disputes, user_id)),
+            litigation_cases=_case_totals(DB.status_totals(DB.litigation_cases, user_id)),
+            accounts=AccountTotals(
+                total=sum(accounts.values()), enabled=accounts.get(True, 0), disabled=accounts.get(False, 0)
+            ),
         )
-    return summaries
+
+    return await run_db(totals)
 
 
 @router.post("/permissions")
 async def update_permissions(payload: PermissionUpdate, admin=Depends(require_admin)):
-    DB.permissions[payload.user_id] = payload.permissions
+    await run_db(set_user_permissions, payload.user_id, payload.permissions)
 
 
 @router.post("/access")
 async def toggle_access(payload: AccessToggleRequest, admin=Depends(require_admin)):
-    profile = DB.profiles.get(payload.user_id)
-    if profile:
-        profile["is_enabled"] = payload.is_enabled
-    user = DB.users.get(payload.user_id)
-    if user:
-        user["is_enabled"] = payload.is_enabled
+    await run_db(DB.set_user_enabled, payload.user_id, payload.is_enabled)
+
+
+@router.get("/auth-cache")
+async def auth_cache_stats(admin=Depends(require_admin)) -> Dict[str, Any]:
+    return PRINCIPALS.stats()
+
+
+@router.post("/storage/gc")
+async def storage_gc(admin=Depends(require_admin)) -> Dict[str, int]:
+    return await collect_garbage()
+
+
+@router.get("/profiles", response_model=ProfilingStatus)
+async def list_profiles(admin=Depends(require_admin)) -> ProfilingStatus:
+    return ProfilingStatus(
+        config=PROFILER.settings, active=PROFILER.active, skipped_busy=PROFILER.skipped_busy, profiles=PROFILER.summaries()
+    )
+
+
+@router.put("/profiles/config", response_model=ProfilingConfig)
+async def configure_profiling(payload: ProfilingConfig, admin=Depends(require_admin)) -> ProfilingConfig:
+    PROFILER.configure(payload)
+    return PROFILER.settings
+
+
+@router.get("/profiles/{profile_id}", response_class=Response)
+async def download_profile(
+    profile_id: int,
+    format: Literal["raw", "text"] = Query("raw", description="cProfile only: `raw` .pstats file or `text` report"),
+    admin=Depends(require_admin),
+) -> Response:
+    result = PROFILER.get(profile_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if result.summary.mode == "sampling":
+        body, media_type, filename = result.collapsed(), "text/plain", f"profile-{profile_id}.folded"
+    elif format == "text":
+        body, media_type, filename = result.pstats_text(), "text/plain", f"profile-{profile_id}.txt"
+    else:
+        body, media_type, filename = result.pstats_bytes(), "application/octet-stream", f"profile-{profile_id}.pstats"
+    return Response(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@router.delete("/profiles", status_code=204)
+async def clear_profiles(admin=Depends(require_admin)) -> Response:
+    PROFILER.clear()
+    return Response(status_code=204)
@@ -2,68 +2,99 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Tuple
 
 from fastapi import APIRouter, Depends, HTTPException
 
-from ....database import DB
-from ....dependencies import get_current_session
-from ....schemas import (
+from ...database import DB, run_db
+from ...dependencies import get_current_session
+from ...schemas import (
     AuthRefreshRequest,
     AuthSignInRequest,
     AuthSignUpRequest,
     TokenPair,
 )
-from ....services.auth import issue_session
-from ....config import get_settings
+from ...services.auth import issue_session
+from ...services.passwords import PasswordHasherBusy, hash_password, verify_password
+from ...services.permissions import set_user_permissions
+from ...config import get_settings
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+async def _hash_or_busy(password: str) -> str:
+    try:
+        return await hash_password(password)
+    except PasswordHasherBusy as exc:
+        raise HTTPException(status_code=503, detail="Too many sign-in attempts, retry shortly", headers={"Retry-After": "1"}) from exc
+
+
 @router.post("/sign-up", response_model=TokenPair)
 async def sign_up(payload: AuthSignUpRequest) -> TokenPair:
-    if DB.get_user_by_email(payload.email):
+    if await run_db(DB.get_user_by_email, payload.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    user = DB.create_user(payload.email, payload.full_name, payload.password)
+    password_hash = await _hash_or_busy(payload.password)
+    try:
+        user = await run_db(DB.create_user, payload.email, payload.full_name, password_hash)
+    except ValueError as exc:
+        # Another sign-up for the same email finished while this one was hashing.
+        raise HTTPException(status_code=400, detail="Email already registered") from exc
     settings = get_settings()
     if payload.email == settings.default_admin_email:
-        DB.permissions[user["id"]] = [
+        await run_db(set_user_permissions, user["id"], [
             "disputes.create",
             "disputes.update",
             "disputes.delete",
             "litigation.create",
             "litigation.delete",
             "admin.manage",
-        ]
+        ])
     access, refresh, access_exp, refresh_exp = issue_session(user["id"])
-    DB.create_session(user["id"], access, access_exp, refresh, refresh_exp)
+    await run_db(DB.create_session, user["id"], access, access_exp, refresh, refresh_exp)
     return TokenPair(access_token=access, refresh_token=refresh, expires_in=int((access_exp - datetime.utcnow()).total_seconds()))
 
 
 @router.post("/sign-in", response_model=TokenPair)
 async def sign_in(payload: AuthSignInRequest) -> TokenPair:
-    user = DB.get_user_by_email(payload.email)
-    if not user or user["password"] != payload.password:
+    user = await run_db(DB.get_user_by_email, payload.email)
+    try:
+        matches, needs_rehash = await verify_password(user["password"] if user else None, payload.password)
+    except PasswordHasherBusy as exc:
+        raise HTTPException(status_code=503, detail="Too many sign-in attempts, retry shortly", headers={"Retry-After": "1"}) from exc
+    if not user or not matches:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if needs_rehash:
+        user = await run_db(DB.update, DB.users, user["id"], {"password": await _hash_or_busy(payload.password)}) or user
     if not user.get("is_enabled"):
         raise HTTPException(status_code=403, detail="Account disabled")
 
     access, refresh, access_exp, refresh_exp = issue_session(user["id"])
-    DB.create_session(user["id"], access, access_exp, refresh, refresh_exp)
+    await run_db(DB.create_session, user["id"], access, access_exp, refresh, refresh_exp)
     return TokenPair(access_token=access, refresh_token=refresh, expires_in=int((access_exp - datetime.utcnow()).total_seconds()))
 
 
 @router.post("/refresh", response_model=TokenPair)
 async def refresh(payload: AuthRefreshRequest) -> TokenPair:
-    session = DB.get_session(payload.refresh_token)
-    if not session or session["refresh_expires_at"] < datetime.utcnow():
-        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    def rotate() -> Tuple[str, str, datetime, datetime]:
+        session = DB.get_session(payload.refresh_token)
+        if not session or session["refresh_expires_at"] < datetime.utcnow():
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+        DB.revoke_session(payload.refresh_token)
+        access, refresh, access_exp, refresh_exp = issue_session(session["user_id"])
+        DB.create_session(session["user_id"], access, access_exp, refresh, refresh_exp)
+        return access, refresh, access_exp, refresh_exp
 
-    access, refresh, access_exp, refresh_exp = issue_session(session["user_id"])
-    DB.create_session(session["user_id"], access, access_exp, refresh, refresh_exp)
+    access, refresh, access_exp, refresh_exp = await run_db(rotate)
     return TokenPair(access_token=access, refresh_token=refresh, expires_in=int((access_exp - datetime.utcnow()).total_seconds()))
 
 
 @router.post("/sign-out")
 async def sign_out(session=Depends(get_current_session)) -> None:
-    DB.revoke_session(session["access_token"])
+    await run_db(DB.revoke_session, session["access_token"])
+
+
+@router.post("/sign-out-all")
+async def sign_out_everywhere(session=Depends(get_current_session)) -> None:
+    await run_db(DB.revoke_user_sessions, session["user_id"])
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+
+from ...config import get_settings
+from ...dependencies import get_current_principal, get_current_user
+from ...schemas import BatchRequest, BatchResponse
+from ...services.batch import dispatch
+from ...services.principals import CachedPrincipal
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(
+    payload: BatchRequest,
+    request: Request,
+    principal: CachedPrincipal = Depends(get_current_principal),
+    user=Depends(get_current_user),
+) -> Response:
+    """Run several API calls in one round trip, authenticated once.
+
+    Sub-requests run concurrently, so one must not depend on another's
+    writes. ``responses`` follow the order of ``requests``, each with its own
+    status: a failing sub-request does not fail the batch. ``/events`` and
+    ``/batch`` cannot be called from a batch.
+
+    Sub-requests go straight to the router and skip the middleware stack:
+    they are counted in the request metrics, but not profiled, and any
+    policy enforced by middleware applies to the batch request only.
+    """
+    limit = get_settings().batch_max_requests
+    if len(payload.requests) > limit:
+        raise HTTPException(status_code=413, detail=f"A batch holds at most {limit} requests")
+    return Response(await dispatch(request, payload.requests, principal), media_type="application/json")
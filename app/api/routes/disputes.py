@@ -1,28 +1,46 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
 
-from ....database import DB
-from ....dependencies import get_current_user, require_permissions
-from ....schemas import Dispute, DisputeCreate, DisputeUpdate, DocumentUploadResponse
-from ....services.notifications import notify_dispute_created
-from ....services.storage import save_files
+from ...conditional import etag, if_match_version, validators
+from ...database import DB, run_db
+from ...dependencies import get_current_user, require_permissions
+from ...pagination import SINCE_DESCRIPTION, PageParams, delta, paginate
+from ...responses import row_encoder
+from ...schemas import Dispute, DisputeCreate, DisputeUpdate, DocumentUploadResponse
+from ...services.notifications import notify_dispute_created
+from ...services.storage import release_documents, save_files
 
 router = APIRouter(prefix="/disputes", tags=["disputes"])
 
 
 @router.get("", response_model=List[Dispute])
-async def list_disputes(user=Depends(get_current_user)) -> List[Dispute]:
-    rows = [record for record in DB.disputes.values() if record["user_id"] == user["id"]]
-    return [Dispute(**row) for row in rows]
+async def list_disputes(
+    page: PageParams = Depends(),
+    since: Optional[str] = Query(None, description=SINCE_DESCRIPTION),
+    user=Depends(get_current_user),
+) -> Response:
+    def respond() -> Response:
+        if since is not None:
+            return delta(page, lambda limit: DB.changes_since(DB.disputes, user["id"], since, limit), row_encoder(Dispute))
+        return paginate(
+            page,
+            lambda after, limit: DB.page_by(DB.disputes, "user_id", user["id"], after, limit),
+            row_encoder(Dispute),
+            etag=etag(DB.collection_version(DB.disputes, user["id"])),
+            sync_cursor=DB.sync_cursor(DB.disputes),
+        )
+
+    return await run_db(respond)
 
 
 @router.post("", response_model=Dispute)
 async def create_dispute(payload: DisputeCreate, user=Depends(require_permissions(["disputes.create"]))):
-    record = DB.insert(
+    record = await run_db(
+        DB.insert,
         DB.disputes,
         {
             "user_id": user["id"],
@@ -38,20 +56,35 @@ async def create_dispute(payload: DisputeCreate, user=Depends(require_permission
 
 
 @router.put("/{dispute_id}", response_model=Dispute)
-async def update_dispute(dispute_id: str, payload: DisputeUpdate, user=Depends(require_permissions(["disputes.update"]))):
-    record = DB.disputes.get(dispute_id)
-    if not record or record["user_id"] != user["id"]:
-        raise HTTPException(status_code=404, detail="Dispute not found")
-    record.update({k: v for k, v in payload.dict(exclude_unset=True).items()})
+async def update_dispute(
+    dispute_id: str,
+    payload: DisputeUpdate,
+    request: Request,
+    response: Response,
+    user=Depends(require_permissions(["disputes.update"])),
+):
+    def update() -> Dict[str, Any]:
+        record = DB.disputes.get(dispute_id)
+        if not record or record["user_id"] != user["id"]:
+            raise HTTPException(status_code=404, detail="Dispute not found")
+        expected = if_match_version(request, record["version"])
+        return DB.update(DB.disputes, dispute_id, payload.dict(exclude_unset=True), expected)
+
+    record = await run_db(update)
+    response.headers.update(validators(etag(record["version"])))
     return Dispute(**record)
 
 
 @router.delete("/{dispute_id}")
-async def delete_dispute(dispute_id: str, user=Depends(require_permissions(["disputes.delete"]))):
-    record = DB.disputes.get(dispute_id)
-    if not record or record["user_id"] != user["id"]:
-        raise HTTPException(status_code=404, detail="Dispute not found")
-    DB.delete(DB.disputes, dispute_id)
+async def delete_dispute(dispute_id: str, request: Request, user=Depends(require_permissions(["disputes.delete"]))):
+    def delete() -> None:
+        record = DB.disputes.get(dispute_id)
+        if not record or record["user_id"] != user["id"]:
+            raise HTTPException(status_code=404, detail="Dispute not found")
+        DB.delete(DB.disputes, dispute_id, if_match_version(request, record["version"]))
+        release_documents(record.get("documents", []))
+
+    await run_db(delete)
 
 
 @router.post("/{dispute_id}/documents", response_model=DocumentUploadResponse)
@@ -60,10 +93,19 @@ async def upload_documents(
     files: List[UploadFile] = File(..., description="Up to 50 files (500MB each)"),
     user=Depends(get_current_user),
 ) -> DocumentUploadResponse:
-    record = DB.disputes.get(dispute_id)
+    record = await run_db(DB.disputes.get, dispute_id)
     if not record or record["user_id"] != user["id"]:
         raise HTTPException(status_code=404, detail="Dispute not found")
 
-    saved = save_files(user["id"], files)
-    record.setdefault("documents", []).extend([doc.dict() for doc in saved])
+    saved = await save_files(user["id"], files)
+
+    def attach() -> None:
+        # Re-read after the upload; the dispute may have changed while files were streaming.
+        record = DB.disputes.get(dispute_id)
+        if not record:
+            release_documents(doc.dict() for doc in saved)
+            raise HTTPException(status_code=404, detail="Dispute not found")
+        DB.update(DB.disputes, dispute_id, {"documents": [*record.get("documents", []), *(doc.dict() for doc in saved)]})
+
+    await run_db(attach)
     return DocumentUploadResponse(documents=saved)
@@ -0,0 +1,27 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header
+
+from ...dependencies import get_current_principal, get_current_user
+from ...services.changefeed import CHANGE_FEED, EventStreamResponse
+from ...services.principals import CachedPrincipal
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+# EventStreamResponse takes no status_code argument for OpenAPI to read a default from.
+@router.get("", response_class=EventStreamResponse, status_code=200)
+async def change_events(
+    last_event_id: Optional[str] = Header(None, description="Id of the last event received; missed events are replayed"),
+    principal: CachedPrincipal = Depends(get_current_principal),
+    user=Depends(get_current_user),
+) -> EventStreamResponse:
+    """Stream the caller's dispute and litigation case changes as server-sent events.
+
+    Each event is named ``<collection>.<op>`` with a JSON body holding the
+    changed ``rows``, the deleted ``ids``, or just a ``count`` for large
+    batches. A ``reset`` event means events were dropped: catch up with
+    ``?since=`` on the list endpoints.
+    """
+    subscriber = CHANGE_FEED.subscribe(user["id"], principal.expires_at, principal.version, last_event_id)
+    return EventStreamResponse(CHANGE_FEED, subscriber)
@@ -1,47 +1,95 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from ....database import DB
-from ....dependencies import get_current_user, require_permissions
-from ....schemas import LitigationBulkInsertRequest, LitigationCase
-from ....services.notifications import notify_litigation_uploaded
+from ...conditional import etag, if_match_version
+from ...database import DB, run_db
+from ...dependencies import get_current_user, require_permissions
+from ...pagination import SINCE_DESCRIPTION, PageParams, delta, paginate
+from ...responses import row_encoder
+from ...schemas import LitigationBulkInsertRequest, LitigationCase, LitigationImportSummary
+from ...services.ingest import IngestFormat, import_cases
+from ...services.notifications import notify_litigation_uploaded
 
 router = APIRouter(prefix="/litigation-cases", tags=["litigation"])
 
 
 @router.get("", response_model=List[LitigationCase])
-async def list_cases(user=Depends(get_current_user)) -> List[LitigationCase]:
-    rows = [record for record in DB.litigation_cases.values() if record["user_id"] == user["id"]]
-    return [LitigationCase(**row) for row in rows]
+async def list_cases(
+    page: PageParams = Depends(),
+    since: Optional[str] = Query(None, description=SINCE_DESCRIPTION),
+    user=Depends(get_current_user),
+) -> Response:
+    def respond() -> Response:
+        if since is not None:
+            return delta(page, lambda limit: DB.changes_since(DB.litigation_cases, user["id"], since, limit), row_encoder(LitigationCase))
+        return paginate(
+            page,
+            lambda after, limit: DB.page_by(DB.litigation_cases, "user_id", user["id"], after, limit),
+            row_encoder(LitigationCase),
+            etag=etag(DB.collection_version(DB.litigation_cases, user["id"])),
+            sync_cursor=DB.sync_cursor(DB.litigation_cases),
+        )
+
+    return await run_db(respond)
 
 
 @router.post("/bulk", response_model=List[LitigationCase])
 async def bulk_insert(payload: LitigationBulkInsertRequest, user=Depends(require_permissions(["litigation.create"]))):
-    created: List[LitigationCase] = []
-    for case in payload.cases:
-        record = DB.insert(
-            DB.litigation_cases,
+    created_at = datetime.utcnow()
+    records = await run_db(
+        DB.insert_many,
+        DB.litigation_cases,
+        (
             {
                 "user_id": user["id"],
                 "docket_number": case.docket_number,
                 "case_name": case.case_name,
                 "status": case.status,
                 "amount": case.amount,
-                "created_at": datetime.utcnow(),
+                "created_at": created_at,
+            }
+            for case in payload.cases
+        ),
+    )
+    notify_litigation_uploaded(user["id"], len(records))
+    return [LitigationCase(**record) for record in records]
+
+
+@router.post(
+    "/import",
+    response_model=LitigationImportSummary,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {"schema": {"type": "string", "description": "One LitigationCaseInsert JSON object per line"}},
+                "text/csv": {"schema": {"type": "string", "description": "Header row of LitigationCaseInsert fields, then one case per line"}},
             },
-        )
-        created.append(LitigationCase(**record))
-    notify_litigation_uploaded(user["id"], len(created))
-    return created
+        }
+    },
+)
+async def import_cases_stream(
+    request: Request,
+    format: Optional[IngestFormat] = Query(None, description="Body format; inferred from Content-Type when omitted"),
+    user=Depends(require_permissions(["litigation.create"])),
+) -> LitigationImportSummary:
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    summary = await import_cases(user["id"], request.stream(), fmt)
+    if summary.inserted:
+        notify_litigation_uploaded(user["id"], summary.inserted)
+    return summary
 
 
 @router.delete("/{case_id}")
-async def delete_case(case_id: str, user=Depends(require_permissions(["litigation.delete"]))):
-    record = DB.litigation_cases.get(case_id)
-    if not record or record["user_id"] != user["id"]:
-        raise HTTPException(status_code=404, detail="Case not found")
-    DB.delete(DB.litigation_cases, case_id)
+async def delete_case(case_id: str, request: Request, user=Depends(require_permissions(["litigation.delete"]))):
+    def delete() -> None:
+        record = DB.litigation_cases.get(case_id)
+        if not record or record["user_id"] != user["id"]:
+            raise HTTPException(status_code=404, detail="Case not found")
+        DB.delete(DB.litigation_cases, case_id, if_match_version(request, record["version"]))
+
+    await run_db(delete)
@@ -1,33 +1,50 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from typing import Any, Dict, Union
 
-from ....database import DB
-from ....dependencies import get_current_user
-from ....schemas import AlertSettings, AlertSettingsUpdate, Profile, ProfileUpdate
+from fastapi import APIRouter, Depends, Request, Response
+
+from ...conditional import conditional_get, etag, if_match_version, validators
+from ...database import DB, run_db
+from ...dependencies import get_current_user
+from ...schemas import AlertSettings, AlertSettingsUpdate, Profile, ProfileUpdate
 
 router = APIRouter(prefix="/me", tags=["profile"])
 
 
 @router.get("/profile", response_model=Profile)
-async def get_profile(user=Depends(get_current_user)) -> Profile:
-    return Profile(**DB.profiles[user["id"]])
+async def get_profile(request: Request, response: Response, user=Depends(get_current_user)) -> Union[Profile, Response]:
+    record = await run_db(DB.profiles.__getitem__, user["id"])
+    return conditional_get(request, response, etag(record["version"])) or Profile(**record)
 
 
 @router.put("/profile", response_model=Profile)
-async def update_profile(payload: ProfileUpdate, user=Depends(get_current_user)) -> Profile:
-    record = DB.profiles[user["id"]]
-    record.update({k: v for k, v in payload.dict(exclude_unset=True).items()})
+async def update_profile(
+    payload: ProfileUpdate, request: Request, response: Response, user=Depends(get_current_user)
+) -> Profile:
+    def update() -> Dict[str, Any]:
+        expected = if_match_version(request, DB.profiles[user["id"]]["version"])
+        return DB.update(DB.profiles, user["id"], payload.dict(exclude_unset=True), expected)
+
+    record = await run_db(update)
+    response.headers.update(validators(etag(record["version"])))
     return Profile(**record)
 
 
 @router.get("/alerts", response_model=AlertSettings)
-async def get_alert_settings(user=Depends(get_current_user)) -> AlertSettings:
-    return AlertSettings(**DB.alert_settings[user["id"]])
+async def get_alert_settings(request: Request, response: Response, user=Depends(get_current_user)) -> Union[AlertSettings, Response]:
+    record = await run_db(DB.alert_settings.__getitem__, user["id"])
+    return conditional_get(request, response, etag(record["version"])) or AlertSettings(**record)
 
 
 @router.put("/alerts", response_model=AlertSettings)
-async def update_alert_settings(payload: AlertSettingsUpdate, user=Depends(get_current_user)) -> AlertSettings:
-    record = DB.alert_settings[user["id"]]
-    record.update({k: v for k, v in payload.dict(exclude_unset=True).items()})
+async def update_alert_settings(
+    payload: AlertSettingsUpdate, request: Request, response: Response, user=Depends(get_current_user)
+) -> AlertSettings:
+    def update() -> Dict[str, Any]:
+        expected = if_match_version(request, DB.alert_settings[user["id"]]["version"])
+        return DB.update(DB.alert_settings, user["id"], payload.dict(exclude_unset=True), expected)
+
+    record = await run_db(update)
+    response.headers.update(validators(etag(record["version"])))
     return AlertSettings(**record)
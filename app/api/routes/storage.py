@@ -0,0 +1,31 @@
+"""Download endpoint for stored dispute documents."""
+from __future__ import annotations
+
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from ...database import run_db
+from ...dependencies import get_current_user
+from ...responses import RangedFileResponse
+from ...services.storage import find_document
+
+router = APIRouter(prefix="/storage", tags=["storage"])
+
+
+# RangedFileResponse has no default status code for OpenAPI to read, so it is declared here.
+# GET and HEAD are registered separately so each gets its own operationId.
+@router.get("/{user_id}/{filename}", response_class=RangedFileResponse, status_code=200)
+@router.head("/{user_id}/{filename}", response_class=RangedFileResponse, status_code=200)
+async def download_document(user_id: str, filename: str, request: Request, user=Depends(get_current_user)) -> RangedFileResponse:
+    found = await run_db(find_document, user_id, filename) if user["id"] == user_id else None
+    if found is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    path, document = found
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Document not found") from None
+    etag = f'"{document["storage_key"]}"' if document.get("storage_key") else None
+    return RangedFileResponse(path, request.headers, stat_result, etag=etag, filename=filename)
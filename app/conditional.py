@@ -0,0 +1,71 @@
+"""Strong ETags and conditional requests for versioned records.
+
+Single records are tagged with their ``version`` and collections with the
+owner's change stamp, both read without loading or serializing any rows, so
+``If-None-Match`` can be answered with a 304 before a model is built.
+``If-Match`` turns a PUT or DELETE into a compare-and-set on the record's
+version; :class:`~app.database.VersionConflict` from a write that lost a
+race is answered with 412 as well.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+
+from .config import get_settings
+from .database import VersionConflict
+
+
+def etag(value: object) -> str:
+    return f'"{value}"'
+
+
+def validators(tag: str) -> Dict[str, str]:
+    # Responses depend on the bearer token, so shared caches must not reuse them across users.
+    return {"ETag": tag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def _tags(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def not_modified(request: Request, tag: str) -> Optional[Response]:
+    """Return a 304 if ``If-None-Match`` already names ``tag`` (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    if header.strip() == "*" or tag in (candidate.removeprefix("W/") for candidate in _tags(header)):
+        return Response(status_code=304, headers=validators(tag))
+    return None
+
+
+def conditional_get(request: Request, response: Response, tag: str) -> Optional[Response]:
+    """Answer 304 if the client holds ``tag``; otherwise stamp ``response`` with it."""
+    cached = not_modified(request, tag)
+    if cached is None:
+        response.headers.update(validators(tag))
+    return cached
+
+
+def if_match_version(request: Request, version: int) -> Optional[int]:
+    """Return the version a write must still find, or ``None`` for an unconditional write.
+
+    ``If-Match`` uses the strong comparison, so weak tags never match. A
+    missing header is allowed unless ``REQUIRE_IF_MATCH`` is set.
+    """
+    header = request.headers.get("if-match")
+    if header is None:
+        if get_settings().require_if_match:
+            raise HTTPException(status_code=428, detail="If-Match header required")
+        return None
+    if header.strip() == "*":
+        return None
+    if etag(version) in _tags(header):
+        return version
+    raise HTTPException(status_code=412, detail="Record has been modified", headers={"ETag": etag(version)})
+
+
+async def version_conflict_handler(request: Request, exc: VersionConflict) -> JSONResponse:
+    return JSONResponse(status_code=412, content={"detail": "Record has been modified"})
@@ -1,15 +1,58 @@
 """Application settings and constants."""
+import os
 from functools import lru_cache
+from typing import Literal, Optional
+
 from pydantic import BaseSettings, EmailStr
 
 
 class Settings(BaseSettings):
     app_name: str = "LMS Python Backend"
     app_secret_key: str = "dev-secret"
+    lazy_startup: bool = False
     access_token_ttl_minutes: int = 60
     refresh_token_ttl_hours: int = 24
     default_admin_email: EmailStr = EmailStr("admin@example.com")
     storage_bucket: str = "./uploads"
+    database_backend: Literal["memory", "sql"] = "memory"
+    database_url: str = "sqlite:///./lms-app.db"
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout_seconds: float = 30.0
+    database_pool_recycle_seconds: int = 1800
+    persistence_dir: Optional[str] = None
+    persistence_fsync_interval_ms: int = 10
+    persistence_snapshot_wal_bytes: int = 64 * 1024 * 1024
+    persistence_sync_commit: bool = False
+    storage_chunk_bytes: int = 1024 * 1024
+    storage_upload_workers: int = 4
+    storage_mode: Literal["path", "content"] = "path"
+    principal_cache_size: int = 10_000
+    # Leave at least half the cores to the event loop while a login burst hashes.
+    password_hash_workers: int = max(1, (os.cpu_count() or 2) // 2)
+    password_hash_max_pending: int = 256
+    password_scrypt_n: int = 2**14
+    password_scrypt_r: int = 8
+    password_scrypt_p: int = 1
+    require_if_match: bool = False
+    page_size_default: int = 100
+    page_size_max: int = 1_000
+    stream_batch_size: int = 500
+    sync_retention_hours: int = 7 * 24
+    profile_ring_size: int = 32
+    ingest_batch_size: int = 1_000
+    ingest_max_reported_errors: int = 100
+    ingest_max_line_bytes: int = 1024 * 1024
+    notification_queue_size: int = 10_000
+    notification_workers: int = 4
+    notification_coalesce_seconds: float = 5.0
+    notification_max_attempts: int = 5
+    notification_retry_base_seconds: float = 0.5
+    notification_drain_seconds: float = 30.0
+    sse_heartbeat_seconds: float = 15.0
+    sse_buffer_events: int = 64
+    sse_replay_events: int = 10_000
+    batch_max_requests: int = 20
 
     class Config:
         env_file = ".env"
@@ -1,55 +1,601 @@
 """In-memory persistence to simulate a database."""
 from __future__ import annotations
 
-from collections import defaultdict
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, defaultdict, deque
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+import functools
+import heapq
+from itertools import chain, starmap
+from operator import itemgetter
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Type, TypeVar
 import uuid
 
+import anyio.to_thread
 from pydantic import EmailStr
 
+from .config import Settings, get_settings
+from .records import AlertSettingsRecord, DisputeRecord, LitigationCaseRecord, ProfileRecord, Record, UserRecord
+
+if TYPE_CHECKING:
+    from .persistence import Journal
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+class Index:
+    """Secondary index mapping a field value to the ids of the rows holding it.
+
+    Non-unique indexes keep ids in an insertion-ordered dict so lookups return
+    rows in the same order a full table scan would.
+    """
+
+    def __init__(self, field: str, unique: bool = False, key: Optional[Callable[[Any], Any]] = None) -> None:
+        self.field = field
+        self.unique = unique
+        self.key = key
+        self.entries: Dict[Any, Any] = {}
+
+    def _key(self, value: Any) -> Any:
+        return self.key(value) if self.key else value
+
+    def check(self, record: Dict[str, Any]) -> None:
+        if not self.unique or record.get(self.field) is None:
+            return
+        existing = self.entries.get(self._key(record[self.field]))
+        if existing is not None and existing != record["id"]:
+            raise ValueError(f"Duplicate value for unique field '{self.field}'")
+
+    def add(self, record: Dict[str, Any]) -> None:
+        value = record.get(self.field)
+        if value is None:
+            return
+        if self.unique:
+            self.entries[self._key(value)] = record["id"]
+        else:
+            self.entries.setdefault(self._key(value), {})[record["id"]] = None
+
+    def discard(self, record: Dict[str, Any]) -> None:
+        value = record.get(self.field)
+        if value is None:
+            return
+        key = self._key(value)
+        if self.unique:
+            if self.entries.get(key) == record["id"]:
+                del self.entries[key]
+            return
+        ids = self.entries.get(key)
+        if ids is not None:
+            ids.pop(record["id"], None)
+            if not ids:
+                del self.entries[key]
+
+    def add_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.add(record)
+
+    def lookup(self, value: Any) -> Iterable[str]:
+        found = self.entries.get(self._key(value))
+        if found is None:
+            return ()
+        return (found,) if self.unique else found
+
+
+class OrderedIndex(Index):
+    """Non-unique index whose groups are kept sorted by ``(created_at, key)``.
+
+    Each group is a sorted list of ``(created_at, key)`` tuples, so a keyset
+    page is one bisect past the cursor plus a slice: O(log n + limit) however
+    deep the cursor is. ``field=None`` keeps a single group covering the whole
+    table, for listings that are not scoped to an owner.
+    """
+
+    def __init__(self, field: Optional[str], key_field: str = "id", order_field: str = "created_at") -> None:
+        super().__init__(field)
+        self.key_field = key_field
+        self.order_field = order_field
+
+    def _group(self, record: Dict[str, Any]) -> Any:
+        return record.get(self.field) if self.field is not None else None
+
+    def sort_key(self, record: Dict[str, Any]) -> Tuple[datetime, str]:
+        return record.get(self.order_field) or datetime.min, record[self.key_field]
+
+    def add(self, record: Dict[str, Any]) -> None:
+        if self.field is not None and record.get(self.field) is None:
+            return
+        insort(self.entries.setdefault(self._group(record), []), self.sort_key(record))
+
+    def add_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        batches: Dict[Any, List[Tuple[datetime, str]]] = {}
+        for record in records:
+            if self.field is not None and record.get(self.field) is None:
+                continue
+            batches.setdefault(self._group(record), []).append(self.sort_key(record))
+        for group, new_keys in batches.items():
+            new_keys.sort()
+            keys = self.entries.setdefault(group, [])
+            if not keys or keys[-1] < new_keys[0]:
+                # The common case: a batch stamped after everything already stored.
+                keys.extend(new_keys)
+            else:
+                keys.extend(new_keys)
+                keys.sort()
+
+    def discard(self, record: Dict[str, Any]) -> None:
+        group = self._group(record)
+        keys = self.entries.get(group)
+        if keys is None:
+            return
+        sort_key = self.sort_key(record)
+        position = bisect_left(keys, sort_key)
+        if position < len(keys) and keys[position] == sort_key:
+            del keys[position]
+            if not keys:
+                del self.entries[group]
+
+    def lookup(self, value: Any) -> Iterable[str]:
+        return [key for _, key in self.entries.get(value, ())]
+
+    def page(self, value: Any, after: Optional[Tuple[datetime, str]], limit: int) -> List[str]:
+        """Return up to ``limit`` keys of group ``value`` sorting after ``after``."""
+        keys = self.entries.get(value, [])
+        start = bisect_right(keys, after) if after is not None else 0
+        return [key for _, key in keys[start : start + limit]]
+
+
+class Tally:
+    """Running row count and amount per ``group_field`` value, overall and per owner.
+
+    Maintained alongside the indexes on every insert, update and delete, so
+    reading the totals never touches the rows.
+    """
+
+    unique = False
+
+    def __init__(self, name: str, group_field: str, sum_field: Optional[str] = None, owner_field: Optional[str] = "user_id") -> None:
+        self.name = name
+        self.group_field = group_field
+        self.sum_field = sum_field
+        self.owner_field = owner_field
+        self.totals: Dict[Any, List[Any]] = {}
+        self.by_owner: Dict[Any, Dict[Any, List[Any]]] = {}
+
+    @staticmethod
+    def _bump(buckets: Dict[Any, List[Any]], group: Any, sign: int, amount: float) -> None:
+        bucket = buckets.setdefault(group, [0, 0.0])
+        bucket[0] += sign
+        bucket[1] += sign * amount
+        if bucket[0] <= 0:
+            # Dropping empty buckets also resets any float drift in the sum.
+            del buckets[group]
+
+    def _apply(self, record: Dict[str, Any], sign: int) -> None:
+        group = record.get(self.group_field)
+        amount = (record.get(self.sum_field) or 0.0) if self.sum_field else 0.0
+        self._bump(self.totals, group, sign, amount)
+        owner = record.get(self.owner_field) if self.owner_field else None
+        if owner is not None:
+            owned = self.by_owner.setdefault(owner, {})
+            self._bump(owned, group, sign, amount)
+            if not owned:
+                del self.by_owner[owner]
+
+    def check(self, record: Dict[str, Any]) -> None:
+        pass
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self._apply(record, 1)
+
+    def add_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self._apply(record, 1)
+
+    def discard(self, record: Dict[str, Any]) -> None:
+        self._apply(record, -1)
+
+    def summary(self, owner: Optional[Any] = None) -> Dict[Any, Tuple[int, float]]:
+        """Return ``{group: (count, amount)}``, for one owner when ``owner`` is given."""
+        buckets = self.totals if owner is None else self.by_owner.get(owner, {})
+        return {group: (count, amount) for group, (count, amount) in buckets.items()}
+
+
+class ChangesExpired(LookupError):
+    """Raised for a sync cursor older than what the change log still holds."""
+
+
+class ChangeSet(NamedTuple):
+    changed: List[Any]
+    deleted: List[str]
+    cursor: str
+    has_more: bool
+
+
+class ChangeLog:
+    """Per-owner log of the latest change to each row, ordered by a table-wide sequence.
+
+    Hooked in next to the indexes like a ``Tally``. Every insert, update and
+    delete takes the next sequence number and moves the row's entry to the
+    end of its owner's log, so the log holds one entry per changed row: the
+    sequence number, negated for a delete (a tombstone). Reading what changed
+    after a sequence number walks the log backwards and stops at the first
+    older entry, so it costs the number of changes, not the number of rows.
+
+    Once a minute the log notes the current sequence number; entries older
+    than ``retention_seconds`` by those marks are compacted away and raise
+    ``floor``. A cursor below the floor may have missed a tombstone and gets
+    :class:`ChangesExpired`. An owner's stamp (its latest sequence number)
+    is also what list ETags are built from.
+    """
+
+    unique = False
+    name = "changes"
+    MARK_INTERVAL_SECONDS = 60
+
+    def __init__(self, key_field: str = "id", owner_field: str = "user_id", retention_seconds: float = 7 * 24 * 3600) -> None:
+        self.key_field = key_field
+        self.owner_field = owner_field
+        self.retention_seconds = retention_seconds
+        self.seq = 0
+        self.floor = 0
+        self.logs: Dict[Any, OrderedDict] = {}
+        self.marks: Deque[Tuple[float, int]] = deque()
+
+    def _record(self, record: Dict[str, Any], deleted: bool) -> None:
+        self.seq += 1
+        log = self.logs.get(record.get(self.owner_field))
+        if log is None:
+            log = self.logs[record.get(self.owner_field)] = OrderedDict()
+        key = record[self.key_field]
+        log[key] = -self.seq if deleted else self.seq
+        log.move_to_end(key)
+        now = time.time()
+        if not self.marks or now - self.marks[-1][0] >= self.MARK_INTERVAL_SECONDS:
+            self.marks.append((now, self.seq))
+            self.compact(now)
+
+    def compact(self, now: float) -> None:
+        floor = self.floor
+        while self.marks and self.marks[0][0] < now - self.retention_seconds:
+            floor = self.marks.popleft()[1]
+        if floor == self.floor:
+            return
+        self.floor = floor
+        for owner in list(self.logs):
+            log = self.logs[owner]
+            while log and abs(next(iter(log.values()))) <= floor:
+                log.popitem(last=False)
+            if not log:
+                del self.logs[owner]
+
+    def check(self, record: Dict[str, Any]) -> None:
+        pass
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self._record(record, False)
+
+    def add_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self._record(record, False)
+
+    def discard(self, record: Dict[str, Any]) -> None:
+        self._record(record, True)
+
+    def stamp(self, owner: Any) -> int:
+        log = self.logs.get(owner)
+        return abs(next(reversed(log.values()))) if log else self.floor
+
+    def since(self, owner: Any, seq: int, limit: int) -> Tuple[List[Tuple[Any, bool]], int, bool]:
+        """Return up to ``limit`` ``(key, deleted)`` pairs changed after ``seq``, oldest first.
+
+        Also returns the sequence number to resume from and whether more
+        changes remain after it.
+        """
+        if seq < self.floor:
+            raise ChangesExpired(f"Changes before {self.floor} have been compacted")
+        found: List[Tuple[Any, int]] = []
+        for key, entry in reversed((self.logs.get(owner) or {}).items()):
+            if abs(entry) <= seq:
+                break
+            found.append((key, entry))
+        found.reverse()
+        if len(found) > limit:
+            found = found[:limit]
+            return [(key, entry < 0) for key, entry in found], abs(found[-1][1]), True
+        return [(key, entry < 0) for key, entry in found], max(seq, self.seq), False
+
+
+class VersionConflict(RuntimeError):
+    """Raised when a conditional write finds a different version than the caller expected."""
+
+
+class Table(Dict[str, Dict[str, Any]]):
+    """Dict of rows keyed by ``key``, carrying its row type, secondary indexes and tallies."""
+
+    def __init__(
+        self,
+        *indexes: Index,
+        record_type: Optional[Type[Record]] = None,
+        key: str = "id",
+        tallies: Iterable[Tally | ChangeLog] = (),
+    ) -> None:
+        super().__init__()
+        self.indexes: Dict[str, Index] = {index.field: index for index in indexes}
+        self.tallies: Dict[str, Tally | ChangeLog] = {tally.name: tally for tally in tallies}
+        self.record_type = record_type
+        self.key = key
+        self.versioned = record_type is not None and "version" in record_type.field_set
+
+    def make(self, payload: Mapping) -> Any:
+        """Convert a payload into this table's row type."""
+        if self.record_type is None or isinstance(payload, self.record_type):
+            return payload
+        return self.record_type.from_mapping(payload)
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
+        # Snapshot rows as plain value tuples; unpickling them is C-speed and the
+        # records are rebuilt in one pass instead of one reduce call per row.
+        if self.record_type is None:
+            rows: List[Any] = list(self.items())
+        else:
+            rows = list(map(self.record_type.values_of, self.values()))
+        return _restore_table, (list(self.indexes.values()), self.record_type, self.key, rows, list(self.tallies.values()))
+
+
+def _restore_table(
+    indexes: List[Index], record_type: Optional[Type[Record]], key: str, rows: List[Any], tallies: Iterable[Tally | ChangeLog] = ()
+) -> Table:
+    table = Table(*indexes, record_type=record_type, key=key, tallies=tallies)
+    if record_type is None:
+        table.update(rows)
+    else:
+        position = record_type.fields.index(key)
+        table.update(zip(map(itemgetter(position), rows), starmap(record_type, rows)))
+    return table
+
+
+class SessionStore:
+    """Token -> session map that forgets tokens once they expire.
+
+    Access and refresh tokens are pushed onto a min-heap keyed by their expiry;
+    ``sweep`` pops everything that is due. Revoked tokens leave stale heap
+    entries behind, which are skipped on pop and compacted away once they
+    outnumber the live ones. Sessions are also indexed per user so all of a
+    user's sessions can be revoked without scanning the store.
+    """
+
+    COMPACT_SLACK = 1024
+
+    def __init__(self) -> None:
+        self._tokens: Dict[str, Dict[str, Any]] = {}
+        self._by_user: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._expiry: List[Tuple[datetime, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __contains__(self, token: object) -> bool:
+        return token in self._tokens
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        return self._tokens.get(token)
+
+    def add(self, session: Dict[str, Any], now: Optional[datetime] = None) -> None:
+        self.sweep(now)
+        access, refresh = session["access_token"], session["refresh_token"]
+        self._tokens[access] = session
+        self._tokens[refresh] = session
+        self._by_user.setdefault(session["user_id"], {})[access] = session
+        heapq.heappush(self._expiry, (session["expires_at"], access))
+        heapq.heappush(self._expiry, (session["refresh_expires_at"], refresh))
+
+    def revoke(self, token: str) -> Optional[Dict[str, Any]]:
+        session = self._tokens.get(token)
+        if session is not None:
+            self._drop(session)
+            self._maybe_compact()
+        return session
+
+    def revoke_user(self, user_id: str) -> int:
+        sessions = self._by_user.pop(user_id, {})
+        for session in sessions.values():
+            self._tokens.pop(session["access_token"], None)
+            self._tokens.pop(session["refresh_token"], None)
+        self._maybe_compact()
+        return len(sessions)
+
+    def user_sessions(self, user_id: str) -> List[Dict[str, Any]]:
+        return list(self._by_user.get(user_id, {}).values())
+
+    def sweep(self, now: Optional[datetime] = None) -> int:
+        """Evict every token whose expiry is at or before ``now``."""
+        now = now or datetime.utcnow()
+        evicted = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            _, token = heapq.heappop(self._expiry)
+            session = self._tokens.pop(token, None)
+            if session is None:
+                continue
+            evicted += 1
+            if session["access_token"] not in self._tokens and session["refresh_token"] not in self._tokens:
+                self._unindex(session)
+        return evicted
+
+    def _drop(self, session: Dict[str, Any]) -> None:
+        self._tokens.pop(session["access_token"], None)
+        self._tokens.pop(session["refresh_token"], None)
+        self._unindex(session)
+
+    def _unindex(self, session: Dict[str, Any]) -> None:
+        user_sessions = self._by_user.get(session["user_id"])
+        if user_sessions is None:
+            return
+        user_sessions.pop(session["access_token"], None)
+        if not user_sessions:
+            del self._by_user[session["user_id"]]
+
+    def _maybe_compact(self) -> None:
+        if len(self._expiry) <= 2 * len(self._tokens) + self.COMPACT_SLACK:
+            return
+        self._expiry = [(expires_at, token) for expires_at, token in self._expiry if token in self._tokens]
+        heapq.heapify(self._expiry)
+
 
 class InMemoryDB:
+    # Whether calls wait on I/O, so coroutines must make them through ``run_db``.
+    blocking = False
+    TABLES = ("users", "profiles", "alert_settings", "disputes", "litigation_cases", "blobs")
+
     def __init__(self) -> None:
-        self.users: Dict[str, Dict[str, Any]] = {}
-        self.sessions: Dict[str, Dict[str, Any]] = {}
-        self.profiles: Dict[str, Dict[str, Any]] = {}
-        self.alert_settings: Dict[str, Dict[str, Any]] = {}
-        self.disputes: Dict[str, Dict[str, Any]] = {}
-        self.litigation_cases: Dict[str, Dict[str, Any]] = {}
+        self.journal: Optional[Journal] = None
+        # Called with (table name, "insert" | "update" | "delete", rows) after each write; see services/changefeed.py.
+        self.on_change: Optional[Callable[[str, str, List[Any]], None]] = None
+        self.auth_versions: Dict[str, int] = {}
+        # Change sequence numbers are only meaningful within one process;
+        # prefixing them with a per-process epoch keeps an ETag or sync cursor
+        # from before a restart from matching.
+        self.epoch = uuid.uuid4().hex[:8]
+        self._create_tables()
+        self._register_tables()
+
+    def _create_tables(self) -> None:
+        retention = get_settings().sync_retention_hours * 3600
+        self.users: Table = Table(
+            Index("email", unique=True, key=normalize_email),
+            record_type=UserRecord,
+            tallies=[Tally("accounts", "is_enabled", owner_field=None)],
+        )
+        self.sessions = SessionStore()
+        self.profiles: Table = Table(
+            OrderedIndex(None, key_field="user_id"),
+            record_type=ProfileRecord,
+            key="user_id",
+            tallies=[ChangeLog("user_id", retention_seconds=retention)],
+        )
+        self.alert_settings: Table = Table(
+            record_type=AlertSettingsRecord, key="user_id", tallies=[ChangeLog("user_id", retention_seconds=retention)]
+        )
+        self.disputes: Table = Table(
+            OrderedIndex("user_id"),
+            record_type=DisputeRecord,
+            tallies=[Tally("status", "status", sum_field="amount"), ChangeLog(retention_seconds=retention)],
+        )
+        self.litigation_cases: Table = Table(
+            OrderedIndex("user_id"),
+            record_type=LitigationCaseRecord,
+            tallies=[Tally("status", "status", sum_field="amount"), ChangeLog(retention_seconds=retention)],
+        )
         self.permissions: Dict[str, List[str]] = defaultdict(list)
+        self.blobs: Dict[str, Dict[str, Any]] = {}
 
     # --- User helpers -----------------------------------------------------
-    def create_user(self, email: EmailStr, full_name: str, password: str) -> Dict[str, Any]:
-        user_id = str(uuid.uuid4())
+    @staticmethod
+    def new_id() -> str:
+        return str(uuid.uuid4())
+
+    @classmethod
+    def _new_user_record(cls, email: EmailStr, full_name: str, password: str) -> Dict[str, Dict[str, Any]]:
+        user_id = cls.new_id()
         now = datetime.utcnow()
-        record = {
-            "id": user_id,
-            "email": email,
-            "full_name": full_name,
-            "password": password,
-            "created_at": now,
-            "updated_at": now,
-            "is_enabled": True,
+        return {
+            "user": {
+                "id": user_id,
+                "email": email,
+                "full_name": full_name,
+                "password": password,
+                "created_at": now,
+                "updated_at": now,
+                "is_enabled": True,
+            },
+            "profile": {
+                "user_id": user_id,
+                "full_name": full_name,
+                "avatar_url": None,
+                "is_enabled": True,
+                "created_at": now,
+                "updated_at": now,
+            },
+            "alert_settings": {
+                "user_id": user_id,
+                "email_alerts": True,
+                "sms_alerts": False,
+            },
         }
-        self.users[user_id] = record
-        self.profiles[user_id] = {
-            "user_id": user_id,
-            "full_name": full_name,
-            "avatar_url": None,
-            "is_enabled": True,
-            "created_at": now,
-            "updated_at": now,
-        }
-        self.alert_settings[user_id] = {
-            "user_id": user_id,
-            "email_alerts": True,
-            "sms_alerts": False,
-        }
-        return record
+
+    def create_user(self, email: EmailStr, full_name: str, password: str) -> Dict[str, Any]:
+        record = self._new_user_record(email, full_name, password)
+        user = self._create_user(record)
+        self._log("create_user", None, record)
+        return user
+
+    def _create_user(self, record: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        user = self._insert(self.users, record["user"])
+        self._insert(self.profiles, record["profile"])
+        self._insert(self.alert_settings, record["alert_settings"])
+        return user
 
     def get_user_by_email(self, email: EmailStr) -> Optional[Dict[str, Any]]:
-        return next((user for user in self.users.values() if user["email"] == email), None)
+        return next(iter(self.find_by(self.users, "email", email)), None)
+
+    def set_user_enabled(self, user_id: str, is_enabled: bool) -> None:
+        self.update(self.profiles, user_id, {"is_enabled": is_enabled})
+        self.update(self.users, user_id, {"is_enabled": is_enabled})
+        if not is_enabled:
+            self.revoke_user_sessions(user_id)
+        self.bump_auth_version(user_id)
+
+    def set_permissions(self, user_id: str, permissions: List[str]) -> None:
+        self.permissions[user_id] = permissions
+        self._log("set_permissions", None, user_id, permissions)
+        self.bump_auth_version(user_id)
+
+    # --- Dashboard aggregates ---------------------------------------------
+    def status_totals(self, table: Dict[str, Dict[str, Any]], user_id: Optional[str] = None) -> Dict[Any, Tuple[int, float]]:
+        """``{status: (count, amount)}`` for ``table``, optionally for one owner."""
+        return table.tallies["status"].summary(user_id)
+
+    def account_totals(self) -> Dict[bool, int]:
+        """Number of accounts by ``is_enabled``."""
+        return {enabled: count for enabled, (count, _) in self.users.tallies["accounts"].summary().items()}
+
+    def collection_version(self, table: Dict[str, Dict[str, Any]], owner: str) -> str:
+        """Opaque value that changes whenever any of ``owner``'s rows in ``table`` changes."""
+        return f"{self.epoch}.{table.tallies['changes'].stamp(owner)}"
+
+    def sync_cursor(self, table: Dict[str, Dict[str, Any]]) -> str:
+        """Cursor for :meth:`changes_since` covering every change made to ``table`` so far."""
+        return f"{self.epoch}.{table.tallies['changes'].seq}"
+
+    def changes_since(self, table: Dict[str, Dict[str, Any]], owner: str, cursor: str, limit: int) -> ChangeSet:
+        """Rows of ``owner`` inserted, updated or deleted after ``cursor``, oldest change first.
+
+        Raises ``ValueError`` for a malformed cursor and :class:`ChangesExpired`
+        for one from another process or older than the log's retention.
+        """
+        epoch, _, seq = cursor.partition(".")
+        if not seq.isdigit():
+            raise ValueError("Invalid sync cursor")
+        if epoch != self.epoch:
+            raise ChangesExpired("Sync cursor was issued before a restart")
+        changes, last, more = table.tallies["changes"].since(owner, int(seq), limit)
+        return ChangeSet(
+            changed=[table[key] for key, deleted in changes if not deleted],
+            deleted=[key for key, deleted in changes if deleted],
+            cursor=f"{self.epoch}.{last}",
+            has_more=more,
+        )
+
+    # --- Auth cache invalidation -------------------------------------------
+    def auth_version(self, user_id: str) -> int:
+        return self.auth_versions.get(user_id, 0)
+
+    def bump_auth_version(self, user_id: str) -> None:
+        """Invalidate every cached principal of ``user_id``."""
+        self.auth_versions[user_id] = self.auth_versions.get(user_id, 0) + 1
 
     # --- Session helpers --------------------------------------------------
     def create_session(self, user_id: str, token: str, expires_at: datetime, refresh_token: str, refresh_expires_at: datetime) -> Dict[str, Any]:
@@ -60,34 +606,348 @@ class InMemoryDB:
             "expires_at": expires_at,
             "refresh_expires_at": refresh_expires_at,
         }
-        self.sessions[token] = session
-        self.sessions[refresh_token] = session
+        self.sessions.add(session)
+        self._log("create_session", None, session)
         return session
 
     def get_session(self, token: str) -> Optional[Dict[str, Any]]:
         return self.sessions.get(token)
 
     def revoke_session(self, token: str) -> None:
-        session = self.sessions.pop(token, None)
+        session = self.sessions.revoke(token)
         if session:
-            self.sessions.pop(session.get("refresh_token"), None)
-            self.sessions.pop(session.get("access_token"), None)
+            self._log("revoke_session", None, token)
+            self.bump_auth_version(session["user_id"])
+
+    def revoke_user_sessions(self, user_id: str) -> int:
+        revoked = self.sessions.revoke_user(user_id)
+        self._log("revoke_user_sessions", None, user_id)
+        self.bump_auth_version(user_id)
+        return revoked
+
+    def sweep_sessions(self, now: Optional[datetime] = None) -> int:
+        return self.sessions.sweep(now)
+
+    # --- Blob reference counting -----------------------------------------
+    def retain_blob(self, digest: str, size_bytes: int) -> bool:
+        """Add a reference to ``digest``; returns True if the blob was not known yet."""
+        self._log("retain_blob", None, digest, size_bytes)
+        return self._retain_blob(digest, size_bytes)
+
+    def _retain_blob(self, digest: str, size_bytes: int) -> bool:
+        blob = self.blobs.get(digest)
+        if blob is None:
+            self.blobs[digest] = {"digest": digest, "size_bytes": size_bytes, "ref_count": 1}
+            return True
+        blob["ref_count"] += 1
+        return False
+
+    def release_blob(self, digest: str) -> None:
+        self._log("release_blob", None, digest)
+        self._release_blob(digest)
+
+    def _release_blob(self, digest: str) -> None:
+        blob = self.blobs.get(digest)
+        if blob and blob["ref_count"] > 0:
+            blob["ref_count"] -= 1
+
+    def orphaned_blobs(self) -> List[Dict[str, Any]]:
+        return [blob for blob in self.blobs.values() if blob["ref_count"] <= 0]
+
+    # --- Index helpers ----------------------------------------------------
+    @staticmethod
+    def _key(table: Dict[str, Dict[str, Any]]) -> str:
+        return table.key if isinstance(table, Table) else "id"
+
+    @staticmethod
+    def _make(table: Dict[str, Dict[str, Any]], payload: Mapping) -> Any:
+        return table.make(payload) if isinstance(table, Table) else payload
+
+    @staticmethod
+    def _indexes(table: Dict[str, Dict[str, Any]]) -> Iterable[Any]:
+        # Tallies share the index maintenance hooks (check/add/discard).
+        return chain(table.indexes.values(), table.tallies.values()) if isinstance(table, Table) else ()
+
+    def _index_record(self, table: Dict[str, Dict[str, Any]], record: Dict[str, Any]) -> None:
+        indexes = list(self._indexes(table))
+        for index in indexes:
+            index.check(record)
+        for index in indexes:
+            index.add(record)
+
+    def _unindex_record(self, table: Dict[str, Dict[str, Any]], record: Dict[str, Any]) -> None:
+        for index in self._indexes(table):
+            index.discard(record)
+
+    def find_by(self, table: Dict[str, Dict[str, Any]], field: str, value: Any) -> List[Dict[str, Any]]:
+        """Return rows whose ``field`` equals ``value``, using an index when one exists."""
+        index = table.indexes.get(field) if isinstance(table, Table) else None
+        if index is None:
+            return [record for record in table.values() if record.get(field) == value]
+        return [table[record_id] for record_id in index.lookup(value)]
+
+    def page_by(
+        self,
+        table: Dict[str, Dict[str, Any]],
+        field: Optional[str],
+        value: Any,
+        after: Optional[Tuple[datetime, str]] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` rows ordered by ``(created_at, key)``, starting after ``after``.
+
+        ``field=None`` pages through the whole table. Tables without an
+        ``OrderedIndex`` on ``field`` fall back to sorting the matching rows.
+        """
+        index = table.indexes.get(field) if isinstance(table, Table) else None
+        if isinstance(index, OrderedIndex):
+            return [table[key] for key in index.page(value, after, limit)]
+        key = self._key(table)
+        rows = list(table.values()) if field is None else self.find_by(table, field, value)
+        rows.sort(key=lambda row: (row.get("created_at") or datetime.min, row[key]))
+        if after is not None:
+            rows = [row for row in rows if (row.get("created_at") or datetime.min, row[key]) > after]
+        return rows[:limit]
 
     # --- Generic CRUD helpers --------------------------------------------
     def upsert(self, table: Dict[str, Dict[str, Any]], record_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-        if record_id not in table:
-            table[record_id] = {"id": record_id}
-        table[record_id].update(payload)
+        existed = record_id in table
+        record = self._upsert(table, record_id, payload)
+        self._log("upsert", table, record_id, payload)
+        self._changed(table, "update" if existed else "insert", [record])
+        return record
+
+    def _upsert(self, table: Dict[str, Dict[str, Any]], record_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        existing = table.get(record_id)
+        record = {**(existing or {self._key(table): record_id}), **payload}
+        if existing is not None:
+            self._unindex_record(table, existing)
+        try:
+            self._index_record(table, record)
+        except ValueError:
+            if existing is not None:
+                self._index_record(table, existing)
+            raise
+        if existing is None:
+            table[record_id] = self._make(table, record)
+        else:
+            existing.update(payload)
+            if isinstance(table, Table) and table.versioned:
+                existing["version"] += 1
         return table[record_id]
 
+    @staticmethod
+    def _check_version(table: Dict[str, Dict[str, Any]], record_id: str, expected_version: Optional[int]) -> None:
+        if expected_version is not None and table[record_id]["version"] != expected_version:
+            raise VersionConflict(f"{record_id} is at version {table[record_id]['version']}, not {expected_version}")
+
+    def update(
+        self, table: Dict[str, Dict[str, Any]], record_id: str, changes: Dict[str, Any], expected_version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Apply ``changes`` to an existing row, returning it, or ``None`` if it does not exist.
+
+        With ``expected_version`` the write only happens if the row is still
+        at that version; otherwise :class:`VersionConflict` is raised.
+        """
+        if record_id not in table:
+            return None
+        self._check_version(table, record_id, expected_version)
+        return self.upsert(table, record_id, changes)
+
     def insert(self, table: Dict[str, Dict[str, Any]], payload: Dict[str, Any]) -> Dict[str, Any]:
-        record_id = payload.get("id") or str(uuid.uuid4())
-        payload["id"] = record_id
-        table[record_id] = payload
-        return payload
+        record = self._insert(table, payload)
+        self._log("insert", table, record)
+        self._changed(table, "insert", [record])
+        return record
+
+    def _insert(self, table: Dict[str, Dict[str, Any]], payload: Dict[str, Any]) -> Dict[str, Any]:
+        key = self._key(table)
+        record_id = payload.get(key) or self.new_id()
+        payload[key] = record_id
+        record = self._make(table, payload)
+        existing = table.get(record_id)
+        if existing is not None:
+            self._unindex_record(table, existing)
+        try:
+            self._index_record(table, record)
+        except ValueError:
+            if existing is not None:
+                self._index_record(table, existing)
+            raise
+        table[record_id] = record
+        return record
+
+    def insert_many(self, table: Dict[str, Dict[str, Any]], payloads: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert a batch of rows, all or nothing."""
+        records = self._insert_many(table, payloads)
+        self._log("insert_many", table, records)
+        self._changed(table, "insert", records)
+        return records
+
+    def _insert_many(self, table: Dict[str, Dict[str, Any]], payloads: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        key = self._key(table)
+        records = []
+        for payload in payloads:
+            payload[key] = payload.get(key) or self.new_id()
+            records.append(self._make(table, payload))
+        indexes = list(self._indexes(table))
+        if any(index.unique for index in indexes) or any(record[key] in table for record in records):
+            inserted: List[Dict[str, Any]] = []
+            try:
+                for record in records:
+                    inserted.append(self._insert(table, record))
+            except ValueError:
+                for record in inserted:
+                    self._delete(table, record[key])
+                raise
+            return records
+
+        table.update((record[key], record) for record in records)
+        for index in indexes:
+            index.add_many(records)
+        return records
+
+    def delete(self, table: Dict[str, Dict[str, Any]], record_id: str, expected_version: Optional[int] = None) -> None:
+        record = table.get(record_id)
+        if record is not None:
+            self._check_version(table, record_id, expected_version)
+        if self._delete(table, record_id):
+            self._log("delete", table, record_id)
+            self._changed(table, "delete", [record])
+
+    def _delete(self, table: Dict[str, Dict[str, Any]], record_id: str) -> bool:
+        record = table.pop(record_id, None)
+        if record is None:
+            return False
+        self._unindex_record(table, record)
+        return True
+
+    # --- Persistence --------------------------------------------------------
+    def _register_tables(self) -> None:
+        self._table_names = {id(getattr(self, name)): name for name in self.TABLES}
+
+    def _table_name(self, table: Any) -> str:
+        return self._table_names[id(table)]
+
+    def _changed(self, table: Any, op: str, rows: List[Any]) -> None:
+        if self.on_change is not None and rows:
+            self.on_change(self._table_name(table), op, rows)
+
+    def _log(self, op: str, table: Optional[Dict[str, Dict[str, Any]]] = None, *args: Any) -> None:
+        if self.journal is None:
+            return
+        self.journal.append((op, self._table_names[id(table)] if table is not None else None, *args))
+        if self.journal.snapshot_due():
+            self.snapshot()
+
+    def apply_log_entry(self, entry: Tuple[Any, ...]) -> None:
+        """Re-apply one journaled operation without journaling it again."""
+        op, table_name, *args = entry
+        table = getattr(self, table_name) if table_name else None
+        if op == "insert":
+            self._insert(table, *args)
+        elif op == "upsert":
+            self._upsert(table, *args)
+        elif op == "insert_many":
+            self._insert_many(table, *args)
+        elif op == "delete":
+            self._delete(table, *args)
+        elif op == "create_user":
+            self._create_user(*args)
+        elif op == "create_session":
+            self.sessions.add(*args)
+        elif op == "revoke_session":
+            self.sessions.revoke(*args)
+        elif op == "revoke_user_sessions":
+            self.sessions.revoke_user(*args)
+        elif op == "set_permissions":
+            self.permissions[args[0]] = args[1]
+        elif op == "retain_blob":
+            self._retain_blob(*args)
+        elif op == "release_blob":
+            self._release_blob(*args)
+        else:
+            raise ValueError(f"Unknown journal operation '{op}'")
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        for name in self.TABLES:
+            table, fresh = state["tables"][name], getattr(self, name)
+            if isinstance(fresh, Table):
+                # Snapshots written before a tally existed restore without it; rebuild it from the rows.
+                for tally_name, tally in fresh.tallies.items():
+                    if tally_name not in table.tallies:
+                        tally.add_many(table.values())
+                        table.tallies[tally_name] = tally
+            setattr(self, name, table)
+        self.sessions = state["sessions"]
+        self.permissions = defaultdict(list, state["permissions"])
+        self._register_tables()
+
+    def enable_persistence(self, directory: Path, fsync_interval: float, snapshot_bytes: int) -> None:
+        """Recover from ``directory`` and journal every later write into it."""
+        from .persistence import Journal, recover
+
+        directory.mkdir(parents=True, exist_ok=True)
+        generation = recover(self, directory)
+        self.journal = Journal(directory, generation, fsync_interval, snapshot_bytes)
+
+    def snapshot(self) -> None:
+        """Start a snapshot and a new WAL generation after it.
+
+        Rotating the WAL and forking the snapshot writer happen back to back
+        on the calling thread, with no write in between, so the snapshot holds
+        exactly the writes of the generations it replaces. Pickling and
+        writing the file happen in the forked child; see
+        :meth:`Journal.write_snapshot`.
+        """
+        if self.journal is None or self.journal.snapshot_running:
+            return
+        generation = self.journal.rotate()
+        state = {
+            "wal_generation": generation,
+            "tables": {name: getattr(self, name) for name in self.TABLES},
+            "sessions": self.sessions,
+            "permissions": dict(self.permissions),
+        }
+        self.journal.write_snapshot(state, generation)
+
+    def close(self) -> None:
+        if self.journal is not None:
+            self.journal.wait_for_snapshot()
+            self.snapshot()
+            self.journal.close()
+            self.journal = None
+
+
+def create_database(settings: Settings) -> InMemoryDB:
+    """Build the store selected by ``Settings.database_backend``."""
+    if settings.database_backend == "sql":
+        from .sql_database import SQLDatabase
+
+        return SQLDatabase.from_settings(settings)
+    db = InMemoryDB()
+    if settings.persistence_dir:
+        db.enable_persistence(
+            Path(settings.persistence_dir),
+            fsync_interval=settings.persistence_fsync_interval_ms / 1000,
+            snapshot_bytes=settings.persistence_snapshot_wal_bytes,
+        )
+    return db
+
+
+DB = create_database(get_settings())
+
+T = TypeVar("T")
 
-    def delete(self, table: Dict[str, Dict[str, Any]], record_id: str) -> None:
-        table.pop(record_id, None)
 
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Call ``fn`` from a coroutine without stalling the event loop on database I/O.
 
-DB = InMemoryDB()
+    With a blocking backend (SQL) the call runs on a worker thread, so requests
+    overlap while they wait on the database and its connection pool. The
+    in-memory backend never waits and is not thread-safe, so it is called
+    inline.
+    """
+    if not DB.blocking:
+        return fn(*args, **kwargs)
+    return await anyio.to_thread.run_sync(functools.partial(fn, *args, **kwargs))
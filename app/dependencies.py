@@ -1,64 +1,113 @@
 """Reusable FastAPI dependencies for auth and permissions."""
 from __future__ import annotations
 
+import time
 from datetime import datetime
-from typing import Annotated, Dict, List
-from fastapi import Depends, HTTPException, Security
+from functools import lru_cache
+from typing import Annotated, Awaitable, Callable, Dict, Iterable, Tuple
+from fastapi import Depends, HTTPException, Request, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-from .config import get_settings
-from .database import DB
+from .database import DB, run_db
+from .metrics import timed_dependency
+from .services.auth import verify_access_token
+from .services.permissions import PERMISSIONS
+from .services.principals import PRINCIPALS, CachedPrincipal
 
 security_scheme = HTTPBearer(auto_error=False)
 
+# Sub-requests dispatched by ``POST /batch`` carry the batch's principal here, so they skip re-authenticating.
+PRINCIPAL_SCOPE_KEY = "lms.principal"
+
 
 class Principal(Dict):
     """Simple dict subclass to provide attribute-style hints."""
 
 
-async def get_current_session(
-    credentials: Annotated[HTTPAuthorizationCredentials | None, Security(security_scheme)]
-) -> Dict:
-    if credentials is None:
-        raise HTTPException(status_code=401, detail="Missing Authorization header")
+def _authenticate(token: str) -> Tuple[CachedPrincipal, bool]:
+    """Resolve ``token`` to its principal; the flag is True for a cache hit."""
+    cached = PRINCIPALS.get(token, DB.auth_version)
+    if cached is not None:
+        return cached, True
 
-    session = DB.get_session(credentials.credentials)
-    if not session:
+    claims = verify_access_token(token)
+    session = DB.get_session(token) if claims else None
+    if not session or session["access_token"] != token:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
     if session["expires_at"] < datetime.utcnow():
         raise HTTPException(status_code=401, detail="Token expired")
-    return session
+
+    user_id = session["user_id"]
+    principal = CachedPrincipal(session, DB.users.get(user_id), claims["exp"], DB.auth_version(user_id))
+    if principal.user is not None:
+        PRINCIPALS.put(token, principal)
+    return principal, False
+
+
+@timed_dependency("get_current_principal")
+async def get_current_principal(
+    request: Request, credentials: Annotated[HTTPAuthorizationCredentials | None, Security(security_scheme)]
+) -> CachedPrincipal:
+    preset = request.scope.get(PRINCIPAL_SCOPE_KEY)
+    if preset is not None:
+        # A batch sub-request inherits the batch's principal, which another
+        # sub-request may have signed out or changed since; re-check it then.
+        if preset.expires_at > time.time() and preset.version == await run_db(DB.auth_version, preset.session["user_id"]):
+            return preset
+        principal, _ = await run_db(_authenticate, preset.session["access_token"])
+        return principal
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Missing Authorization header")
+
+    started = time.perf_counter()
+    principal, hit = await run_db(_authenticate, credentials.credentials)
+    PRINCIPALS.record(hit, time.perf_counter() - started)
+    return principal
+
+
+@timed_dependency("get_current_session")
+async def get_current_session(principal: CachedPrincipal = Depends(get_current_principal)) -> Dict:
+    return principal.session
 
 
-async def get_current_user(session: Dict = Depends(get_current_session)) -> Dict:
-    user = DB.users.get(session["user_id"])
+@timed_dependency("get_current_user")
+async def get_current_user(principal: CachedPrincipal = Depends(get_current_principal)) -> Dict:
+    user = principal.user
     if not user or not user.get("is_enabled"):
         raise HTTPException(status_code=403, detail="User disabled")
     return user
 
 
-async def require_permissions(
-    permissions: List[str],
-    user: Dict = Depends(get_current_user),
-) -> Dict:
-    user_permissions = set(DB.permissions.get(user["id"], []))
-    settings = get_settings()
-    if user["email"] == settings.default_admin_email:
-        DB.permissions[user["id"]] = permissions
+@lru_cache(maxsize=None)
+def _permission_dependency(permissions: Tuple[str, ...]) -> Callable[..., Awaitable[Dict]]:
+    required = PERMISSIONS.mask(permissions)
+
+    @timed_dependency("require_permissions")
+    async def dependency(user: Dict = Depends(get_current_user)) -> Dict:
+        mask = await run_db(PERMISSIONS.user_mask, user)
+        if mask & required != required:
+            missing = PERMISSIONS.names(required & ~mask)
+            raise HTTPException(status_code=403, detail=f"Missing permissions: {', '.join(missing)}")
         return user
 
-    missing = [perm for perm in permissions if perm not in user_permissions]
-    if missing:
-        raise HTTPException(status_code=403, detail=f"Missing permissions: {', '.join(missing)}")
-    return user
+    return dependency
 
 
-async def require_admin(user: Dict = Depends(get_current_user)) -> Dict:
-    settings = get_settings()
-    if user["email"] == settings.default_admin_email:
-        return user
+def require_permissions(permissions: Iterable[str]) -> Callable[..., Awaitable[Dict]]:
+    """Return the dependency enforcing ``permissions``.
+
+    Dependencies are cached per permission tuple, so every route requiring the
+    same permissions shares one callable and its precomputed mask.
+    """
+    return _permission_dependency(tuple(permissions))
 
-    if "admin.manage" not in DB.permissions.get(user["id"], []):
+
+_ADMIN = PERMISSIONS.bit("admin.manage")
+
+
+@timed_dependency("require_admin")
+async def require_admin(user: Dict = Depends(get_current_user)) -> Dict:
+    if not await run_db(PERMISSIONS.user_mask, user) & _ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
     return user
@@ -1,23 +1,90 @@
-"""FastAPI entrypoint."""
+"""FastAPI entrypoint.
+
+With ``LAZY_STARTUP`` set, importing this module only loads settings: ``app``
+is a :class:`LazyApp` that imports FastAPI, the routers and the database and
+builds the application on the first ASGI event it receives (the lifespan
+startup under uvicorn, or the first request on a serverless cold start).
+"""
 from __future__ import annotations
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Optional
 
-from .api.routes import admin, auth, disputes, health, litigation, profile
 from .config import get_settings
 
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+    from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    from .database import DB
+    from .metrics import METRICS
+    from .services.changefeed import CHANGE_FEED
+    from .services.notifications import DISPATCHER
+
+    await DISPATCHER.start()
+    await METRICS.start()
+    await CHANGE_FEED.start()
+    try:
+        yield
+    finally:
+        await CHANGE_FEED.stop()
+        await METRICS.stop()
+        await DISPATCHER.stop()
+        DB.close()
+
 
 def create_app() -> FastAPI:
+    from fastapi import FastAPI
+
+    from .api.routes import admin, auth, batch, disputes, events, health, litigation, metrics, profile, storage
+    from .conditional import version_conflict_handler
+    from .database import DB, VersionConflict
+    from .metrics import METRICS, MetricsMiddleware
+    from .persistence import SyncCommitMiddleware
+    from .profiling import PROFILER, ProfilingMiddleware
+    from .responses import FastJSONResponse
+
     settings = get_settings()
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, lifespan=lifespan, default_response_class=FastJSONResponse)
+
+    if settings.persistence_sync_commit:
+        # Innermost, so the wait for the fsync shows up in latency metrics and profiles.
+        app.add_middleware(SyncCommitMiddleware, db=DB)
+    app.add_middleware(ProfilingMiddleware, router=app.router, profiler=PROFILER)
+    app.add_middleware(MetricsMiddleware, metrics=METRICS)
+    app.add_exception_handler(VersionConflict, version_conflict_handler)
 
     app.include_router(health.router)
+    app.include_router(metrics.router)
     app.include_router(auth.router)
     app.include_router(profile.router)
     app.include_router(disputes.router)
     app.include_router(litigation.router)
+    app.include_router(events.router)
+    app.include_router(batch.router)
     app.include_router(admin.router)
+    app.include_router(storage.router)
     return app
 
 
-app = create_app()
+class LazyApp:
+    """ASGI app that calls ``factory`` when the first event arrives."""
+
+    def __init__(self, factory: Callable[[], ASGIApp]) -> None:
+        self.factory = factory
+        self._app: Optional[ASGIApp] = None
+
+    @property
+    def app(self) -> ASGIApp:
+        if self._app is None:
+            self._app = self.factory()
+        return self._app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.app(scope, receive, send)
+
+
+app = LazyApp(create_app) if get_settings().lazy_startup else create_app()
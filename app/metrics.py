@@ -0,0 +1,238 @@
+"""Request instrumentation exported in the Prometheus text format.
+
+Everything here is updated from the event loop thread only, so counters are
+plain ints behind dict lookups rather than locked objects, and histograms
+use fixed bucket bounds chosen up front: an observation is one bisect and
+two additions. ``MetricsMiddleware`` is a raw ASGI middleware, so it adds
+no extra task or body buffering per request.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEPENDENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+UNMATCHED_ROUTE = "<unmatched>"
+# Any other request method is counted as OTHER, so clients cannot mint label values.
+KNOWN_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+OTHER_METHOD = "OTHER"
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str, lines: List[str]) -> None:
+        cumulative = 0
+        prefix = f"{labels}," if labels else ""
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.9g}")
+        lines.append(f"{name}_count{suffix} {cumulative}")
+
+
+def _label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**values: Any) -> str:
+    return ",".join(f'{key}="{_label(value)}"' for key, value in values.items())
+
+
+class RouteStats:
+    __slots__ = ("latency", "request_bytes", "response_bytes", "statuses")
+
+    def __init__(self) -> None:
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.request_bytes = Histogram(SIZE_BUCKETS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+        self.statuses: Dict[int, int] = {}
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.dependencies: Dict[str, Histogram] = {}
+        self.loop_lag = Histogram(LAG_BUCKETS)
+        self.loop_lag_last = 0.0
+        self._monitor: Optional[asyncio.Task] = None
+
+    # --- Recording --------------------------------------------------------
+    def request_started(self, method: str) -> None:
+        self.in_flight[method] = self.in_flight.get(method, 0) + 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float, received: int, sent: int) -> None:
+        self.in_flight[method] -= 1
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = RouteStats()
+        stats.latency.observe(seconds)
+        stats.request_bytes.observe(received)
+        stats.response_bytes.observe(sent)
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def observe_dependency(self, name: str, seconds: float) -> None:
+        histogram = self.dependencies.get(name)
+        if histogram is None:
+            histogram = self.dependencies[name] = Histogram(DEPENDENCY_BUCKETS)
+        histogram.observe(seconds)
+
+    # --- Event-loop lag ---------------------------------------------------
+    async def start(self, interval: float = 0.5) -> None:
+        if self._monitor is None:
+            self._monitor = asyncio.create_task(self._watch_loop(interval))
+
+    async def stop(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+
+    async def _watch_loop(self, interval: float) -> None:
+        # How late a sleep wakes up is how long the loop was busy with something else.
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag_last = max(0.0, loop.time() - started - interval)
+            self.loop_lag.observe(self.loop_lag_last)
+
+    # --- Exposition -------------------------------------------------------
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histograms(name: str, help_text: str, items: Iterable[Tuple[str, Histogram]]) -> None:
+            header(name, "histogram", help_text)
+            for labels, histogram in items:
+                histogram.render(name, labels, lines)
+
+        routes = [(_labels(method=method, route=route), method, route, stats) for (method, route), stats in list(self.routes.items())]
+        histograms(
+            "http_request_duration_seconds",
+            "Request latency by method and route template.",
+            ((labels, stats.latency) for labels, _, _, stats in routes),
+        )
+        header("http_requests_total", "counter", "Responses by method, route template and status code.")
+        for _, method, route, stats in routes:
+            for status, count in stats.statuses.items():
+                lines.append(f"http_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}")
+        header("http_requests_in_flight", "gauge", "Requests currently being handled, by method.")
+        for method, count in self.in_flight.items():
+            lines.append(f"http_requests_in_flight{{{_labels(method=method)}}} {count}")
+        histograms(
+            "http_request_size_bytes",
+            "Request body size (Content-Length) by method and route template.",
+            ((labels, stats.request_bytes) for labels, _, _, stats in routes),
+        )
+        histograms(
+            "http_response_size_bytes",
+            "Response body bytes sent by method and route template.",
+            ((labels, stats.response_bytes) for labels, _, _, stats in routes),
+        )
+        histograms(
+            "dependency_duration_seconds",
+            "Time spent inside auth and permission dependencies.",
+            ((_labels(dependency=name), histogram) for name, histogram in self.dependencies.items()),
+        )
+        histograms("event_loop_lag_seconds", "How late the event loop ran a timer scheduled on it.", [("", self.loop_lag)])
+        header("event_loop_lag_last_seconds", "gauge", "Most recent event loop lag sample.")
+        lines.append(f"event_loop_lag_last_seconds {self.loop_lag_last:.9g}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def timed_dependency(name: str) -> Callable[[F], F]:
+    """Record how long an async dependency's own body takes under ``name``.
+
+    FastAPI resolves sub-dependencies before calling a dependency, so the
+    time recorded excludes them. The wrapper carries the original signature
+    with annotations already evaluated, because FastAPI would otherwise try
+    to resolve string annotations against this module's globals.
+    """
+
+    def wrap(fn: F) -> F:
+        @functools.wraps(fn)
+        async def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                METRICS.observe_dependency(name, time.perf_counter() - started)
+
+        timed.__signature__ = inspect.signature(fn, eval_str=True)  # type: ignore[attr-defined]
+        return timed  # type: ignore[return-value]
+
+    return wrap
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, metrics: Metrics = METRICS) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in KNOWN_METHODS else OTHER_METHOD
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        received = 0
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                received = int(value) if value.isdigit() else 0
+                break
+
+        self.metrics.request_started(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; the template keeps label cardinality bounded.
+            route = scope.get("route")
+            self.metrics.request_finished(
+                method, getattr(route, "path", UNMATCHED_ROUTE), status, time.perf_counter() - started, received, sent
+            )
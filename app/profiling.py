@@ -0,0 +1,236 @@
+"""On-demand profiling of live requests, switched on by admins.
+
+``ProfilingMiddleware`` stays in the stack permanently; while profiling is
+off it reads one attribute and hands the request straight on. When an admin
+enables a :class:`~app.schemas.ProfilingConfig`, requests matching its
+method, route template, user and header filters are sampled at
+``sample_rate`` and profiled in one of two modes:
+
+* ``sampling`` -- a background thread snapshots the event loop thread's
+  stack every ``interval_ms`` and counts collapsed stacks, which load
+  directly into flame graph tools.
+* ``cprofile`` -- deterministic ``cProfile`` tracing, downloadable as a
+  ``.pstats`` file or as a text report.
+
+Both observe the event loop thread, so work for other requests interleaved
+on the loop while a profile runs shows up in it too; keep filters narrow.
+Only one ``cProfile`` profiler can be attached to a thread at a time, so
+that mode runs at most one profile regardless of ``max_concurrent``.
+Finished profiles are kept in a ring of ``PROFILE_RING_SIZE`` entries.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import itertools
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Deque, Iterable, List, Optional, Tuple
+
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import get_settings
+from .schemas import ProfileSummary, ProfilingConfig
+from .services.auth import verify_access_token
+
+_STATS_LIMIT = 60
+
+
+class _Sampler:
+    """Counts the stacks of one thread, sampled from a daemon thread."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+            self.samples += 1
+
+
+class _Tracer:
+    def __init__(self) -> None:
+        self.profile = cProfile.Profile()
+        self.samples: Optional[int] = None
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+
+class ProfileResult:
+    __slots__ = ("summary", "_collector")
+
+    def __init__(self, summary: ProfileSummary, collector: _Sampler | _Tracer) -> None:
+        self.summary = summary
+        self._collector = collector
+
+    def collapsed(self) -> str:
+        assert isinstance(self._collector, _Sampler)
+        return "".join(f"{stack} {count}\n" for stack, count in self._collector.stacks.most_common())
+
+    def pstats_bytes(self) -> bytes:
+        assert isinstance(self._collector, _Tracer)
+        self._collector.profile.create_stats()
+        return marshal.dumps(self._collector.profile.stats)  # type: ignore[attr-defined]
+
+    def pstats_text(self) -> str:
+        assert isinstance(self._collector, _Tracer)
+        buffer = io.StringIO()
+        pstats.Stats(self._collector.profile, stream=buffer).sort_stats("cumulative").print_stats(_STATS_LIMIT)
+        return buffer.getvalue()
+
+
+class Profiler:
+    def __init__(self, ring_size: int) -> None:
+        # ``None`` means off; the middleware checks nothing else before passing a request through.
+        self.config: Optional[ProfilingConfig] = None
+        self.profiles: Deque[ProfileResult] = deque(maxlen=ring_size)
+        self.active = 0
+        self.skipped_busy = 0
+        self._header: Optional[Tuple[bytes, Optional[bytes]]] = None
+        self._ids = itertools.count(1)
+
+    @property
+    def settings(self) -> ProfilingConfig:
+        return self.config or ProfilingConfig()
+
+    def configure(self, config: ProfilingConfig) -> None:
+        self._header = None
+        if config.header:
+            name, _, value = config.header.partition(":")
+            self._header = (name.strip().lower().encode("latin-1"), value.strip().encode("latin-1") if value.strip() else None)
+        self.config = config if config.enabled else None
+
+    def get(self, profile_id: int) -> Optional[ProfileResult]:
+        return next((result for result in self.profiles if result.summary.id == profile_id), None)
+
+    def summaries(self) -> List[ProfileSummary]:
+        return [result.summary for result in reversed(self.profiles)]
+
+    def clear(self) -> None:
+        self.profiles.clear()
+
+    def matches(self, config: ProfilingConfig, scope: Scope, router: Router) -> bool:
+        if config.method and scope["method"] != config.method.upper():
+            return False
+        if self._header is not None and not _has_header(scope["headers"], *self._header):
+            return False
+        if config.route is not None and _route_template(router, scope) != config.route:
+            return False
+        if config.user_id is not None and _bearer_subject(scope["headers"]) != config.user_id:
+            return False
+        return config.sample_rate >= 1.0 or random.random() < config.sample_rate
+
+    async def run(self, config: ProfilingConfig, app: ASGIApp, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = 1 if config.mode == "cprofile" else config.max_concurrent
+        if self.active >= limit:
+            self.skipped_busy += 1
+            await app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        collector: _Sampler | _Tracer
+        if config.mode == "cprofile":
+            collector = _Tracer()
+        else:
+            collector = _Sampler(threading.get_ident(), config.interval_ms / 1000)
+        self.active += 1
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        collector.start()
+        try:
+            await app(scope, receive, send_wrapper)
+        finally:
+            collector.stop()
+            duration = time.perf_counter() - started
+            self.active -= 1
+            route = scope.get("route")
+            summary = ProfileSummary(
+                id=next(self._ids),
+                mode=config.mode,
+                method=scope["method"],
+                path=scope["path"],
+                route=getattr(route, "path", None),
+                user_id=_bearer_subject(scope["headers"]),
+                status=status,
+                started_at=started_at,
+                duration_ms=duration * 1000,
+                samples=collector.samples,
+            )
+            self.profiles.append(ProfileResult(summary, collector))
+
+
+def _has_header(headers: Iterable[Tuple[bytes, bytes]], name: bytes, value: Optional[bytes]) -> bool:
+    return any(key == name and (value is None or found == value) for key, found in headers)
+
+
+def _route_template(router: Router, scope: Scope) -> Optional[str]:
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", None)
+    return None
+
+
+def _bearer_subject(headers: Iterable[Tuple[bytes, bytes]]) -> Optional[str]:
+    for key, value in headers:
+        if key == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return None
+            claims = verify_access_token(token.strip())
+            return claims["sub"] if claims else None
+    return None
+
+
+PROFILER = Profiler(get_settings().profile_ring_size)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, router: Router, profiler: Profiler = PROFILER) -> None:
+        self.app = app
+        self.router = router
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        config = self.profiler.config
+        if config is None or scope["type"] != "http" or not self.profiler.matches(config, scope, self.router):
+            await self.app(scope, receive, send)
+            return
+        await self.profiler.run(config, self.app, scope, receive, send)
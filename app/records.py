@@ -0,0 +1,148 @@
+"""Compact row types for the in-memory tables.
+
+Each table stores slotted dataclass instances instead of one dict per row.
+They implement the read-only ``Mapping`` protocol plus ``__setitem__`` and
+``update``, so code written against dict rows (``row["id"]``, ``row.get``,
+``Dispute(**row)``) keeps working. Low-cardinality string fields such as
+``status`` are interned so every row shares one string object per value.
+"""
+from __future__ import annotations
+
+import operator
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Any, Callable, ClassVar, Dict, FrozenSet, Iterator, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from .schemas import AlertSettings, Dispute, LitigationCase, Profile, UserBase
+
+R = TypeVar("R", bound="Record")
+
+
+class Record(Mapping):
+    __slots__ = ()
+    fields: ClassVar[Tuple[str, ...]] = ()
+    # Returns the row's values as a tuple in ``fields`` order; ``cls(*values)`` rebuilds it.
+    values_of: ClassVar[Callable[["Record"], Tuple[Any, ...]]]
+    field_set: ClassVar[FrozenSet[str]] = frozenset()
+    interned: ClassVar[FrozenSet[str]] = frozenset()
+    schema: ClassVar[Optional[Type[BaseModel]]] = None
+    schema_fields: ClassVar[Tuple[str, ...]] = ()
+
+    @classmethod
+    def from_mapping(cls: Type[R], values: Mapping) -> R:
+        if cls.interned:
+            values = {name: sys.intern(value) if name in cls.interned and isinstance(value, str) else value for name, value in values.items()}
+        return cls(**values)
+
+    @classmethod
+    def from_model(cls: Type[R], model: BaseModel) -> R:
+        return cls.from_mapping(model.dict())
+
+    def to_model(self) -> BaseModel:
+        """Build the matching Pydantic schema without re-validating the row."""
+        return self.schema.construct(**{name: getattr(self, name) for name in self.schema_fields})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.fields}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.field_set:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.field_set:
+            raise KeyError(key)
+        if key in self.interned and isinstance(value, str):
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def update(self, values: Mapping = (), **extra: Any) -> None:
+        for key, value in dict(values, **extra).items():
+            self[key] = value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
+        # Pickle as (class, positional values): far smaller than per-row slot dicts.
+        return type(self), self.values_of(self)
+
+
+def record(schema: Optional[Type[BaseModel]] = None, interned: Tuple[str, ...] = ()):
+    """Turn a ``Record`` subclass into a slotted dataclass and fill in its metadata."""
+
+    def wrap(cls: Type[R]) -> Type[R]:
+        cls = dataclass(slots=True, eq=False, repr=True)(cls)
+        cls.fields = tuple(item.name for item in fields(cls))
+        cls.field_set = frozenset(cls.fields)
+        getter = operator.attrgetter(*cls.fields)
+        cls.values_of = getter if len(cls.fields) > 1 else lambda row: (getter(row),)
+        cls.interned = frozenset(interned)
+        cls.schema = schema
+        if schema is not None:
+            cls.schema_fields = tuple(name for name in schema.__fields__ if name in cls.field_set)
+        return cls
+
+    return wrap
+
+
+@record(schema=UserBase)
+class UserRecord(Record):
+    id: str
+    email: str
+    full_name: str
+    password: str
+    created_at: datetime
+    updated_at: datetime
+    is_enabled: bool = True
+
+
+@record(schema=Profile)
+class ProfileRecord(Record):
+    user_id: str
+    full_name: str
+    avatar_url: Optional[str] = None
+    is_enabled: bool = True
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    version: int = 1
+
+
+@record(schema=AlertSettings)
+class AlertSettingsRecord(Record):
+    user_id: str
+    email_alerts: bool = True
+    sms_alerts: bool = False
+    version: int = 1
+
+
+@record(schema=Dispute, interned=("status",))
+class DisputeRecord(Record):
+    id: str
+    user_id: str
+    title: str
+    amount: float
+    created_at: datetime
+    status: str = "open"
+    documents: List[Dict[str, Any]] = field(default_factory=list)
+    version: int = 1
+
+
+@record(schema=LitigationCase, interned=("status",))
+class LitigationCaseRecord(Record):
+    id: str
+    user_id: str
+    docket_number: str
+    case_name: str
+    status: str
+    amount: float
+    created_at: datetime
+    version: int = 1
@@ -0,0 +1,208 @@
+"""Custom response classes."""
+from __future__ import annotations
+
+from datetime import date, datetime
+from functools import lru_cache
+import json
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Type
+
+import anyio
+from pydantic import BaseModel
+from starlette.responses import FileResponse, JSONResponse
+from starlette.types import Receive, Scope, Send
+
+from .records import Record
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialise ``content`` to compact JSON bytes, via orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with :func:`dumps`; the app's default response class."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def row_encoder(schema: Type[BaseModel]) -> Callable[[Any], Dict[str, Any]]:
+    """Return a function projecting a stored row onto ``schema``'s fields.
+
+    Stored rows were validated on the way in, so the projection only drops
+    fields the schema does not expose (a user's password hash, for example)
+    instead of building and re-validating a model per row.
+    """
+    names = tuple(schema.__fields__)
+    defaults = {name: field.default for name, field in schema.__fields__.items()}
+    getter = attrgetter(*names)
+    by_attr = getter if len(names) > 1 else lambda row: (getter(row),)
+
+    def encode(row: Any) -> Dict[str, Any]:
+        if isinstance(row, Record):
+            return dict(zip(names, by_attr(row)))
+        return {name: row.get(name, defaults[name]) for name in names}
+
+    return encode
+
+
+def encode_rows(schema: Type[BaseModel], rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    return list(map(row_encoder(schema), rows))
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive offsets.
+
+    Returns ``None`` for headers we choose to ignore (other units, multiple
+    ranges, malformed values), which means serving the whole file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start > end and first and last:
+        return None
+    if start >= size or size == 0:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    bare = etag.removeprefix("W/")
+    return "*" in candidates or any(candidate.removeprefix("W/") == bare for candidate in candidates)
+
+
+class RangedFileResponse(FileResponse):
+    """File response honouring conditional and single-range requests.
+
+    Whole files go out through ``http.response.pathsend`` and byte ranges
+    through ``http.response.zerocopysend`` when the server advertises those
+    ASGI extensions, so the file never passes through Python buffers.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        request_headers: Mapping[str, str],
+        stat_result: os.stat_result,
+        etag: Optional[str] = None,
+        filename: Optional[str] = None,
+        content_disposition_type: str = "inline",
+    ) -> None:
+        self.etag = etag or f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        super().__init__(
+            path,
+            filename=filename,
+            stat_result=stat_result,
+            content_disposition_type=content_disposition_type,
+        )
+        self.headers["accept-ranges"] = "bytes"
+        self.range: Optional[Tuple[int, int]] = None
+        size = stat_result.st_size
+
+        if self._not_modified(request_headers, stat_result):
+            self.status_code = 304
+            del self.headers["content-length"]
+            return
+
+        range_header = request_headers.get("range")
+        if not range_header or not self._if_range_ok(request_headers.get("if-range"), stat_result):
+            return
+        try:
+            self.range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            self.status_code = 416
+            self.headers["content-range"] = f"bytes */{size}"
+            self.headers["content-length"] = "0"
+            return
+        if self.range is not None:
+            start, end = self.range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(end - start + 1)
+
+    def set_stat_headers(self, stat_result: os.stat_result) -> None:
+        self.headers.setdefault("content-length", str(stat_result.st_size))
+        self.headers.setdefault("last-modified", formatdate(stat_result.st_mtime, usegmt=True))
+        self.headers.setdefault("etag", self.etag)
+
+    def _not_modified(self, request_headers: Mapping[str, str], stat_result: os.stat_result) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return _etag_matches(if_none_match, self.etag)
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(stat_result.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _if_range_ok(self, if_range: Optional[str], stat_result: os.stat_result) -> bool:
+        if not if_range:
+            return True
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == self.etag
+        return if_range == self.headers["last-modified"]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.status_code == 200:
+            await super().__call__(scope, receive, send)
+            return
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.range is None or scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        start, end = self.range
+        remaining = end - start + 1
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({"type": "http.response.zerocopysend", "file": file, "offset": start, "count": remaining})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
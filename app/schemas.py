@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 from pydantic import BaseModel, EmailStr, Field, HttpUrl
 
 
@@ -60,8 +60,10 @@ class AuthRefreshRequest(BaseModel):
 
 class DisputeFileMetadata(BaseModel):
     filename: str
-    url: HttpUrl
+    url: str
     size_bytes: int
+    sha256: Optional[str] = None
+    storage_key: Optional[str] = Field(None, description="Blob digest when stored content-addressed")
 
 
 class Dispute(BaseModel):
@@ -72,6 +74,7 @@ class Dispute(BaseModel):
     amount: float
     created_at: datetime
     documents: List[DisputeFileMetadata] = []
+    version: int = Field(1, description='Bumped on every change; send `If-Match: "<version>"` to update or delete conditionally')
 
 
 class DisputeCreate(BaseModel):
@@ -93,6 +96,7 @@ class LitigationCase(BaseModel):
     status: Literal["draft", "filed", "closed"]
     amount: float
     created_at: datetime
+    version: int = Field(1, description='Bumped on every change; send `If-Match: "<version>"` to delete conditionally')
 
 
 class LitigationCaseInsert(BaseModel):
@@ -106,6 +110,20 @@ class LitigationBulkInsertRequest(BaseModel):
     cases: List[LitigationCaseInsert]
 
 
+class LitigationImportError(BaseModel):
+    line: int = Field(..., description="1-based line number in the uploaded body")
+    detail: str
+
+
+class LitigationImportSummary(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    batches: int
+    errors: List[LitigationImportError] = []
+    errors_truncated: bool = False
+
+
 class PermissionUpdate(BaseModel):
     user_id: str
     permissions: List[str]
@@ -122,9 +140,86 @@ class AdminUserSummary(BaseModel):
     last_sign_in: Optional[datetime] = None
 
 
+class StatusTotals(BaseModel):
+    count: int
+    amount: float
+
+
+class CaseTotals(BaseModel):
+    count: int
+    amount: float
+    by_status: Dict[str, StatusTotals]
+
+
+class AccountTotals(BaseModel):
+    total: int
+    enabled: int
+    disabled: int
+
+
+class AdminStats(BaseModel):
+    user_id: Optional[str] = Field(None, description="Set when disputes and litigation totals are for a single user")
+    disputes: CaseTotals
+    litigation_cases: CaseTotals
+    accounts: AccountTotals
+
+
+class ProfilingConfig(BaseModel):
+    enabled: bool = False
+    mode: Literal["sampling", "cprofile"] = "sampling"
+    route: Optional[str] = Field(None, description="Route template to match, e.g. /litigation-cases")
+    method: Optional[str] = None
+    user_id: Optional[str] = Field(None, description="Only profile requests authenticated as this user")
+    header: Optional[str] = Field(None, description="`Name` or `Name: value` the request must carry")
+    sample_rate: float = Field(1.0, ge=0.0, le=1.0, description="Fraction of matching requests to profile")
+    max_concurrent: int = Field(1, ge=1, description="Profiles allowed to run at the same time")
+    interval_ms: float = Field(5.0, gt=0, description="Stack sampling interval in sampling mode")
+
+
+class ProfileSummary(BaseModel):
+    id: int
+    mode: Literal["sampling", "cprofile"]
+    method: str
+    path: str
+    route: Optional[str] = None
+    user_id: Optional[str] = None
+    status: int
+    started_at: datetime
+    duration_ms: float
+    samples: Optional[int] = None
+
+
+class ProfilingStatus(BaseModel):
+    config: ProfilingConfig
+    active: int
+    skipped_busy: int
+    profiles: List[ProfileSummary]
+
+
 class DocumentUploadResponse(BaseModel):
     documents: List[DisputeFileMetadata]
 
 
+class BatchRequestItem(BaseModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(..., regex=r"^/", description="Path and optional query string, e.g. /disputes?limit=20")
+    headers: Dict[str, str] = Field({}, description="Extra headers; the batch's Authorization is always used")
+    body: Optional[Any] = Field(None, description="JSON body sent with the sub-request")
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchRequestItem]
+
+
+class BatchResponseItem(BaseModel):
+    status: int
+    headers: Dict[str, str]
+    body: Optional[Any] = Field(None, description="Parsed JSON body, the text of any other body, or null when empty")
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchResponseItem]
+
+
 class HealthResponse(BaseModel):
     status: str = "ok"
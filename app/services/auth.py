@@ -2,10 +2,8 @@
 from __future__ import annotations
 
 import secrets
-from datetime import datetime, timedelta
-from typing import Tuple
-
-from jose import jwt
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
 
 from ..config import get_settings
 
@@ -14,17 +12,25 @@ def _generate_raw_token() -> str:
     return secrets.token_urlsafe(48)
 
 
+def _epoch(moment: datetime) -> float:
+    # Session datetimes are naive UTC; ``timestamp()`` alone would read them as local time.
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
 def issue_token_pair(user_id: str) -> Tuple[str, str, datetime, datetime]:
+    # python-jose loads its crypto backends on import; keep that off the cold-start path.
+    from jose import jwt
+
     settings = get_settings()
     now = datetime.utcnow()
-    payload = {"sub": user_id, "iat": now.timestamp()}
+    payload = {"sub": user_id, "iat": _epoch(now), "jti": _generate_raw_token()[:16]}
     access_exp = now + timedelta(minutes=settings.access_token_ttl_minutes)
     refresh_exp = now + timedelta(hours=settings.refresh_token_ttl_hours)
 
-    payload["exp"] = access_exp.timestamp()
+    payload["exp"] = _epoch(access_exp)
     access_token = jwt.encode(payload, settings.app_secret_key, algorithm="HS256")
 
-    refresh_payload = payload | {"exp": refresh_exp.timestamp(), "type": "refresh"}
+    refresh_payload = payload | {"exp": _epoch(refresh_exp), "type": "refresh"}
     refresh_token = jwt.encode(refresh_payload, settings.app_secret_key, algorithm="HS256")
     return access_token, refresh_token, access_exp, refresh_exp
 
@@ -32,3 +38,17 @@ def issue_token_pair(user_id: str) -> Tuple[str, str, datetime, datetime]:
 def issue_session(user_id: str):
     access, refresh, access_exp, refresh_exp = issue_token_pair(user_id)
     return access, refresh, access_exp, refresh_exp
+
+
+def verify_access_token(token: str) -> Optional[Dict[str, Any]]:
+    """Check an access token's signature and ``exp`` locally, returning its claims."""
+    from jose import JWTError, jwt
+
+    settings = get_settings()
+    try:
+        claims = jwt.decode(token, settings.app_secret_key, algorithms=["HS256"])
+    except JWTError:
+        return None
+    if claims.get("type") == "refresh" or "sub" not in claims:
+        return None
+    return claims
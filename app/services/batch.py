@@ -0,0 +1,147 @@
+"""In-process dispatch of the sub-requests in a ``POST /batch``.
+
+Each sub-request gets its own ASGI scope, copied from the batch request's
+connection details, and is run through the application's router
+concurrently with the others. Going to the router directly skips the
+middleware stack, so the dispatcher records each sub-request's metrics
+itself. The batch's principal travels in the scope under
+:data:`PRINCIPAL_SCOPE_KEY`, so sub-requests skip token verification and
+the session lookup unless the user's auth version has moved on since; their
+permission checks still run as usual.
+
+Sub-responses are collected in memory and spliced into one JSON document:
+JSON bodies are copied in as they were rendered rather than parsed and
+serialised again.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.types import Message
+
+from ..dependencies import PRINCIPAL_SCOPE_KEY
+from ..metrics import METRICS, UNMATCHED_ROUTE
+from ..responses import dumps
+from ..schemas import BatchRequestItem
+from .principals import CachedPrincipal
+
+logger = logging.getLogger(__name__)
+
+# Connection details and app state shared by every sub-request of a batch.
+INHERITED_SCOPE_KEYS = ("asgi", "http_version", "scheme", "server", "client", "root_path", "app", "state", "starlette.exception_handlers")
+# Streams never finish and a nested batch would multiply the fan-out.
+EXCLUDED_PATHS = ("/batch", "/events")
+_DROPPED_REQUEST_HEADERS = frozenset((b"authorization", b"content-length", b"content-type", b"host", b"transfer-encoding"))
+
+
+class SubResponse:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @classmethod
+    def error(cls, status: int, detail: Any, headers: Optional[Dict[str, str]] = None) -> SubResponse:
+        raw_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in (headers or {}).items()]
+        return cls(status, raw_headers + [(b"content-type", b"application/json")], dumps({"detail": detail}))
+
+    def render(self) -> bytes:
+        headers: Dict[str, str] = {}
+        content_type = ""
+        for name, value in self.headers:
+            if name == b"content-length":
+                continue
+            headers[name.decode("latin-1")] = value.decode("latin-1")
+            if name == b"content-type":
+                content_type = headers["content-type"]
+        if not self.body:
+            body = b"null"
+        elif content_type.startswith("application/json"):
+            body = self.body
+        else:
+            body = dumps(self.body.decode("utf-8", errors="replace"))
+        return b'{"status":%d,"headers":%s,"body":%s}' % (self.status, dumps(headers), body)
+
+
+def _sub_scope(request: Request, item: BatchRequestItem, principal: CachedPrincipal, body: bytes) -> Dict[str, Any]:
+    path, _, query = item.path.partition("?")
+    headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in item.headers.items()
+        if name.lower().encode("latin-1") not in _DROPPED_REQUEST_HEADERS
+    ]
+    headers.extend((name, value) for name, value in request.scope["headers"] if name in (b"authorization", b"host"))
+    if body:
+        headers.extend([(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("ascii"))])
+    scope = {key: request.scope[key] for key in INHERITED_SCOPE_KEYS if key in request.scope}
+    scope.update(
+        type="http",
+        method=item.method,
+        path=unquote(path),
+        raw_path=path.encode("latin-1"),
+        query_string=query.encode("latin-1"),
+        headers=headers,
+    )
+    scope[PRINCIPAL_SCOPE_KEY] = principal
+    return scope
+
+
+async def _dispatch_one(request: Request, item: BatchRequestItem, principal: CachedPrincipal) -> SubResponse:
+    path = item.path.partition("?")[0]
+    if any(path == excluded or path.startswith(excluded + "/") for excluded in EXCLUDED_PATHS):
+        return SubResponse.error(400, f"{path} cannot be called from a batch")
+
+    body = dumps(item.body) if item.body is not None else b""
+    scope = _sub_scope(request, item, principal, body)
+    status = 500
+    headers: List[Tuple[bytes, bytes]] = []
+    chunks: List[bytes] = []
+    pending = True
+
+    async def receive() -> Message:
+        nonlocal pending
+        if pending:
+            pending = False
+            return {"type": "http.request", "body": body, "more_body": False}
+        # There is no client connection to lose; park disconnect listeners until the response is done.
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status, headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    METRICS.request_started(item.method)
+    started = time.perf_counter()
+    try:
+        # Route handlers turn HTTPExceptions into responses; these come from the router itself (404, 405).
+        await request.app.router(scope, receive, send)
+        response = SubResponse(status, headers, b"".join(chunks))
+    except HTTPException as exc:
+        response = SubResponse.error(exc.status_code, exc.detail, exc.headers)
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", item.method, item.path)
+        response = SubResponse.error(500, "Internal Server Error")
+    route = scope.get("route")
+    METRICS.request_finished(
+        item.method, getattr(route, "path", UNMATCHED_ROUTE), response.status, time.perf_counter() - started, len(body), len(response.body)
+    )
+    return response
+
+
+async def dispatch(request: Request, items: List[BatchRequestItem], principal: CachedPrincipal) -> bytes:
+    """Run ``items`` concurrently as ``principal`` and return the rendered ``BatchResponse`` body."""
+    responses = await asyncio.gather(*(_dispatch_one(request, item, principal) for item in items))
+    return b'{"responses":[' + b",".join(response.render() for response in responses) + b"]}"
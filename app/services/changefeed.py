@@ -0,0 +1,313 @@
+"""Per-user change events pushed to clients over server-sent events.
+
+``ChangeFeed.start`` hooks :attr:`InMemoryDB.on_change`, so every insert,
+update and delete of a dispute or litigation case (through the routes, bulk
+uploads and imports alike) becomes one event for the owning user. Each event
+is serialised once into an SSE frame, kept in a replay ring of
+``SSE_REPLAY_EVENTS`` frames for clients reconnecting with
+``Last-Event-ID``, and appended to the buffer of each of the user's open
+streams.
+
+Buffers hold at most ``SSE_BUFFER_EVENTS`` frames. A stream that falls that
+far behind has its buffer replaced by a single ``reset`` event, which tells
+the client to catch up with ``?since=`` instead of receiving every frame it
+missed; a resume from an id that has left the replay ring gets the same.
+A single timer sends every stream a comment line each
+``SSE_HEARTBEAT_SECONDS`` that keeps proxies from closing it, and closes
+streams whose token has expired or whose sessions or access were revoked,
+so an idle stream costs no timer or task of its own beyond its disconnect
+watcher. The timer works through the streams in ``HEARTBEAT_SLICES``
+slices spread over the interval rather than waking all of them at once.
+
+Events only reach streams served by the process that made the write; with
+several workers, clients should still ``?since=`` after reconnecting.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import itertools
+import signal
+import threading
+import time
+import uuid
+from collections import deque
+from types import FrameType
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel
+from starlette.responses import Response
+from starlette.types import Message, Receive, Scope, Send
+
+from ..config import get_settings
+from ..database import DB, run_db
+from ..responses import dumps, row_encoder
+from ..schemas import Dispute, LitigationCase
+
+# Larger changes (bulk uploads, imports) are announced with a count; clients fetch them with ?since=.
+ROWS_PER_EVENT = 50
+HEARTBEAT_SLICES = 10
+_PING = b": ping\n\n"
+
+
+class Subscriber:
+    """One open event stream: a bounded frame buffer and the token it was opened with."""
+
+    __slots__ = ("user_id", "expires_at", "auth_version", "limit", "slot", "frames", "reset_id", "ping", "closed", "wake")
+
+    def __init__(self, user_id: str, expires_at: float, auth_version: int, limit: int, slot: int) -> None:
+        self.user_id = user_id
+        self.expires_at = expires_at
+        self.auth_version = auth_version
+        self.limit = limit
+        self.slot = slot
+        self.frames: Deque[bytes] = deque()
+        self.reset_id: Optional[str] = None
+        self.ping = False
+        self.closed = False
+        self.wake = asyncio.Event()
+
+    def push(self, event_id: str, frame: bytes) -> None:
+        if self.reset_id is not None or len(self.frames) >= self.limit:
+            # Coalesce everything the client has not read yet into one reset.
+            self.frames.clear()
+            self.reset_id = event_id
+        else:
+            self.frames.append(frame)
+        self.wake.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.wake.set()
+
+    def take(self) -> bytes:
+        """Return everything due to be written, or ``b""`` if nothing is."""
+        chunks: List[bytes] = []
+        if self.reset_id is not None:
+            chunks.append(_frame(self.reset_id, "reset", b"{}"))
+            self.reset_id = None
+        chunks.extend(self.frames)
+        self.frames.clear()
+        if self.ping and not chunks:
+            chunks.append(_PING)
+        self.ping = False
+        return b"".join(chunks)
+
+
+def _frame(event_id: str, event: str, data: bytes) -> bytes:
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode("ascii"), event.encode("ascii"), data)
+
+
+class ChangeFeed:
+    COLLECTIONS: Dict[str, Type[BaseModel]] = {"disputes": Dispute, "litigation_cases": LitigationCase}
+
+    def __init__(self, buffer_events: int, replay_events: int, heartbeat_seconds: float) -> None:
+        self.buffer_events = buffer_events
+        self.heartbeat_seconds = heartbeat_seconds
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.stats: Dict[str, int] = {"published": 0, "delivered": 0, "dropped": 0, "closed_stale": 0}
+        # Event ids restart with the process; the epoch makes a pre-restart Last-Event-ID fall back to a reset.
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self._replay: Deque[Tuple[int, str, bytes]] = deque(maxlen=replay_events)
+        self._evicted = 0
+        self._subscribed = 0
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # signum -> (our handler, the handler it wraps), restored by stop().
+        self._signal_handlers: Dict[int, Tuple[Callable[..., Any], Callable[..., Any]]] = {}
+
+    @property
+    def connections(self) -> int:
+        return sum(map(len, self.subscribers.values()))
+
+    # --- Lifecycle --------------------------------------------------------
+    async def start(self) -> None:
+        if self._heartbeat is None:
+            self._loop = asyncio.get_running_loop()
+            DB.on_change = self.record_change
+            self._heartbeat = asyncio.create_task(self._beat(), name="changefeed-heartbeat")
+            self._close_on_exit_signal()
+
+    def _close_on_exit_signal(self) -> None:
+        # uvicorn waits for open responses to finish before running the lifespan
+        # shutdown, so stop() would come too late to end the streams; they are
+        # ended as soon as the server is told to exit instead. The wrapped
+        # handlers are put back by stop(), so restarts do not stack wrappers.
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            previous = signal.getsignal(signum)
+            if not callable(previous):
+                continue
+
+            def handler(received: int, frame: Optional[FrameType], previous: Callable[..., Any] = previous) -> None:
+                loop = self._loop
+                if loop is not None and not loop.is_closed():
+                    loop.call_soon_threadsafe(self.close_all)
+                previous(received, frame)
+
+            signal.signal(signum, handler)
+            self._signal_handlers[signum] = (handler, previous)
+
+    def _restore_signal_handlers(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum, (handler, previous) in self._signal_handlers.items():
+            # Leave alone a handler someone installed on top of ours.
+            if signal.getsignal(signum) is handler:
+                signal.signal(signum, previous)
+        self._signal_handlers.clear()
+
+    def close_all(self) -> None:
+        for subscriber in self._all():
+            subscriber.close()
+
+    async def stop(self) -> None:
+        if self._heartbeat is None:
+            return
+        DB.on_change = None
+        self._heartbeat.cancel()
+        try:
+            await self._heartbeat
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat = None
+        self._restore_signal_handlers()
+        self._loop = None
+        self.close_all()
+
+    def _all(self) -> List[Subscriber]:
+        return [subscriber for subscribers in self.subscribers.values() for subscriber in subscribers]
+
+    async def _beat(self) -> None:
+        for tick in itertools.cycle(range(HEARTBEAT_SLICES)):
+            await asyncio.sleep(self.heartbeat_seconds / HEARTBEAT_SLICES)
+            due = [subscriber for subscriber in self._all() if subscriber.slot == tick]
+            versions = await run_db(self._auth_versions, {subscriber.user_id for subscriber in due})
+            now = time.time()
+            for subscriber in due:
+                if subscriber.expires_at <= now or versions[subscriber.user_id] != subscriber.auth_version:
+                    self.stats["closed_stale"] += 1
+                    subscriber.close()
+                else:
+                    subscriber.ping = True
+                    subscriber.wake.set()
+
+    @staticmethod
+    def _auth_versions(user_ids: Iterable[str]) -> Dict[str, int]:
+        return {user_id: DB.auth_version(user_id) for user_id in user_ids}
+
+    # --- Publishing -------------------------------------------------------
+    def record_change(self, table_name: str, op: str, rows: List[Any]) -> None:
+        # With a blocking backend, writes happen on worker threads; events are
+        # still encoded there but published on the loop that owns the streams.
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        publish = self.publish
+        if not on_loop and self._loop is not None:
+            publish = functools.partial(self._loop.call_soon_threadsafe, self.publish)
+        schema = self.COLLECTIONS.get(table_name)
+        if schema is None:
+            return
+        by_owner: Dict[str, List[Any]] = {}
+        for row in rows:
+            by_owner.setdefault(row["user_id"], []).append(row)
+        for user_id, owned in by_owner.items():
+            payload: Dict[str, Any] = {"collection": table_name, "op": op}
+            if len(owned) > ROWS_PER_EVENT:
+                payload["count"] = len(owned)
+            elif op == "delete":
+                payload["ids"] = [row["id"] for row in owned]
+            else:
+                payload["rows"] = [row_encoder(schema)(row) for row in owned]
+            publish(user_id, f"{table_name}.{op}", payload)
+
+    def publish(self, user_id: str, event: str, payload: Dict[str, Any]) -> None:
+        self.seq += 1
+        event_id = f"{self.epoch}.{self.seq}"
+        frame = _frame(event_id, event, dumps(payload))
+        if len(self._replay) == self._replay.maxlen:
+            self._evicted = self._replay[0][0]
+        self._replay.append((self.seq, user_id, frame))
+        self.stats["published"] += 1
+        for subscriber in self.subscribers.get(user_id, ()):
+            dropped = subscriber.reset_id is not None or len(subscriber.frames) >= subscriber.limit
+            self.stats["dropped" if dropped else "delivered"] += 1
+            subscriber.push(event_id, frame)
+
+    # --- Subscribing ------------------------------------------------------
+    def subscribe(self, user_id: str, expires_at: float, auth_version: int, last_event_id: Optional[str] = None) -> Subscriber:
+        """Open a stream for ``user_id``, queueing what it missed after ``last_event_id``."""
+        self._subscribed += 1
+        subscriber = Subscriber(user_id, expires_at, auth_version, self.buffer_events, self._subscribed % HEARTBEAT_SLICES)
+        if last_event_id is not None:
+            for event_id, frame in self._missed(user_id, last_event_id):
+                subscriber.push(event_id, frame)
+        self.subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def _missed(self, user_id: str, last_event_id: str) -> Iterable[Tuple[str, bytes]]:
+        epoch, _, seq = last_event_id.strip().partition(".")
+        current = f"{self.epoch}.{self.seq}"
+        if epoch != self.epoch or not seq.isdigit() or int(seq) < self._evicted:
+            return [(current, _frame(current, "reset", b"{}"))]
+        after = int(seq)
+        return [(f"{self.epoch}.{event_seq}", frame) for event_seq, owner, frame in self._replay if event_seq > after and owner == user_id]
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self.subscribers.get(subscriber.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.user_id]
+
+
+_settings = get_settings()
+CHANGE_FEED = ChangeFeed(_settings.sse_buffer_events, _settings.sse_replay_events, _settings.sse_heartbeat_seconds)
+
+
+class EventStreamResponse(Response):
+    """``text/event-stream`` response writing a subscriber's frames as they arrive.
+
+    Runs as a raw ASGI response rather than a ``StreamingResponse``, so an idle
+    stream is one waiting coroutine plus one task watching for the disconnect.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, feed: ChangeFeed, subscriber: Subscriber, retry_ms: int = 3000) -> None:
+        # Like ``StreamingResponse``, skip ``Response.__init__`` so no Content-Length is set.
+        self.status_code = 200
+        self.background = None
+        self.init_headers({"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        self.feed = feed
+        self.subscriber = subscriber
+        self.retry_ms = retry_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        subscriber = self.subscriber
+        watcher = asyncio.create_task(self._watch(receive))
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b"retry: %d\n\n" % self.retry_ms + subscriber.take(), "more_body": True})
+            while True:
+                await subscriber.wake.wait()
+                subscriber.wake.clear()
+                if subscriber.closed:
+                    break
+                body = subscriber.take()
+                if body:
+                    await send({"type": "http.response.body", "body": body, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            watcher.cancel()
+            self.feed.unsubscribe(subscriber)
+
+    async def _watch(self, receive: Receive) -> None:
+        message: Message = {}
+        while message.get("type") != "http.disconnect":
+            message = await receive()
+        self.subscriber.close()
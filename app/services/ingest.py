@@ -0,0 +1,210 @@
+"""Streaming NDJSON/CSV ingest for bulk litigation imports."""
+from __future__ import annotations
+
+import csv
+import json
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, List, Literal, Optional, Tuple
+
+from pydantic import ValidationError
+
+from ..config import get_settings
+from ..database import DB, run_db
+from ..schemas import LitigationCaseInsert, LitigationImportError, LitigationImportSummary
+
+IngestFormat = Literal["ndjson", "csv"]
+
+
+async def iter_lines(stream: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, str, Optional[str]]]:
+    """Yield ``(line_number, text, error)`` for each line of a chunked byte stream.
+
+    A line that is not valid UTF-8, or is longer than ``max_line_bytes``,
+    comes back with empty text and the reason in ``error`` so the caller can
+    report it and carry on. Bytes of an over-long line are dropped as they
+    arrive, so memory stays bounded by ``max_line_bytes`` however the body
+    is split.
+    """
+    buffer = b""
+    line_number = 0
+    too_long = False
+
+    def decode(raw: bytes) -> Tuple[int, str, Optional[str]]:
+        if too_long or len(raw) > max_line_bytes:
+            return line_number, "", f"Line longer than {max_line_bytes} bytes"
+        try:
+            return line_number, raw.decode("utf-8-sig" if line_number == 1 else "utf-8").rstrip("\r"), None
+        except UnicodeDecodeError as exc:
+            return line_number, "", f"Invalid UTF-8 at byte {exc.start}"
+
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            line_number += 1
+            yield decode(raw)
+            too_long = False
+        if len(buffer) > max_line_bytes:
+            too_long, buffer = True, b""
+    if buffer or too_long:
+        line_number += 1
+        yield decode(buffer)
+
+
+def _parse_ndjson(line: str) -> Dict[str, Any]:
+    row = json.loads(line)
+    if not isinstance(row, dict):
+        raise ValueError("Expected a JSON object")
+    return row
+
+
+class _RecordFeed:
+    """Line source for ``csv.DictReader``, filled from the request body as it arrives.
+
+    The reader is only advanced once the queued lines have balanced quotes,
+    so a quoted field spanning several lines reaches it as one record.
+    """
+
+    def __init__(self) -> None:
+        self.lines: Deque[str] = deque()
+        self.quotes = 0
+        self.size = 0
+        self.start = 0
+
+    @property
+    def balanced(self) -> bool:
+        return self.quotes % 2 == 0
+
+    def push(self, line_number: int, line: str) -> bool:
+        """Queue ``line``; returns True once the queued lines form a whole record."""
+        if not self.lines:
+            self.start = line_number
+            self.size = 0
+        self.lines.append(line + "\n")
+        self.quotes += line.count('"')
+        self.size += len(line) + 1
+        return self.balanced
+
+    def clear(self) -> None:
+        self.lines.clear()
+        self.quotes = 0
+        self.size = 0
+
+    def __iter__(self) -> "_RecordFeed":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+class _Importer:
+    def __init__(self, user_id: str) -> None:
+        settings = get_settings()
+        self.user_id = user_id
+        self.batch_size = settings.ingest_batch_size
+        self.max_errors = settings.ingest_max_reported_errors
+        self.max_line_bytes = settings.ingest_max_line_bytes
+        self.summary = LitigationImportSummary(received=0, inserted=0, failed=0, batches=0)
+        self.pending: List[Tuple[int, Dict[str, Any]]] = []
+
+    def fail(self, line: int, detail: str) -> None:
+        self.summary.failed += 1
+        if len(self.summary.errors) < self.max_errors:
+            self.summary.errors.append(LitigationImportError(line=line, detail=detail))
+        else:
+            self.summary.errors_truncated = True
+
+    async def add(self, line: int, row: Dict[str, Any]) -> None:
+        self.summary.received += 1
+        self.pending.append((line, row))
+        if len(self.pending) >= self.batch_size:
+            await run_db(self.flush)
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        created_at = datetime.utcnow()
+        records = []
+        for line, row in self.pending:
+            try:
+                case = LitigationCaseInsert.parse_obj(row)
+            except ValidationError as exc:
+                self.fail(line, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors()))
+                continue
+            records.append({"user_id": self.user_id, **case.dict(), "created_at": created_at})
+        self.pending = []
+        if records:
+            DB.insert_many(DB.litigation_cases, records)
+            self.summary.inserted += len(records)
+            self.summary.batches += 1
+
+
+async def _read_ndjson(importer: _Importer, stream: AsyncIterator[bytes]) -> None:
+    async for line_number, line, error in iter_lines(stream, importer.max_line_bytes):
+        if error is not None:
+            importer.summary.received += 1
+            importer.fail(line_number, error)
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = _parse_ndjson(line)
+        except ValueError as exc:
+            importer.summary.received += 1
+            importer.fail(line_number, str(exc))
+            continue
+        await importer.add(line_number, row)
+
+
+async def _read_csv(importer: _Importer, stream: AsyncIterator[bytes]) -> None:
+    feed = _RecordFeed()
+    reader = csv.DictReader(feed)
+    header = True
+    async for line_number, line, error in iter_lines(stream, importer.max_line_bytes):
+        if error is not None:
+            # An unreadable line spoils the whole record it belongs to.
+            importer.summary.received += 1
+            importer.fail(feed.start if feed.lines else line_number, error)
+            feed.clear()
+            continue
+        if feed.balanced and not line.strip():
+            continue
+        if not feed.push(line_number, line):
+            if feed.size > importer.max_line_bytes:
+                importer.summary.received += 1
+                importer.fail(feed.start, f"Quoted field longer than {importer.max_line_bytes} bytes")
+                feed.clear()
+            continue
+        try:
+            if header:
+                reader.fieldnames = [column.strip() for column in reader.fieldnames or []]
+                header = False
+                continue
+            row = next(reader)
+            # Cells beyond the header are collected under None; they are ignored.
+            row.pop(None, None)
+        except csv.Error as exc:
+            feed.clear()
+            importer.summary.received += 1
+            importer.fail(feed.start, str(exc))
+            continue
+        await importer.add(feed.start, row)
+    if feed.lines:
+        importer.summary.received += 1
+        importer.fail(feed.start, "Unterminated quoted field")
+
+
+async def import_cases(user_id: str, stream: AsyncIterator[bytes], fmt: IngestFormat) -> LitigationImportSummary:
+    """Validate and insert cases from an NDJSON or CSV body, one batch at a time.
+
+    Rows that fail to parse or validate are reported with their line number
+    (the first line of a CSV record) and skipped; valid rows are committed
+    per batch regardless.
+    """
+    importer = _Importer(user_id)
+    await (_read_csv if fmt == "csv" else _read_ndjson)(importer, stream)
+    await run_db(importer.flush)
+    importer.summary.errors.sort(key=lambda error: error.line)
+    return importer.summary
@@ -1,13 +1,195 @@
-"""Placeholder notification hooks."""
+"""Notification hooks backed by an asynchronous, coalescing dispatcher.
+
+Route handlers call ``notify_*`` which only enqueue an event. A background
+dispatcher groups each user's events over ``notification_coalesce_seconds``
+into one digest, fans it out to the channels enabled in the user's alert
+settings, and retries failed deliveries with exponential backoff.
+"""
 from __future__ import annotations
 
-from typing import Dict
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Protocol
+
+from ..config import get_settings
+from ..database import DB, run_db
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Event:
+    user_id: str
+    message: str
+
+
+@dataclass
+class Digest:
+    user_id: str
+    messages: List[str] = field(default_factory=list)
+
+    @property
+    def subject(self) -> str:
+        if len(self.messages) == 1:
+            return self.messages[0]
+        return f"{len(self.messages)} new updates"
+
+    @property
+    def body(self) -> str:
+        return "\n".join(f"- {message}" for message in self.messages)
+
+
+class Transport(Protocol):
+    async def send(self, channel: str, digest: Digest) -> None:
+        ...
+
+
+class LogTransport:
+    """Default transport; replace with an email/SMS provider integration."""
+
+    async def send(self, channel: str, digest: Digest) -> None:
+        print(f"[notifications] {channel} to {digest.user_id}: {digest.subject}")
+
+
+class FakeTransport:
+    """In-memory transport for tests: records deliveries, optionally failing first."""
+
+    def __init__(self, fail_times: int = 0, latency: float = 0.0) -> None:
+        self.fail_times = fail_times
+        self.latency = latency
+        self.attempts = 0
+        self.deliveries: List[tuple[str, Digest]] = []
+
+    async def send(self, channel: str, digest: Digest) -> None:
+        self.attempts += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError("fake transport failure")
+        self.deliveries.append((channel, digest))
+
+
+class NotificationDispatcher:
+    def __init__(self, transport: Transport) -> None:
+        self.transport = transport
+        self.stats: Dict[str, int] = {"enqueued": 0, "dropped": 0, "delivered": 0, "retried": 0, "failed": 0, "suppressed": 0}
+        self._events: Optional[asyncio.Queue[Event]] = None
+        self._digests: Optional[asyncio.Queue[Digest]] = None
+        self._pending: Dict[str, Digest] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        settings = get_settings()
+        self._events = asyncio.Queue(maxsize=settings.notification_queue_size)
+        self._digests = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._collect(), name="notifications-collector")]
+        self._tasks += [
+            asyncio.create_task(self._deliver_forever(), name=f"notifications-worker-{i}")
+            for i in range(settings.notification_workers)
+        ]
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """Flush everything queued or pending, wait for deliveries, then stop the workers."""
+        if not self.running:
+            return
+        timeout = get_settings().notification_drain_seconds if timeout is None else timeout
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Notification drain timed out with %d digests undelivered", self._digests.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, event: Event) -> bool:
+        if self._events is None or not self.running:
+            self.stats["dropped"] += 1
+            logger.debug("Notification dispatcher not running; dropping event for %s", event.user_id)
+            return False
+        try:
+            self._events.put_nowait(event)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning("Notification queue full; dropping event for %s", event.user_id)
+            return False
+        self.stats["enqueued"] += 1
+        return True
+
+    async def _drain(self) -> None:
+        await self._events.join()
+        for timer in self._timers.values():
+            timer.cancel()
+        for user_id in list(self._pending):
+            self._flush(user_id)
+        await self._digests.join()
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        window = get_settings().notification_coalesce_seconds
+        while True:
+            event = await self._events.get()
+            digest = self._pending.get(event.user_id)
+            if digest is None:
+                digest = self._pending[event.user_id] = Digest(event.user_id)
+                self._timers[event.user_id] = loop.call_later(window, self._flush, event.user_id)
+            digest.messages.append(event.message)
+            self._events.task_done()
+
+    def _flush(self, user_id: str) -> None:
+        self._timers.pop(user_id, None)
+        digest = self._pending.pop(user_id, None)
+        if digest is not None:
+            self._digests.put_nowait(digest)
+
+    async def _deliver_forever(self) -> None:
+        while True:
+            digest = await self._digests.get()
+            try:
+                await self._deliver(digest)
+            except Exception:
+                logger.exception("Unexpected error delivering notifications to %s", digest.user_id)
+            finally:
+                self._digests.task_done()
+
+    async def _deliver(self, digest: Digest) -> None:
+        alerts = await run_db(DB.alert_settings.get, digest.user_id, {})
+        channels = [channel for channel, key in (("email", "email_alerts"), ("sms", "sms_alerts")) if alerts.get(key)]
+        if not channels:
+            self.stats["suppressed"] += 1
+            return
+        settings = get_settings()
+        for channel in channels:
+            for attempt in range(1, settings.notification_max_attempts + 1):
+                try:
+                    await self.transport.send(channel, digest)
+                except Exception as exc:
+                    if attempt == settings.notification_max_attempts:
+                        self.stats["failed"] += 1
+                        logger.error("Giving up on %s notification to %s: %s", channel, digest.user_id, exc)
+                        break
+                    self.stats["retried"] += 1
+                    await asyncio.sleep(settings.notification_retry_base_seconds * 2 ** (attempt - 1))
+                else:
+                    self.stats["delivered"] += 1
+                    break
+
+
+DISPATCHER = NotificationDispatcher(LogTransport())
 
 
 def notify_dispute_created(dispute: Dict) -> None:
-    # Replace with email/SMS/queue integration
-    print(f"[notifications] Dispute created: {dispute['id']}")
+    DISPATCHER.enqueue(Event(dispute["user_id"], f"Dispute created: {dispute['title']} ({dispute['id']})"))
 
 
 def notify_litigation_uploaded(user_id: str, count: int) -> None:
-    print(f"[notifications] {count} litigation cases uploaded for {user_id}")
+    DISPATCHER.enqueue(Event(user_id, f"{count} litigation cases uploaded"))
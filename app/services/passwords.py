@@ -0,0 +1,119 @@
+"""Password hashing with scrypt, kept off the event loop.
+
+A KDF costs tens of milliseconds of CPU per call by design. Running it in
+the ``async def`` auth handlers would stall every other request for that
+long, so hashing and verification run on a small dedicated thread pool
+(``hashlib.scrypt`` releases the GIL) behind a semaphore that bounds how
+many operations may be queued or running at once. The semaphore and the
+queue count belong to the event loop they are used on, so a server or test
+client that starts a fresh loop gets fresh ones.
+
+Stored hashes look like ``scrypt$<n>$<r>$<p>$<salt>$<hash>`` (base64 salt and
+hash). Anything else is a legacy plaintext password; it still verifies, and
+``verify_password`` reports it as needing a rehash so sign-in can upgrade it.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from ..config import get_settings
+
+_PREFIX = "scrypt"
+_SALT_BYTES = 16
+_KEY_BYTES = 32
+
+_settings = get_settings()
+_hashers = ThreadPoolExecutor(max_workers=_settings.password_hash_workers, thread_name_prefix="password")
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when more hash operations are waiting than ``PASSWORD_HASH_MAX_PENDING`` allows."""
+
+
+class _Gate:
+    """Admission state for one event loop: asyncio primitives cannot cross loops."""
+
+    def __init__(self) -> None:
+        self.slots = asyncio.Semaphore(_settings.password_hash_workers)
+        self.pending = 0
+
+
+_gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Gate]" = weakref.WeakKeyDictionary()
+
+
+def _gate() -> _Gate:
+    loop = asyncio.get_running_loop()
+    gate = _gates.get(loop)
+    if gate is None:
+        gate = _gates[loop] = _Gate()
+    return gate
+
+
+def _params() -> Tuple[int, int, int]:
+    return _settings.password_scrypt_n, _settings.password_scrypt_r, _settings.password_scrypt_p
+
+
+def _derive(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024, dklen=_KEY_BYTES)
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+
+def hash_password_sync(password: str) -> str:
+    n, r, p = _params()
+    salt = secrets.token_bytes(_SALT_BYTES)
+    return "$".join((_PREFIX, str(n), str(r), str(p), _b64(salt), _b64(_derive(password, salt, n, r, p))))
+
+
+def verify_password_sync(stored: str, password: str) -> Tuple[bool, bool]:
+    """Return ``(matches, needs_rehash)`` for a stored hash or legacy plaintext."""
+    parts = stored.split("$")
+    if len(parts) != 6 or parts[0] != _PREFIX:
+        return hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8")), True
+    n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+    expected = base64.b64decode(parts[5])
+    matches = hmac.compare_digest(_derive(password, base64.b64decode(parts[4]), n, r, p), expected)
+    return matches, (n, r, p) != _params()
+
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith(_PREFIX + "$")
+
+
+async def _run(fn: Callable[..., Any], *args: Any) -> Any:
+    gate = _gate()
+    if gate.pending >= _settings.password_hash_max_pending:
+        raise PasswordHasherBusy("Too many password operations in flight")
+    gate.pending += 1
+    try:
+        async with gate.slots:
+            return await asyncio.get_running_loop().run_in_executor(_hashers, fn, *args)
+    finally:
+        gate.pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(hash_password_sync, password)
+
+
+async def verify_password(stored: Optional[str], password: str) -> Tuple[bool, bool]:
+    """Check ``password`` against ``stored`` without blocking the event loop.
+
+    ``stored=None`` (unknown account) still spends one hash so response
+    timing does not reveal which emails are registered.
+    """
+    if stored is None:
+        await _run(hash_password_sync, password)
+        return False, False
+    if not is_hashed(stored):
+        return verify_password_sync(stored, password)
+    return await _run(verify_password_sync, stored, password)
@@ -0,0 +1,96 @@
+"""Permission names interned to bits, with per-user masks for the auth path."""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..config import get_settings
+from ..database import DB
+
+# Every bit set: ``ALL & required == required`` for any ``required``.
+ALL_PERMISSIONS = -1
+
+
+class PermissionRegistry:
+    """Interns permission names into bit positions and caches a mask per user.
+
+    Masks are loaded from ``DB.permissions`` the first time a user is
+    authorized and kept alongside the user's auth version, which every
+    permission write bumps (in every worker process, with the SQL backend),
+    so checking a request is one ``&`` and one comparison against a
+    precomputed mask. Only the ``max_entries`` most recently used masks are
+    kept. With the SQL backend checks run on worker threads, so new bits and
+    the mask cache are guarded by a lock.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._bits: Dict[str, int] = {}
+        self._masks: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bit(self, name: str) -> int:
+        bit = self._bits.get(name)
+        if bit is None:
+            with self._lock:
+                bit = self._bits.get(name)
+                if bit is None:
+                    bit = self._bits[name] = 1 << len(self._bits)
+        return bit
+
+    def mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            mask |= self.bit(name)
+        return mask
+
+    def names(self, mask: int) -> List[str]:
+        with self._lock:
+            bits = list(self._bits.items())
+        return [name for name, bit in bits if mask & bit]
+
+    def user_mask(self, user: Dict) -> int:
+        version = DB.auth_version(user["id"])
+        with self._lock:
+            entry = self._masks.get(user["id"])
+            if entry is not None and entry[0] == version:
+                self._masks.move_to_end(user["id"])
+                return entry[1]
+        mask = self._load(user["id"], user.get("email"))
+        self._store(user["id"], version, mask)
+        return mask
+
+    def assign(self, user_id: str, names: Iterable[str], email: Optional[str] = None) -> None:
+        mask = ALL_PERMISSIONS if _is_default_admin(email) else self.mask(names)
+        self._store(user_id, DB.auth_version(user_id), mask)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._masks.clear()
+
+    def _store(self, user_id: str, version: int, mask: int) -> None:
+        with self._lock:
+            self._masks[user_id] = (version, mask)
+            self._masks.move_to_end(user_id)
+            while len(self._masks) > self.max_entries:
+                self._masks.popitem(last=False)
+
+    def _load(self, user_id: str, email: Optional[str]) -> int:
+        if _is_default_admin(email):
+            return ALL_PERMISSIONS
+        return self.mask(DB.permissions.get(user_id, []))
+
+
+def _is_default_admin(email: Optional[str]) -> bool:
+    return email is not None and email == get_settings().default_admin_email
+
+
+def set_user_permissions(user_id: str, permissions: List[str]) -> None:
+    """Persist ``permissions`` for ``user_id`` and refresh their cached mask."""
+    DB.set_permissions(user_id, permissions)
+    user = DB.users.get(user_id)
+    PERMISSIONS.assign(user_id, permissions, user["email"] if user else None)
+
+
+PERMISSIONS = PermissionRegistry(get_settings().principal_cache_size)
@@ -0,0 +1,97 @@
+"""Bounded LRU cache of verified principals for the auth hot path."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from ..config import get_settings
+
+
+class CachedPrincipal(NamedTuple):
+    session: Dict[str, Any]
+    user: Optional[Dict[str, Any]]
+    expires_at: float
+    version: int
+
+
+class PrincipalCache:
+    """Token -> principal cache validated against per-user auth versions.
+
+    An entry is only served while its token's ``exp`` lies in the future and
+    the owning user's auth version still matches the one it was cached under;
+    sign-out, access toggles and permission changes bump that version.
+    With the SQL backend lookups run on worker threads, so entries are
+    guarded by a lock.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedPrincipal]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str, version_of: Callable[[str], int], now: Optional[float] = None) -> Optional[CachedPrincipal]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        now = time.time() if now is None else now
+        if entry.expires_at <= now or entry.version != version_of(entry.session["user_id"]):
+            with self._lock:
+                if self._entries.pop(token, None) is not None:
+                    self.stale += 1
+            return None
+        with self._lock:
+            if token in self._entries:
+                self._entries.move_to_end(token)
+        return entry
+
+    def put(self, token: str, entry: CachedPrincipal) -> None:
+        with self._lock:
+            self._entries[token] = entry
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def record(self, hit: bool, elapsed: float) -> None:
+        if hit:
+            self.hits += 1
+            self.hit_seconds += elapsed
+        else:
+            self.misses += 1
+            self.miss_seconds += elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_hit_us": self.hit_seconds / self.hits * 1e6 if self.hits else 0.0,
+            "avg_miss_us": self.miss_seconds / self.misses * 1e6 if self.misses else 0.0,
+        }
+
+
+PRINCIPALS = PrincipalCache(get_settings().principal_cache_size)
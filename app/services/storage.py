@@ -1,32 +1,228 @@
-"""Local disk storage stub."""
+"""Local disk storage stub.
+
+Two layouts are supported, selected by ``Settings.storage_mode``:
+
+* ``path`` writes each upload to ``bucket/<user_id>/<filename>``.
+* ``content`` stores each distinct payload once under
+  ``bucket/blobs/<aa>/<sha256>``, reference counted in ``DB.blobs``; a
+  re-upload of known content skips the disk write entirely.
+"""
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
 
 from fastapi import UploadFile
 
 from ..config import get_settings
+from ..database import DB, run_db
 from ..schemas import DisputeFileMetadata
 
+_writers = ThreadPoolExecutor(max_workers=get_settings().storage_upload_workers, thread_name_prefix="storage")
+_TEMP_PREFIX = ".upload-"
+# Held around blob renames and GC unlinks so the sweep cannot delete a blob being put in place.
+_blob_lock = threading.Lock()
+# Untracked blobs and temp files younger than this may belong to an upload in flight.
+_GC_GRACE_SECONDS = 3600
+
+
+def blobs_dir() -> Path:
+    return Path(get_settings().storage_bucket) / "blobs"
+
+
+def blob_path(digest: str) -> Path:
+    return blobs_dir() / digest[:2] / digest
+
+
+def _spool(source: BinaryIO, directory: Path, chunk_bytes: int) -> Tuple[str, int, str]:
+    """Copy ``source`` into a temp file in ``directory`` chunk by chunk.
+
+    Returns the temp file name with the payload's size and SHA-256.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_name = tempfile.mkstemp(dir=directory, prefix=_TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            while chunk := source.read(chunk_bytes):
+                handle.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+            handle.flush()
+            os.fsync(handle.fileno())
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+    return temp_name, size, digest.hexdigest()
+
+
+def _stream_to_disk(source: BinaryIO, target_path: Path, chunk_bytes: int) -> Tuple[int, str]:
+    """Stream ``source`` to ``target_path``, returning its size and SHA-256.
+
+    Data lands in a temp file next to the target and is renamed into place, so
+    readers never observe a partially written upload.
+    """
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_name, size, digest = _spool(source, target_path.parent, chunk_bytes)
+    os.replace(temp_name, target_path)
+    return size, digest
+
+
+def _spool_blob(source: BinaryIO, chunk_bytes: int) -> Tuple[str, int, str]:
+    directory = blobs_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    return _spool(source, directory, chunk_bytes)
+
+
+def _place_blob(temp_name: str, digest: str) -> None:
+    """Rename a spooled blob into place, serialised with the GC's unlinks."""
+    target_path = blob_path(digest)
+    target_path.parent.mkdir(exist_ok=True)
+    with _blob_lock:
+        os.replace(temp_name, target_path)
+
+
+def _hash_stream(source: BinaryIO, chunk_bytes: int) -> Tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := source.read(chunk_bytes):
+        digest.update(chunk)
+        size += len(chunk)
+    source.seek(0)
+    return size, digest.hexdigest()
+
 
-def save_files(user_id: str, files: Iterable[UploadFile]) -> List[DisputeFileMetadata]:
+async def _save_blob(source: BinaryIO, chunk_bytes: int) -> Tuple[int, str]:
+    # The reference is always taken before the blob is renamed into place, so a
+    # GC pass never finds a blob on disk that is untracked but in use.
+    loop = asyncio.get_running_loop()
+    if getattr(source, "seekable", lambda: False)():
+        size, digest = await loop.run_in_executor(_writers, _hash_stream, source, chunk_bytes)
+        if not await run_db(DB.retain_blob, digest, size):
+            return size, digest
+        temp_name = None
+        try:
+            temp_name, _, _ = await loop.run_in_executor(_writers, _spool_blob, source, chunk_bytes)
+            await loop.run_in_executor(_writers, _place_blob, temp_name, digest)
+        except BaseException:
+            await run_db(DB.release_blob, digest)
+            if temp_name is not None:
+                Path(temp_name).unlink(missing_ok=True)
+            raise
+        return size, digest
+
+    temp_name, size, digest = await loop.run_in_executor(_writers, _spool_blob, source, chunk_bytes)
+    if not await run_db(DB.retain_blob, digest, size):
+        await loop.run_in_executor(_writers, os.unlink, temp_name)
+        return size, digest
+    try:
+        await loop.run_in_executor(_writers, _place_blob, temp_name, digest)
+    except BaseException:
+        await run_db(DB.release_blob, digest)
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+    return size, digest
+
+
+async def save_files(user_id: str, files: Iterable[UploadFile]) -> List[DisputeFileMetadata]:
     settings = get_settings()
-    bucket = Path(settings.storage_bucket)
-    bucket.mkdir(parents=True, exist_ok=True)
-
-    saved: List[DisputeFileMetadata] = []
-    for file in files:
-        user_dir = bucket / user_id
-        user_dir.mkdir(exist_ok=True)
-        target_path = user_dir / file.filename
-        content = file.file.read()
-        target_path.write_bytes(content)
-        saved.append(
-            DisputeFileMetadata(
-                filename=file.filename,
-                url=f"/storage/{user_id}/{file.filename}",
-                size_bytes=len(content),
+    user_dir = Path(settings.storage_bucket) / user_id
+    loop = asyncio.get_running_loop()
+
+    async def save(file: UploadFile) -> DisputeFileMetadata:
+        filename = Path(file.filename or "upload").name
+        storage_key = None
+        if settings.storage_mode == "content":
+            size, sha256 = await _save_blob(file.file, settings.storage_chunk_bytes)
+            storage_key = sha256
+        else:
+            size, sha256 = await loop.run_in_executor(
+                _writers, _stream_to_disk, file.file, user_dir / filename, settings.storage_chunk_bytes
             )
+        return DisputeFileMetadata(
+            filename=filename,
+            url=f"/storage/{user_id}/{filename}",
+            size_bytes=size,
+            sha256=sha256,
+            storage_key=storage_key,
         )
-    return saved
+
+    return list(await asyncio.gather(*(save(file) for file in files)))
+
+
+def find_document(user_id: str, filename: str) -> Optional[Tuple[Path, Dict[str, Any]]]:
+    """Locate the latest document named ``filename`` on one of the user's disputes."""
+    match = None
+    for dispute in DB.find_by(DB.disputes, "user_id", user_id):
+        for document in dispute.get("documents", []):
+            if document["filename"] == filename:
+                match = document
+    if match is None:
+        return None
+    if match.get("storage_key"):
+        return blob_path(match["storage_key"]), match
+    return Path(get_settings().storage_bucket) / user_id / filename, match
+
+
+def release_documents(documents: Iterable[Dict[str, Any]]) -> None:
+    """Drop the blob references held by a dispute's documents."""
+    for document in documents:
+        if document.get("storage_key"):
+            DB.release_blob(document["storage_key"])
+
+
+def _unlink_untracked(path: Path) -> Optional[int]:
+    """Unlink ``path`` unless ``DB.blobs`` tracks it, returning the bytes freed."""
+    with _blob_lock:
+        if path.name in DB.blobs:
+            return None
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return None
+    return size
+
+
+def _sweep(orphans: List[str]) -> Tuple[int, int]:
+    reclaimed = reclaimed_bytes = 0
+    for digest in orphans:
+        reclaimed_bytes += _unlink_untracked(blob_path(digest)) or 0
+
+    directory = blobs_dir()
+    if directory.exists():
+        cutoff = time.time() - _GC_GRACE_SECONDS
+        for path in directory.glob("**/*"):
+            if not path.is_file() or path.stat().st_mtime >= cutoff:
+                continue
+            freed = _unlink_untracked(path)
+            if freed is not None:
+                reclaimed_bytes += freed
+                reclaimed += 1
+    return reclaimed, reclaimed_bytes
+
+
+async def collect_garbage() -> Dict[str, int]:
+    """Delete unreferenced blobs and abandoned temp files from the blob store.
+
+    Orphaned references are dropped through ``run_db``; the bucket walk and
+    the unlinks run on the storage pool. Each unlink re-checks ``DB.blobs``
+    under the lock that blob renames take, so a blob uploaded again while
+    the sweep runs is kept.
+    """
+    def drop_orphans() -> List[str]:
+        orphans = [blob["digest"] for blob in DB.orphaned_blobs()]
+        for digest in orphans:
+            DB.delete(DB.blobs, digest)
+        return orphans
+
+    orphans = await run_db(drop_orphans)
+    swept, reclaimed_bytes = await asyncio.get_running_loop().run_in_executor(_writers, _sweep, orphans)
+    return {"reclaimed": len(orphans) + swept, "reclaimed_bytes": reclaimed_bytes}
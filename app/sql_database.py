@@ -0,0 +1,793 @@
+"""SQL-backed implementation of the ``InMemoryDB`` interface.
+
+Selected with ``DATABASE_BACKEND=sql``. Tables expose the same mapping-style
+reads the routes already use (``get``, ``[]``, ``items``), while writes go
+through the ``InMemoryDB`` methods, which are overridden here to issue SQL.
+Statements are built once per table so SQLAlchemy's compiled cache and the
+sqlite3 statement cache can reuse them as prepared statements.
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import (
+    DDL,
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    bindparam,
+    create_engine,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    literal_column,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateColumn
+
+from .config import Settings, get_settings
+from .database import ChangeSet, ChangesExpired, InMemoryDB, VersionConflict, normalize_email
+
+metadata = MetaData()
+
+users_table = Table(
+    "users",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("email", String, nullable=False),
+    Column("email_normalized", String, nullable=False, unique=True),
+    Column("full_name", String, nullable=False),
+    Column("password", String, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Column("is_enabled", Boolean, nullable=False, default=True),
+)
+
+profiles_table = Table(
+    "profiles",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("full_name", String, nullable=False),
+    Column("avatar_url", String),
+    Column("is_enabled", Boolean, nullable=False, default=True),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Column("version", Integer, nullable=False, server_default="1"),
+    Index("ix_profiles_created_at_user_id", "created_at", "user_id"),
+)
+
+alert_settings_table = Table(
+    "alert_settings",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("email_alerts", Boolean, nullable=False, default=True),
+    Column("sms_alerts", Boolean, nullable=False, default=False),
+    Column("version", Integer, nullable=False, server_default="1"),
+)
+
+disputes_table = Table(
+    "disputes",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, nullable=False),
+    Column("title", String, nullable=False),
+    Column("status", String, nullable=False),
+    Column("amount", Float, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("documents", JSON, nullable=False, default=list),
+    Column("version", Integer, nullable=False, server_default="1"),
+    # Serves both per-owner lookups and keyset pages ordered by (created_at, id).
+    Index("ix_disputes_user_id_created_at_id", "user_id", "created_at", "id"),
+)
+
+litigation_cases_table = Table(
+    "litigation_cases",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, nullable=False),
+    Column("docket_number", String, nullable=False, index=True),
+    Column("case_name", String, nullable=False),
+    Column("status", String, nullable=False),
+    Column("amount", Float, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("version", Integer, nullable=False, server_default="1"),
+    Index("ix_litigation_cases_user_id_created_at_id", "user_id", "created_at", "id"),
+)
+
+permissions_table = Table(
+    "permissions",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("permissions", JSON, nullable=False),
+)
+
+sessions_table = Table(
+    "sessions",
+    metadata,
+    Column("access_token", String, primary_key=True),
+    Column("refresh_token", String, nullable=False, unique=True),
+    Column("user_id", String, nullable=False, index=True),
+    Column("expires_at", DateTime, nullable=False),
+    Column("refresh_expires_at", DateTime, nullable=False, index=True),
+)
+
+blobs_table = Table(
+    "blobs",
+    metadata,
+    Column("digest", String, primary_key=True),
+    Column("size_bytes", Integer, nullable=False),
+    Column("ref_count", Integer, nullable=False),
+)
+
+# One row per insert, update or delete of an owned row, behind list ETags and
+# ``?since=`` delta sync; see ``ChangeLog`` in database.py.
+change_log_table = Table(
+    "change_log",
+    metadata,
+    Column("seq", Integer, primary_key=True, autoincrement=True),
+    Column("table_name", String, nullable=False),
+    Column("owner", String, nullable=False),
+    Column("row_key", String, nullable=False),
+    Column("deleted", Boolean, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Index("ix_change_log_table_name_owner_seq", "table_name", "owner", "seq"),
+    Index("ix_change_log_table_name_created_at", "table_name", "created_at"),
+    sqlite_autoincrement=True,
+)
+
+# Highest ``change_log.seq`` compacted away per table; older sync cursors are expired.
+sync_horizons_table = Table(
+    "sync_horizons",
+    metadata,
+    Column("table_name", String, primary_key=True),
+    Column("seq", Integer, nullable=False),
+)
+
+# One row per auth version bump; AUTOINCREMENT keeps ``seq`` from being reused after compaction.
+auth_events_table = Table(
+    "auth_events",
+    metadata,
+    Column("seq", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", String, nullable=False),
+    Column("created_at", DateTime, nullable=False, index=True),
+    sqlite_autoincrement=True,
+)
+
+
+class SqlTable:
+    """Mapping-style view of a SQL table keyed by one column."""
+
+    COMPACT_INTERVAL_SECONDS = 60
+
+    def __init__(
+        self,
+        engine: Engine,
+        table: Table,
+        key: str = "id",
+        computed: Optional[Dict[str, Tuple[str, Callable[[Any], Any]]]] = None,
+        owner_field: Optional[str] = None,
+        retention_seconds: float = 7 * 24 * 3600,
+    ) -> None:
+        self.engine = engine
+        self.table = table
+        self.key = key
+        # Writes append to ``change_log`` in the same transaction.
+        self.owner_field = owner_field
+        self.retention_seconds = retention_seconds
+        self._last_compaction: Optional[datetime] = None
+        self.versioned = "version" in table.c
+        # Extra columns derived from a field on write, e.g. a normalized email for lookups.
+        self.computed = computed or {}
+        hidden = {column for column, _ in self.computed.values()}
+        self.columns = [column for column in table.c if column.name not in hidden]
+        self.key_column = table.c[key]
+        # Preserve insertion order like the dict-backed tables do.
+        self.order = literal_column("rowid") if engine.dialect.name == "sqlite" else self.key_column
+        self._select_one = select(*self.columns).where(self.key_column == bindparam("key"))
+        self._select_all = select(*self.columns).order_by(self.order)
+        self._count = select(func.count()).select_from(table)
+        self._insert = insert(table)
+        self._delete = delete(table).where(self.key_column == bindparam("key"))
+        self._find: Dict[str, Any] = {}
+        self._page: Dict[Tuple[Optional[str], bool], Any] = {}
+        self._select_many = select(*self.columns).where(self.key_column.in_(bindparam("keys", expanding=True)))
+        log, horizons = change_log_table.c, sync_horizons_table.c
+        owned = and_(log.table_name == table.name, log.owner == bindparam("owner_key"))
+        self._horizon = select(horizons.seq).where(horizons.table_name == table.name)
+        self._stamp = select(func.coalesce(func.max(log.seq), self._horizon.scalar_subquery(), 0)).where(owned)
+        self._head = select(func.coalesce(func.max(log.seq), self._horizon.scalar_subquery(), 0)).where(
+            log.table_name == table.name
+        )
+        self._changes = (
+            select(log.seq, log.row_key, log.deleted)
+            .where(owned, log.seq > bindparam("since"), log.seq <= bindparam("head"))
+            .order_by(log.seq)
+        )
+        self._log_change = insert(change_log_table).values(table_name=table.name)
+        self._compactable = select(func.max(log.seq)).where(log.table_name == table.name, log.created_at < bindparam("before"))
+        self._drop_changes = delete(change_log_table).where(log.table_name == table.name, log.seq <= bindparam("floor"))
+        self._raise_horizon = update(sync_horizons_table).where(horizons.table_name == table.name).values(seq=bindparam("floor"))
+        self._insert_horizon = insert(sync_horizons_table).values(table_name=table.name)
+
+    @contextmanager
+    def begin(self, conn: Optional[Connection] = None) -> Iterator[Connection]:
+        if conn is not None:
+            yield conn
+            return
+        try:
+            with self.engine.begin() as conn:
+                yield conn
+        except IntegrityError as exc:
+            raise ValueError(f"Integrity error on {self.table.name}: {exc.orig}") from exc
+
+    def values_for(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        values = {name: value for name, value in payload.items() if name in self.table.c}
+        for field, (column, transform) in self.computed.items():
+            if field in payload:
+                values[column] = transform(payload[field])
+        return values
+
+    # --- Reads ------------------------------------------------------------
+    def get(self, key: str, default: Any = None) -> Any:
+        with self.engine.connect() as conn:
+            row = conn.execute(self._select_one, {"key": key}).mappings().first()
+        return dict(row) if row is not None else default
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        row = self.get(key)
+        if row is None:
+            raise KeyError(key)
+        return row
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(self._count).scalar_one()
+
+    def values(self) -> List[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(self._select_all).mappings()]
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return [(row[self.key], row) for row in self.values()]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([key for key, _ in self.items()])
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        statement = self._find.get(field)
+        if statement is None:
+            column_name = self.computed[field][0] if field in self.computed else field
+            statement = select(*self.columns).where(self.table.c[column_name] == bindparam("value")).order_by(self.order)
+            self._find[field] = statement
+        if field in self.computed:
+            value = self.computed[field][1](value)
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(statement, {"value": value}).mappings()]
+
+    def page(self, field: Optional[str], value: Any, after: Optional[Tuple[datetime, str]], limit: int) -> List[Dict[str, Any]]:
+        """Keyset page ordered by ``(created_at, key)``; see ``InMemoryDB.page_by``."""
+        statement = self._page.get((field, after is not None))
+        if statement is None:
+            created_at = self.table.c.created_at
+            statement = select(*self.columns).order_by(created_at, self.key_column).limit(bindparam("limit"))
+            if field is not None:
+                statement = statement.where(self.table.c[field] == bindparam("value"))
+            if after is not None:
+                statement = statement.where(
+                    or_(
+                        created_at > bindparam("after_created_at"),
+                        and_(created_at == bindparam("after_created_at"), self.key_column > bindparam("after_key")),
+                    )
+                )
+            self._page[(field, after is not None)] = statement
+        params: Dict[str, Any] = {"limit": limit, "value": value}
+        if after is not None:
+            params["after_created_at"], params["after_key"] = after
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(statement, params).mappings()]
+
+    # --- Change log ---------------------------------------------------------
+    def stamp(self, owner: str) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(self._stamp, {"owner_key": owner}).scalar_one()
+
+    def head(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(self._head).scalar_one()
+
+    def changes(self, owner: str, since: int, limit: int) -> Tuple[List[Tuple[str, bool]], int, bool]:
+        """Same contract as ``ChangeLog.since``; the log is deduplicated to the latest entry per row here."""
+        with self.engine.connect() as conn:
+            # Reading the head first bounds the scan, so a write committed meanwhile is left for the next call.
+            head = conn.execute(self._head).scalar_one()
+            latest: Dict[str, Tuple[int, bool]] = {}
+            for seq, key, deleted in conn.execute(self._changes, {"owner_key": owner, "since": since, "head": head}):
+                latest.pop(key, None)
+                latest[key] = (seq, deleted)
+            floor = conn.execute(self._horizon).scalar() or 0
+        if since < floor:
+            raise ChangesExpired(f"Changes before {floor} have been compacted")
+        found = list(latest.items())
+        if len(found) > limit:
+            found = found[:limit]
+            return [(key, deleted) for key, (_, deleted) in found], found[-1][1][0], True
+        return [(key, deleted) for key, (_, deleted) in found], max(since, head), False
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not keys:
+            return {}
+        with self.engine.connect() as conn:
+            return {row[self.key]: dict(row) for row in conn.execute(self._select_many, {"keys": keys}).mappings()}
+
+    def _touch(self, conn: Connection, rows: Iterable[Any], deleted: bool = False) -> None:
+        if self.owner_field is None:
+            return
+        now = datetime.utcnow()
+        entries = [{"owner": row[self.owner_field], "row_key": row[self.key], "deleted": deleted, "created_at": now} for row in rows]
+        conn.execute(self._log_change, entries)
+        if self._last_compaction is None or (now - self._last_compaction).total_seconds() >= self.COMPACT_INTERVAL_SECONDS:
+            self._last_compaction = now
+            floor = conn.execute(self._compactable, {"before": now - timedelta(seconds=self.retention_seconds)}).scalar()
+            if floor is not None:
+                conn.execute(self._drop_changes, {"floor": floor})
+                if not conn.execute(self._raise_horizon, {"floor": floor}).rowcount:
+                    conn.execute(self._insert_horizon, {"seq": floor})
+
+    # --- Writes -----------------------------------------------------------
+    def insert(self, payload: Dict[str, Any], conn: Optional[Connection] = None) -> Dict[str, Any]:
+        if self.versioned:
+            payload.setdefault("version", 1)
+        with self.begin(conn) as conn:
+            conn.execute(self._insert, self.values_for(payload))
+            self._touch(conn, [payload])
+        return payload
+
+    def insert_many(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if payloads:
+            if self.versioned:
+                for payload in payloads:
+                    payload.setdefault("version", 1)
+            with self.begin() as conn:
+                conn.execute(self._insert, [self.values_for(payload) for payload in payloads])
+                self._touch(conn, payloads)
+        return payloads
+
+    def update(
+        self, key: str, changes: Dict[str, Any], conn: Optional[Connection] = None, expected_version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        values = self.values_for(changes)
+        values.pop(self.key, None)
+        if not values:
+            return self.get(key)
+        statement = update(self.table).where(self.key_column == key)
+        if self.versioned:
+            values["version"] = self.table.c.version + 1
+            if expected_version is not None:
+                statement = statement.where(self.table.c.version == expected_version)
+        statement = statement.values(**values).returning(*self.columns)
+        with self.begin(conn) as conn:
+            row = conn.execute(statement).mappings().first()
+            if row is None:
+                if expected_version is not None and key in self:
+                    raise VersionConflict(f"{key} is no longer at version {expected_version}")
+                return None
+            self._touch(conn, [row])
+        return dict(row)
+
+    def upsert(self, key: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self.begin() as conn:
+            row = self.update(key, payload, conn) if key in self else None
+            if row is None:
+                self.insert({**payload, self.key: key}, conn)
+        return self[key]
+
+    def delete(self, key: str, expected_version: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Delete the row under ``key``, returning it (an empty list if there was none)."""
+        statement = self._delete
+        if expected_version is not None:
+            statement = statement.where(self.table.c.version == expected_version)
+        with self.begin() as conn:
+            rows = conn.execute(statement.returning(*self.columns), {"key": key}).mappings().all()
+            if not rows:
+                if expected_version is not None and key in self:
+                    raise VersionConflict(f"{key} is no longer at version {expected_version}")
+                return []
+            self._touch(conn, rows, deleted=True)
+        return [dict(row) for row in rows]
+
+
+class SqlPermissions:
+    """``user_id -> [permission]`` mapping stored as JSON rows."""
+
+    def __init__(self, engine: Engine) -> None:
+        self.rows = SqlTable(engine, permissions_table, key="user_id")
+
+    def get(self, user_id: str, default: Any = None) -> Any:
+        row = self.rows.get(user_id)
+        return row["permissions"] if row is not None else default
+
+    def __getitem__(self, user_id: str) -> List[str]:
+        return self.get(user_id, [])
+
+    def __setitem__(self, user_id: str, permissions: List[str]) -> None:
+        self.rows.upsert(user_id, {"permissions": list(permissions)})
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self.rows
+
+    def items(self) -> List[Tuple[str, List[str]]]:
+        return [(user_id, row["permissions"]) for user_id, row in self.rows.items()]
+
+
+class SqlSessionStore:
+    """Session rows looked up by either token; expired rows are purged periodically."""
+
+    SWEEP_INTERVAL_SECONDS = 60
+
+    def __init__(self, engine: Engine) -> None:
+        self.rows = SqlTable(engine, sessions_table, key="access_token")
+        self.engine = engine
+        token = bindparam("token")
+        self._by_token = select(*sessions_table.c).where(
+            or_(sessions_table.c.access_token == token, sessions_table.c.refresh_token == token)
+        )
+        self._purge = delete(sessions_table).where(sessions_table.c.refresh_expires_at <= bindparam("now"))
+        self._last_sweep: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return 2 * len(self.rows)
+
+    def __contains__(self, token: object) -> bool:
+        return self.get(token) is not None
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            row = conn.execute(self._by_token, {"token": token}).mappings().first()
+        return dict(row) if row is not None else None
+
+    def add(self, session: Dict[str, Any], now: Optional[datetime] = None) -> None:
+        now = now or datetime.utcnow()
+        if self._last_sweep is None or (now - self._last_sweep).total_seconds() >= self.SWEEP_INTERVAL_SECONDS:
+            self.sweep(now)
+        self.rows.insert(session)
+
+    def revoke(self, token: str) -> Optional[Dict[str, Any]]:
+        session = self.get(token)
+        if session is not None:
+            self.rows.delete(session["access_token"])
+        return session
+
+    def revoke_user(self, user_id: str) -> int:
+        with self.rows.begin() as conn:
+            return conn.execute(delete(sessions_table).where(sessions_table.c.user_id == user_id)).rowcount
+
+    def user_sessions(self, user_id: str) -> List[Dict[str, Any]]:
+        return self.rows.find("user_id", user_id)
+
+    def sweep(self, now: Optional[datetime] = None) -> int:
+        now = now or datetime.utcnow()
+        self._last_sweep = now
+        with self.rows.begin() as conn:
+            return conn.execute(self._purge, {"now": now}).rowcount
+
+
+class AuthEventLog:
+    """Per-user auth versions shared by every process using the database.
+
+    Each worker keeps its own principal cache and permission masks, validated
+    against :meth:`version`. A bump appends to ``auth_events``; before
+    answering, every process asks SQLite's ``PRAGMA data_version`` on a
+    connection it holds for the purpose (the value changes whenever any other
+    connection commits) and only then reads the events it has not seen yet.
+    A check is therefore one pragma while nothing was written. Other
+    databases have no such counter and read the event table on every check.
+
+    Events older than ``RETENTION_SECONDS`` are compacted away. A process that
+    finds a gap in the sequence it has seen (it was idle longer than that)
+    starts a new epoch, which changes every user's version at once.
+    """
+
+    RETENTION_SECONDS = 3600
+    COMPACT_INTERVAL_SECONDS = 60
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0
+        self._data_version: Optional[int] = None
+        self._last_compaction: Optional[datetime] = None
+        self._insert = insert(auth_events_table)
+        self._compact = delete(auth_events_table).where(auth_events_table.c.created_at < bindparam("before"))
+        self._watch = engine.raw_connection() if engine.dialect.name == "sqlite" else None
+        self._watch_cursor = self._watch.cursor() if self._watch is not None else None
+        with engine.connect() as conn:
+            self._seen = conn.execute(select(func.coalesce(func.max(auth_events_table.c.seq), 0))).scalar_one()
+        self._unseen = select(auth_events_table.c.seq, auth_events_table.c.user_id).where(
+            auth_events_table.c.seq > bindparam("seen")
+        ).order_by(auth_events_table.c.seq)
+
+    def version(self, user_id: str) -> int:
+        self.refresh()
+        return (self._epoch << 32) + self._versions.get(user_id, 0)
+
+    def bump(self, user_id: str) -> None:
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            conn.execute(self._insert, {"user_id": user_id, "created_at": now})
+            if self._last_compaction is None or (now - self._last_compaction).total_seconds() >= self.COMPACT_INTERVAL_SECONDS:
+                self._last_compaction = now
+                conn.execute(self._compact, {"before": now - timedelta(seconds=self.RETENTION_SECONDS)})
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False) -> None:
+        with self._lock:
+            if self._watch_cursor is not None:
+                data_version = self._watch_cursor.execute("PRAGMA data_version").fetchone()[0]
+                if data_version == self._data_version and not force:
+                    return
+                self._data_version = data_version
+            with self.engine.connect() as conn:
+                rows = conn.execute(self._unseen, {"seen": self._seen}).all()
+            if rows and rows[0].seq != self._seen + 1:
+                self._epoch += 1
+                self._versions.clear()
+            for seq, user_id in rows:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+                self._seen = seq
+
+    def close(self) -> None:
+        if self._watch is not None:
+            self._watch_cursor.close()
+            self._watch.close()
+
+
+def _add_missing_columns(engine: Engine) -> None:
+    """Add columns introduced after a table was created; they all carry a server default."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.server_default is not None:
+                    conn.execute(DDL(f"ALTER TABLE {table.name} ADD COLUMN {CreateColumn(column).compile(engine)}"))
+
+
+def create_schema(engine: Engine, attempts: int = 5) -> None:
+    # Workers started together race to create the schema; whoever loses sees the tables on retry.
+    for attempt in range(attempts):
+        try:
+            metadata.create_all(engine)
+            _add_missing_columns(engine)
+            return
+        except OperationalError:
+            if attempt == attempts - 1:
+                raise
+
+
+def _configure_sqlite(dbapi_connection: Any, _record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.close()
+
+
+def create_sql_engine(settings: Settings) -> Engine:
+    url = settings.database_url
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout_seconds,
+            pool_recycle=settings.database_pool_recycle_seconds,
+        )
+
+    connect_args = {"check_same_thread": False, "cached_statements": 256}
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            url,
+            connect_args=connect_args,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout_seconds,
+        )
+    event.listen(engine, "connect", _configure_sqlite)
+    return engine
+
+
+class SQLDatabase(InMemoryDB):
+    blocking = True
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        create_schema(engine)
+        super().__init__()
+
+    def _create_tables(self) -> None:
+        engine = self.engine
+        self.users = SqlTable(engine, users_table, computed={"email": ("email_normalized", normalize_email)})
+        self.sessions = SqlSessionStore(engine)
+        retention = get_settings().sync_retention_hours * 3600
+        self.profiles = SqlTable(engine, profiles_table, key="user_id", owner_field="user_id", retention_seconds=retention)
+        self.alert_settings = SqlTable(engine, alert_settings_table, key="user_id", owner_field="user_id", retention_seconds=retention)
+        self.disputes = SqlTable(engine, disputes_table, owner_field="user_id", retention_seconds=retention)
+        self.litigation_cases = SqlTable(engine, litigation_cases_table, owner_field="user_id", retention_seconds=retention)
+        self.permissions = SqlPermissions(engine)
+        self.blobs = SqlTable(engine, blobs_table, key="digest")
+        self.auth_events = AuthEventLog(engine)
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "SQLDatabase":
+        return cls(create_sql_engine(settings))
+
+    def close(self) -> None:
+        self.auth_events.close()
+        self.engine.dispose()
+
+    # --- User helpers -----------------------------------------------------
+    def create_user(self, email: str, full_name: str, password: str) -> Dict[str, Any]:
+        record = self._new_user_record(email, full_name, password)
+        with self.users.begin() as conn:
+            self.users.insert(record["user"], conn)
+            self.profiles.insert(record["profile"], conn)
+            self.alert_settings.insert(record["alert_settings"], conn)
+        return record["user"]
+
+    # --- Auth cache invalidation -------------------------------------------
+    def auth_version(self, user_id: str) -> int:
+        return self.auth_events.version(user_id)
+
+    def bump_auth_version(self, user_id: str) -> None:
+        """Invalidate every cached principal of ``user_id`` in every worker process."""
+        self.auth_events.bump(user_id)
+
+    # --- Blob reference counting -----------------------------------------
+    def retain_blob(self, digest: str, size_bytes: int) -> bool:
+        increment = update(blobs_table).where(blobs_table.c.digest == digest).values(ref_count=blobs_table.c.ref_count + 1)
+        with self.blobs.begin() as conn:
+            if conn.execute(increment).rowcount:
+                return False
+            self.blobs.insert({"digest": digest, "size_bytes": size_bytes, "ref_count": 1}, conn)
+        return True
+
+    def release_blob(self, digest: str) -> None:
+        with self.blobs.begin() as conn:
+            conn.execute(
+                update(blobs_table)
+                .where(blobs_table.c.digest == digest, blobs_table.c.ref_count > 0)
+                .values(ref_count=blobs_table.c.ref_count - 1)
+            )
+
+    def orphaned_blobs(self) -> List[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(select(blobs_table).where(blobs_table.c.ref_count <= 0)).mappings()]
+
+    # The change log lives in the database, so stamps and sync cursors survive
+    # restarts and agree across workers; they need no epoch.
+    def collection_version(self, table: Any, owner: str) -> str:
+        return str(table.stamp(owner))
+
+    def sync_cursor(self, table: Any) -> str:
+        return str(table.head())
+
+    def changes_since(self, table: Any, owner: str, cursor: str, limit: int) -> ChangeSet:
+        if not cursor.isdigit():
+            raise ValueError("Invalid sync cursor")
+        changes, last, more = table.changes(owner, int(cursor), limit)
+        rows = table.get_many([key for key, deleted in changes if not deleted])
+        return ChangeSet(
+            # A row missing here was deleted after the scan; its tombstone comes with the next call.
+            changed=[rows[key] for key, deleted in changes if not deleted and key in rows],
+            deleted=[key for key, deleted in changes if deleted],
+            cursor=str(last),
+            has_more=more,
+        )
+
+    # --- Dashboard aggregates ---------------------------------------------
+    # The SQL backend has no write hooks to keep counters in, so these are one
+    # GROUP BY each; the composite indexes keep them to index scans per owner.
+    def status_totals(self, table: Any, user_id: Optional[str] = None) -> Dict[Any, Tuple[int, float]]:
+        if not isinstance(table, SqlTable):
+            return super().status_totals(table, user_id)
+        columns = table.table.c
+        statement = select(columns.status, func.count(), func.coalesce(func.sum(columns.amount), 0.0)).group_by(columns.status)
+        if user_id is not None:
+            statement = statement.where(columns.user_id == user_id)
+        with self.engine.connect() as conn:
+            return {status: (count, amount) for status, count, amount in conn.execute(statement)}
+
+    def account_totals(self) -> Dict[bool, int]:
+        statement = select(users_table.c.is_enabled, func.count()).group_by(users_table.c.is_enabled)
+        with self.engine.connect() as conn:
+            return {bool(enabled): count for enabled, count in conn.execute(statement)}
+
+    # --- Generic CRUD helpers --------------------------------------------
+    def find_by(self, table: Any, field: str, value: Any) -> List[Dict[str, Any]]:
+        if isinstance(table, SqlTable):
+            return table.find(field, value)
+        return super().find_by(table, field, value)
+
+    def page_by(
+        self,
+        table: Any,
+        field: Optional[str],
+        value: Any,
+        after: Optional[Tuple[datetime, str]] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        if isinstance(table, SqlTable):
+            return table.page(field, value, after, limit)
+        return super().page_by(table, field, value, after, limit)
+
+    def _table_name(self, table: Any) -> str:
+        return table.table.name
+
+    def upsert(self, table: Any, record_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if isinstance(table, SqlTable):
+            existed = self.on_change is not None and record_id in table
+            record = table.upsert(record_id, payload)
+            self._changed(table, "update" if existed else "insert", [record])
+            return record
+        return super().upsert(table, record_id, payload)
+
+    def update(
+        self, table: Any, record_id: str, changes: Dict[str, Any], expected_version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        if isinstance(table, SqlTable):
+            record = table.update(record_id, changes, expected_version=expected_version)
+            if record is not None:
+                self._changed(table, "update", [record])
+            return record
+        return super().update(table, record_id, changes, expected_version)
+
+    def insert(self, table: Any, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if isinstance(table, SqlTable):
+            if table.key == "id":
+                payload["id"] = payload.get("id") or self.new_id()
+            record = table.insert(payload)
+            self._changed(table, "insert", [record])
+            return record
+        return super().insert(table, payload)
+
+    def insert_many(self, table: Any, payloads: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if isinstance(table, SqlTable):
+            records = list(payloads)
+            for payload in records:
+                payload["id"] = payload.get("id") or self.new_id()
+            table.insert_many(records)
+            self._changed(table, "insert", records)
+            return records
+        return super().insert_many(table, payloads)
+
+    def delete(self, table: Any, record_id: str, expected_version: Optional[int] = None) -> None:
+        if isinstance(table, SqlTable):
+            self._changed(table, "delete", table.delete(record_id, expected_version))
+            return
+        super().delete(table, record_id, expected_version)
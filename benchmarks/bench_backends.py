@@ -0,0 +1,86 @@
+"""Per-operation latency of the in-memory and SQL database backends.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_backends --users 2000 --disputes-per-user 5
+
+Both backends are driven through the same ``InMemoryDB`` interface the routes
+use. The SQL backend runs against a temporary on-disk SQLite file in WAL
+mode, so the numbers include real page-cache I/O.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from app.config import Settings
+from app.database import InMemoryDB
+from app.sql_database import SQLDatabase
+
+
+def measure(fn: Callable[[int], object], count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def run(db: InMemoryDB, users: int, disputes_per_user: int, lookups: int) -> Dict[str, float]:
+    rng = random.Random(0)
+    user_ids: List[str] = []
+    results: Dict[str, float] = {}
+    results["create_user"] = measure(lambda i: user_ids.append(db.create_user(f"user{i}@example.com", f"User {i}", "pw")["id"]), users)
+
+    now = datetime.utcnow()
+    dispute_ids: List[str] = []
+    results["insert dispute"] = measure(
+        lambda i: dispute_ids.append(
+            db.insert(db.disputes, {"user_id": user_ids[i % users], "title": "t", "status": "open", "amount": 1.0, "created_at": now, "documents": []})["id"]
+        ),
+        users * disputes_per_user,
+    )
+    start = time.perf_counter()
+    db.insert_many(
+        db.litigation_cases,
+        [
+            {"user_id": user_ids[i % users], "docket_number": str(i), "case_name": "c", "status": "draft", "amount": 1.0, "created_at": now}
+            for i in range(users * disputes_per_user)
+        ],
+    )
+    results["insert_many case (per row)"] = (time.perf_counter() - start) / (users * disputes_per_user) * 1e6
+
+    for i in range(users):
+        db.create_session(user_ids[i], f"access-{i}", now + timedelta(hours=1), f"refresh-{i}", now + timedelta(days=1))
+
+    results["get_user_by_email"] = measure(lambda i: db.get_user_by_email(f"user{rng.randrange(users)}@example.com"), lookups)
+    results["get_session"] = measure(lambda i: db.get_session(f"access-{rng.randrange(users)}"), lookups)
+    results["find_by disputes.user_id"] = measure(lambda i: db.find_by(db.disputes, "user_id", rng.choice(user_ids)), lookups)
+    results["update dispute"] = measure(lambda i: db.update(db.disputes, rng.choice(dispute_ids), {"status": "pending"}), lookups)
+    results["profile read"] = measure(lambda i: db.profiles[rng.choice(user_ids)], lookups)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--disputes-per-user", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=5_000)
+    args = parser.parse_args()
+
+    memory = run(InMemoryDB(), args.users, args.disputes_per_user, args.lookups)
+    with tempfile.TemporaryDirectory() as directory:
+        settings = Settings(database_backend="sql", database_url=f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        sql = run(SQLDatabase.from_settings(settings), args.users, args.disputes_per_user, args.lookups)
+
+    print(f"{'operation':<28}  {'memory (us)':>12}  {'sql (us)':>12}")
+    for name in memory:
+        print(f"{name:<28}  {memory[name]:>12.2f}  {sql[name]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Lookup latency of InMemoryDB secondary indexes as tables grow.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_indexes --sizes 1000 10000 100000
+
+Each size seeds a fresh database with that many users and disputes, then
+times ``get_user_by_email`` and the per-owner dispute lookup. With the
+indexes in place the per-call latency should stay flat across sizes.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime
+
+from app.database import InMemoryDB
+
+
+def seed(db: InMemoryDB, size: int) -> list:
+    user_ids = []
+    for i in range(size):
+        user = db.create_user(f"user{i}@example.com", f"User {i}", "secret")
+        user_ids.append(user["id"])
+    now = datetime.utcnow()
+    for i in range(size):
+        db.insert(
+            db.disputes,
+            {"user_id": user_ids[i % len(user_ids)], "title": f"Dispute {i}", "status": "open", "amount": 1.0, "created_at": now, "documents": []},
+        )
+    return user_ids
+
+
+def timed(fn, args, repeat: int) -> float:
+    start = time.perf_counter()
+    for arg in args[:repeat]:
+        fn(arg)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=1_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'email lookup (us)':>18}  {'owner lookup (us)':>18}")
+    for size in args.sizes:
+        db = InMemoryDB()
+        user_ids = seed(db, size)
+        rng = random.Random(size)
+        emails = [f"USER{rng.randrange(size)}@Example.com" for _ in range(args.repeat)]
+        owners = [rng.choice(user_ids) for _ in range(args.repeat)]
+        email_us = timed(db.get_user_by_email, emails, args.repeat)
+        owner_us = timed(lambda uid: db.find_by(db.disputes, "user_id", uid), owners, args.repeat)
+        print(f"{size:>10}  {email_us:>18.2f}  {owner_us:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Latency of ``GET /me/profile`` while a burst of sign-ins is hashing passwords.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_logins --logins 200 --concurrency 50
+
+Drives the app in-process over ASGI. A probe loop requests ``/me/profile``
+back to back while ``--logins`` sign-ins run ``--concurrency`` at a time,
+and the probe's p50/p99 are compared across three runs: no burst, a burst
+with scrypt on the bounded worker pool, and a burst with scrypt run inline
+on the event loop (how a KDF would behave if called directly in the handler).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional
+
+import httpx
+
+from app.database import DB
+from app.main import create_app
+from app.services import passwords
+
+PROBE_INTERVAL = 0.005
+
+
+def summary(samples: List[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {statistics.median(ordered) * 1e3:7.2f} ms  p99 {p99 * 1e3:7.2f} ms  max {ordered[-1] * 1e3:7.2f} ms  ({len(ordered)} probes)"
+
+
+async def probe(client: httpx.AsyncClient, headers: dict, stop: asyncio.Event, samples: List[float]) -> None:
+    # Probes are due on a fixed schedule and latency is measured from when each
+    # was due, so time the loop spends blocked counts against the probe instead
+    # of silently delaying the next one.
+    due = time.perf_counter()
+    while not stop.is_set():
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        response = await client.get("/me/profile", headers=headers)
+        samples.append(time.perf_counter() - due)
+        response.raise_for_status()
+        due += PROBE_INTERVAL
+
+
+async def burst(client: httpx.AsyncClient, emails: List[str], concurrency: int) -> float:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def sign_in(email: str) -> None:
+        async with gate:
+            response = await client.post("/auth/sign-in", json={"email": email, "password": "pw"})
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sign_in(email) for email in emails))
+    return time.perf_counter() - start
+
+
+async def run(client: httpx.AsyncClient, headers: dict, emails: Optional[List[str]], concurrency: int, idle_seconds: float) -> str:
+    stop = asyncio.Event()
+    samples: List[float] = []
+    task = asyncio.create_task(probe(client, headers, stop, samples))
+    if emails:
+        elapsed = await burst(client, emails, concurrency)
+        note = f"  burst {elapsed:.2f}s"
+    else:
+        await asyncio.sleep(idle_seconds)
+        note = ""
+    stop.set()
+    await task
+    return summary(samples) + note
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    stored = passwords.hash_password_sync("pw")
+    emails = [f"burst{i}@example.com" for i in range(args.logins)]
+    for email in emails:
+        DB.create_user(email, "Burst", stored)
+
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        tokens = (await client.post("/auth/sign-up", json={"email": "probe@example.com", "password": "pw", "full_name": "Probe"})).json()
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+        print(f"/me/profile latency, {args.logins} sign-ins at concurrency {args.concurrency}")
+        print(f"{'no burst':<22} {await run(client, headers, None, args.concurrency, 2.0)}")
+        print(f"{'burst, worker pool':<22} {await run(client, headers, emails, args.concurrency, 0)}")
+
+        async def inline(fn, *fn_args):
+            return fn(*fn_args)
+
+        pooled, passwords._run = passwords._run, inline
+        try:
+            print(f"{'burst, inline scrypt':<22} {await run(client, headers, emails, args.concurrency, 0)}")
+        finally:
+            passwords._run = pooled
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""Cost of the auth-plus-permission dependency chain per request.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_permissions --iterations 200000
+
+Awaits ``get_current_principal -> get_current_user -> permission check``
+directly, without HTTP, for a regular user and for the default admin. The
+"set rebuild" rows reproduce the previous check, which built a set from
+``DB.permissions`` on every call and rewrote the admin's permissions.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.config import get_settings
+from app.database import DB
+from app.dependencies import get_current_principal, get_current_user, require_permissions
+from app.services.auth import issue_session
+from app.services.permissions import set_user_permissions
+
+PERMISSIONS = ["disputes.create", "disputes.update"]
+
+
+async def legacy_check(user: Dict, permissions: List[str]) -> Dict:
+    user_permissions = set(DB.permissions.get(user["id"], []))
+    if user["email"] == get_settings().default_admin_email:
+        DB.permissions[user["id"]] = permissions
+        return user
+    missing = [perm for perm in permissions if perm not in user_permissions]
+    if missing:
+        raise HTTPException(status_code=403, detail=f"Missing permissions: {', '.join(missing)}")
+    return user
+
+
+def credentials_for(email: str) -> HTTPAuthorizationCredentials:
+    user = DB.create_user(email, "Bench", "pw")
+    set_user_permissions(user["id"], PERMISSIONS)
+    access, refresh, access_exp, refresh_exp = issue_session(user["id"])
+    DB.create_session(user["id"], access, access_exp, refresh, refresh_exp)
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=access)
+
+
+async def run(credentials: HTTPAuthorizationCredentials, iterations: int, legacy: bool) -> float:
+    check = require_permissions(PERMISSIONS)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        principal = await get_current_principal(credentials)
+        user = await get_current_user(principal)
+        if legacy:
+            await legacy_check(user, PERMISSIONS)
+        else:
+            await check(user)
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    users = {
+        "regular user": credentials_for(f"bench-{datetime.utcnow().timestamp()}@example.com"),
+        "default admin": credentials_for(get_settings().default_admin_email),
+    }
+    print(f"{'principal':<14}  {'set rebuild (ns)':>16}  {'bitmask (ns)':>13}")
+    for label, credentials in users.items():
+        legacy = await run(credentials, args.iterations, legacy=True)
+        bitmask = await run(credentials, args.iterations, legacy=False)
+        print(f"{label:<14}  {legacy:>16.0f}  {bitmask:>13.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
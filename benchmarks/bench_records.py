@@ -0,0 +1,68 @@
+"""Memory footprint of in-memory rows: plain dicts versus slotted records.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_records --records 1000000
+
+Builds the same disputes twice, once as the dicts the tables used to hold and
+once as ``DisputeRecord`` instances, and reports the traced allocation per row
+together with the time to build them.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from app.records import DisputeRecord
+
+STATUSES = ("open", "in_review", "resolved", "rejected")
+
+
+def payloads(count: int, user_ids: list, now: datetime):
+    for i in range(count):
+        yield {
+            "id": str(uuid.UUID(int=i)),
+            "user_id": user_ids[i % len(user_ids)],
+            # Rebuild the string so dict rows do not share it by accident, as decoded JSON would not.
+            "status": "".join(STATUSES[i % len(STATUSES)]),
+            "title": f"Dispute {i}",
+            "amount": float(i),
+            "created_at": now,
+            "documents": [],
+        }
+
+
+def measure(label: str, build, count: int) -> None:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} {current / count:>8.1f} B/row  {current / 2**20:>8.1f} MB  build {elapsed:.2f}s")
+    del rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    user_ids = [str(uuid.uuid4()) for _ in range(1_000)]
+    print(f"{args.records:,} disputes")
+    measure("dict", lambda: {row["id"]: row for row in payloads(args.records, user_ids, now)}, args.records)
+    measure(
+        "DisputeRecord",
+        lambda: {row["id"]: DisputeRecord.from_mapping(row) for row in payloads(args.records, user_ids, now)},
+        args.records,
+    )
+
+
+if __name__ == "__main__":
+    main()
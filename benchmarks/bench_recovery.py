@@ -0,0 +1,74 @@
+"""Warm-start time of the persisted in-memory database.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_recovery --records 1000000 --wal-tail 10000
+
+Seeds a database with ``--records`` disputes spread over a set of users,
+snapshots it, appends ``--wal-tail`` more journaled writes, then times how
+long a fresh process-local ``InMemoryDB`` takes to load the snapshot and
+replay the WAL tail. The snapshot is reported twice: how long the caller
+was blocked (the WAL rotation and the ``fork``) and how long the forked
+writer took to get it on disk.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.database import InMemoryDB
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--wal-tail", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory)
+        db = InMemoryDB()
+        db.enable_persistence(path, fsync_interval=0.01, snapshot_bytes=1 << 62)
+        user_ids = [db.create_user(f"user{i}@example.com", f"User {i}", "pw")["id"] for i in range(args.users)]
+        now = datetime.utcnow()
+        batch = 10_000
+        for start in range(0, args.records, batch):
+            db.insert_many(
+                db.disputes,
+                [
+                    {"user_id": user_ids[i % args.users], "title": f"Dispute {i}", "status": "open", "amount": 1.0, "created_at": now, "documents": []}
+                    for i in range(start, min(start + batch, args.records))
+                ],
+            )
+        started = time.perf_counter()
+        db.snapshot()
+        pause_seconds = time.perf_counter() - started
+        db.journal.wait_for_snapshot()
+        snapshot_seconds = time.perf_counter() - started
+        for i in range(args.wal_tail):
+            db.insert(db.litigation_cases, {"user_id": user_ids[i % args.users], "docket_number": str(i), "case_name": "c", "status": "draft", "amount": 1.0, "created_at": now})
+        db.journal.close()
+        db.journal = None
+        snapshot_mb = (path / "snapshot.bin").stat().st_size / 1024 / 1024
+        wal_mb = sum(wal.stat().st_size for wal in path.glob("wal-*.log")) / 1024 / 1024
+
+        started = time.perf_counter()
+        recovered = InMemoryDB()
+        recovered.enable_persistence(path, fsync_interval=0.01, snapshot_bytes=1 << 62)
+        recovery_seconds = time.perf_counter() - started
+        recovered.journal.close()
+
+    assert len(recovered.disputes) == args.records and len(recovered.litigation_cases) == args.wal_tail
+    total = args.records + args.users * 3 + args.wal_tail
+    print(f"records:        {total:,} ({snapshot_mb:,.1f} MB snapshot, {wal_mb:,.1f} MB WAL tail)")
+    print(f"snapshot pause: {pause_seconds:.3f}s (caller blocked)")
+    print(f"snapshot write: {snapshot_seconds:.3f}s (until on disk)")
+    print(f"recovery:       {recovery_seconds:.3f}s ({total / recovery_seconds:,.0f} records/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Latency of list endpoints: per-row models versus the trusted-row fast path.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_serialization --rows 10000 --requests 200
+
+Seeds one user with ``--rows`` disputes and times ``GET /disputes`` through
+the real app. A second route on the same app reproduces the previous handler
+(``Dispute(**row)`` per row, then ``response_model`` validation and
+``jsonable_encoder``) so both paths share the auth dependency and transport.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from datetime import datetime
+from typing import List
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+
+from app.database import DB
+from app.dependencies import get_current_user
+from app.main import create_app
+from app.schemas import Dispute
+
+
+def percentiles(samples: List[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {statistics.median(ordered) * 1e3:8.2f} ms   p99 {p99 * 1e3:8.2f} ms"
+
+
+def timed(client: TestClient, path: str, headers: dict, requests: int) -> List[float]:
+    client.get(path, headers=headers)
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        samples.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app()
+
+    @app.get("/bench/disputes-validated", response_model=List[Dispute])
+    async def validated(user=Depends(get_current_user)) -> List[Dispute]:
+        return [Dispute(**row) for row in DB.find_by(DB.disputes, "user_id", user["id"])]
+
+    with TestClient(app) as client:
+        tokens = client.post("/auth/sign-up", json={"email": "bench@example.com", "password": "pw", "full_name": "Bench"}).json()
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        user_id = client.get("/me/profile", headers=headers).json()["user_id"]
+        now = datetime.utcnow()
+        DB.insert_many(
+            DB.disputes,
+            ({"user_id": user_id, "title": f"Dispute {i}", "status": "open", "amount": float(i), "created_at": now, "documents": []} for i in range(args.rows)),
+        )
+        assert client.get("/disputes", headers=headers).json() == client.get("/bench/disputes-validated", headers=headers).json()
+
+        print(f"GET /disputes with {args.rows:,} rows, {args.requests} requests")
+        print(f"{'validated models':<18} {percentiles(timed(client, '/bench/disputes-validated', headers, args.requests))}")
+        print(f"{'trusted rows':<18} {percentiles(timed(client, '/disputes', headers, args.requests))}")
+
+
+if __name__ == "__main__":
+    main()
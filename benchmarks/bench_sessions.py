@@ -0,0 +1,63 @@
+"""Simulated multi-day soak of the session store.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_sessions --days 5 --logins-per-hour 2000
+
+A simulated clock issues sign-ins and refreshes with the configured token
+TTLs. The number of live tokens and heap entries is printed every simulated
+hour-block; both should level off once the refresh TTL has elapsed rather
+than growing with total traffic.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import secrets
+from datetime import datetime, timedelta
+
+from app.config import get_settings
+from app.database import SessionStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--logins-per-hour", type=int, default=2_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--report-every-hours", type=int, default=12)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    access_ttl = timedelta(minutes=settings.access_token_ttl_minutes)
+    refresh_ttl = timedelta(hours=settings.refresh_token_ttl_hours)
+    store = SessionStore()
+    rng = random.Random(0)
+    clock = datetime(2024, 1, 1)
+    step = timedelta(hours=1) / args.logins_per_hour
+    issued = 0
+
+    print(f"{'hour':>6}  {'issued':>10}  {'live tokens':>12}  {'heap entries':>13}")
+    for hour in range(1, args.days * 24 + 1):
+        for _ in range(args.logins_per_hour):
+            clock += step
+            previous = rng.choice(store.user_sessions(f"user-{rng.randrange(args.users)}") or [None])
+            if previous is not None and rng.random() < 0.5:
+                store.revoke(previous["refresh_token"])
+            store.add(
+                {
+                    "user_id": f"user-{rng.randrange(args.users)}",
+                    "access_token": secrets.token_urlsafe(16),
+                    "refresh_token": secrets.token_urlsafe(16),
+                    "expires_at": clock + access_ttl,
+                    "refresh_expires_at": clock + refresh_ttl,
+                },
+                now=clock,
+            )
+            issued += 1
+        if hour % args.report_every_hours == 0:
+            print(f"{hour:>6}  {issued:>10}  {len(store):>12}  {len(store._expiry):>13}")
+
+
+if __name__ == "__main__":
+    main()
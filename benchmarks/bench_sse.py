@@ -0,0 +1,195 @@
+"""Memory and CPU cost of idle ``GET /events`` streams, and fan-out latency.
+
+Run from the repository root (needs uvicorn, and a file descriptor limit
+above ``--subscribers``)::
+
+    python -m benchmarks.bench_sse --subscribers 10000 --users 100 --idle 30
+
+Starts ``uvicorn app.main:app`` on the in-memory backend, signs up
+``--users`` users and opens ``--subscribers`` event streams spread evenly
+across them from one asyncio client. Reported from the server's
+``/proc`` entries:
+
+* resident memory per open stream (RSS after connecting minus before);
+* CPU per stream while idle, over ``--idle`` seconds with heartbeats every
+  ``--heartbeat`` seconds, i.e. the cost of the shared heartbeat timer
+  waking and pinging every stream;
+* fan-out latency: each user creates a dispute and the time until all of
+  that user's streams have received the event is recorded.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_bytes(pid: int) -> int:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    raise RuntimeError("VmRSS not found")
+
+
+def cpu_seconds(pid: int) -> float:
+    # utime and stime are fields 14 and 15; split after the parenthesised command name.
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def start_server(port: int, directory: Path, heartbeat: float) -> subprocess.Popen:
+    env = {**os.environ, "STORAGE_BUCKET": str(directory / "uploads"), "SSE_HEARTBEAT_SECONDS": str(heartbeat)}
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning", "--backlog", "4096"]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("server did not start")
+
+
+def sign_up(base_url: str, users: int) -> List[str]:
+    tokens = []
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        # The default admin gets every permission, so it is the first user and creates disputes too.
+        for index in range(users):
+            email = "admin@example.com" if index == 0 else f"sse-bench-{index}@example.com"
+            response = client.post("/auth/sign-up", json={"email": email, "password": "pw", "full_name": f"User {index}"})
+            response.raise_for_status()
+            tokens.append(response.json()["access_token"])
+        admin = {"Authorization": f"Bearer {tokens[0]}"}
+        for token in tokens[1:]:
+            user_id = client.get("/me/profile", headers={"Authorization": f"Bearer {token}"}).json()["user_id"]
+            client.post("/admin/permissions", json={"user_id": user_id, "permissions": ["disputes.create"]}, headers=admin).raise_for_status()
+    return tokens
+
+
+class Stream:
+    """A raw HTTP/1.1 event stream; counts the events it has read."""
+
+    def __init__(self, user: int) -> None:
+        self.user = user
+        self.events = 0
+        self.received = asyncio.Event()
+
+    async def open(self, port: int, token: str) -> None:
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(f"GET /events HTTP/1.1\r\nHost: bench\r\nAuthorization: Bearer {token}\r\nAccept: text/event-stream\r\n\r\n".encode())
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        if not head.startswith(b"HTTP/1.1 200"):
+            raise RuntimeError(head.decode(errors="replace"))
+        self.task = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            if line.startswith(b"event: disputes.insert"):
+                self.events += 1
+                self.received.set()
+
+    def close(self) -> None:
+        self.task.cancel()
+        self.writer.close()
+
+
+async def open_streams(port: int, tokens: List[str], count: int, batch: int = 500) -> List[Stream]:
+    streams = [Stream(index % len(tokens)) for index in range(count)]
+    for start in range(0, count, batch):
+        chunk = streams[start : start + batch]
+        await asyncio.gather(*(stream.open(port, tokens[stream.user]) for stream in chunk))
+    return streams
+
+
+async def fan_out(base_url: str, tokens: List[str], streams: List[Stream]) -> List[float]:
+    by_user: Dict[int, List[Stream]] = {}
+    for stream in streams:
+        by_user.setdefault(stream.user, []).append(stream)
+    latencies = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        for user, owned in by_user.items():
+            started = time.perf_counter()
+            response = await client.post("/disputes", json={"title": "fan-out", "amount": 1}, headers={"Authorization": f"Bearer {tokens[user]}"})
+            response.raise_for_status()
+            await asyncio.wait_for(asyncio.gather(*(stream.received.wait() for stream in owned)), 30)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def run(args: argparse.Namespace, port: int, pid: int, tokens: List[str]) -> Tuple[int, float, List[float], int]:
+    await asyncio.sleep(1)
+    rss_before = rss_bytes(pid)
+    started = time.perf_counter()
+    streams = await open_streams(port, tokens, args.subscribers)
+    connect_seconds = time.perf_counter() - started
+    await asyncio.sleep(1)
+    rss_after = rss_bytes(pid)
+    cpu_before = cpu_seconds(pid)
+    await asyncio.sleep(args.idle)
+    idle_cpu = cpu_seconds(pid) - cpu_before
+    latencies = await fan_out(f"http://127.0.0.1:{port}", tokens, streams)
+    missing = sum(stream.events != 1 for stream in streams)
+    for stream in streams:
+        stream.close()
+    print(f"opened {len(streams)} streams in {connect_seconds:.1f}s")
+    return rss_after - rss_before, idle_cpu, latencies, missing
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--idle", type=float, default=30.0, help="seconds of idle measurement")
+    parser.add_argument("--heartbeat", type=float, default=5.0, help="SSE_HEARTBEAT_SECONDS for the server")
+    args = parser.parse_args()
+
+    directory = Path(tempfile.mkdtemp(prefix="bench-sse-"))
+    port = free_port()
+    server = start_server(port, directory, args.heartbeat)
+    try:
+        tokens = sign_up(f"http://127.0.0.1:{port}", args.users)
+        memory, idle_cpu, latencies, missing = asyncio.run(run(args, port, server.pid, tokens))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    per_stream_cpu = idle_cpu / args.subscribers / args.idle
+    beats = args.idle / args.heartbeat
+    print(f"memory:  {memory / 2**20:.1f} MiB for {args.subscribers} streams, {memory / args.subscribers / 1024:.1f} KiB per stream")
+    print(f"idle CPU: {idle_cpu:.2f}s over {args.idle:g}s, {per_stream_cpu * 1e6:.2f} us/s per stream, "
+          f"{idle_cpu / beats * 1e3:.1f} ms per heartbeat of all streams")
+    print(f"fan-out: {args.subscribers // args.users} streams per user, p50 {statistics.median(latencies) * 1e3:.1f} ms, "
+          f"max {max(latencies) * 1e3:.1f} ms from POST to the last stream")
+    if missing:
+        print(f"{missing} streams did not receive exactly one event")
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
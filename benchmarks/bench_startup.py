@@ -0,0 +1,131 @@
+"""Import time and cold-start latency of both entry points, against a budget.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 900
+
+Every measurement is a fresh interpreter started in a scratch directory:
+it imports the entry point, then sends one request straight to the ASGI
+app, and reports both times. ``app.main`` is measured eagerly and with
+``LAZY_STARTUP=1``; ``api.index`` against a new database (schema created)
+and an existing one (schema version already current). The median of
+``--runs`` is reported, and the script exits non-zero when the lazy
+``app.main`` import or any cold start (import plus first request) exceeds
+its budget.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import asyncio, json, sys, time
+
+started = time.perf_counter()
+module = __import__(sys.argv[1], fromlist=["app"])
+imported = time.perf_counter()
+
+
+async def first_request(path):
+    sent = []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await module.app(scope, receive, send)
+    return sent[0]["status"]
+
+
+status = asyncio.run(first_request(sys.argv[2]))
+print(json.dumps({"import": imported - started, "request": time.perf_counter() - imported, "status": status}))
+"""
+
+
+class Case(NamedTuple):
+    name: str
+    module: str
+    path: str
+    env: Dict[str, str]
+    keep_db: bool
+
+
+CASES = [
+    Case("app.main eager", "app.main", "/health", {"LAZY_STARTUP": "0"}, False),
+    Case("app.main lazy", "app.main", "/health", {"LAZY_STARTUP": "1"}, False),
+    Case("api.index new db", "api.index", "/courses", {}, False),
+    Case("api.index existing db", "api.index", "/courses", {}, True),
+]
+
+
+def measure(case: Case, runs: int) -> Dict[str, float]:
+    imports: List[float] = []
+    totals: List[float] = []
+    scratch = Path(tempfile.mkdtemp(prefix="bench-startup-"))
+    env = {**os.environ, **case.env, "PYTHONPATH": str(ROOT)}
+    try:
+        for run in range(runs + case.keep_db):
+            if not case.keep_db:
+                for path in scratch.iterdir():
+                    path.unlink()
+            output = subprocess.run(
+                [sys.executable, "-c", CHILD, case.module, case.path],
+                cwd=scratch, env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            timing = json.loads(output.splitlines()[-1])
+            if timing["status"] != 200:
+                raise RuntimeError(f"{case.name}: first request returned {timing['status']}")
+            # With keep_db the first run only creates the database the others reuse.
+            if case.keep_db and run == 0:
+                continue
+            imports.append(timing["import"] * 1e3)
+            totals.append((timing["import"] + timing["request"]) * 1e3)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return {"import": statistics.median(imports), "total": statistics.median(totals)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=900.0, help="cold start budget: import plus first request")
+    parser.add_argument("--import-budget-ms", type=float, default=150.0, help="import budget for app.main with LAZY_STARTUP")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'entry point':<24} {'import ms':>10} {'cold start ms':>14}")
+    for case in CASES:
+        result = measure(case, args.runs)
+        flags = []
+        if result["total"] > args.budget_ms:
+            flags.append("OVER BUDGET")
+        if case.env.get("LAZY_STARTUP") == "1" and result["import"] > args.import_budget_ms:
+            flags.append("IMPORT OVER BUDGET")
+        if flags:
+            failures.append(case.name)
+        print(f"{case.name:<24} {result['import']:>10.1f} {result['total']:>14.1f}  {' '.join(flags)}")
+    if failures:
+        print(f"startup budget exceeded: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Peak server memory of a large document upload batch.
+
+Run from the repository root (needs uvicorn)::
+
+    python -m benchmarks.bench_upload --files 4 --file-mb 512
+
+Starts ``uvicorn app.main:app`` on the in-memory backend with a temporary
+bucket, creates a dispute and sends one ``POST /disputes/{id}/documents``
+whose multipart body is generated on the fly and sent with chunked
+transfer encoding, so neither side holds a whole file. The upload goes
+through Starlette's multipart parser and its spooled temporary files
+exactly like a browser upload. The server's resident memory is sampled
+from ``/proc`` every 10 ms while the upload runs; the report shows its
+peak growth over the RSS before the upload next to the bytes written. The
+growth should track the chunk size times the worker count, not the batch
+size.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+CHUNK = 1024 * 1024
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    raise RuntimeError("VmRSS not found")
+
+
+class RssSampler(threading.Thread):
+    """Records the highest RSS of ``pid`` until stopped."""
+
+    def __init__(self, pid: int) -> None:
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak = rss_mb(pid)
+        self.done = threading.Event()
+
+    def run(self) -> None:
+        while not self.done.wait(0.01):
+            self.peak = max(self.peak, rss_mb(self.pid))
+
+
+def start_server(port: int, bucket: Path, mode: str) -> subprocess.Popen:
+    env = {**os.environ, "STORAGE_BUCKET": str(bucket), "STORAGE_MODE": mode}
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("server did not start")
+
+
+def multipart_body(boundary: str, files: int, size: int) -> Iterator[bytes]:
+    """Yield a ``files``-part multipart body one chunk at a time."""
+    chunk = b"\x5a" * CHUNK
+    for index in range(files):
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="files"; filename="exhibit-{index}.bin"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        remaining = size
+        while remaining:
+            yield chunk[: min(CHUNK, remaining)]
+            remaining -= min(CHUNK, remaining)
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--file-mb", type=int, default=512)
+    parser.add_argument("--mode", choices=["path", "content"], default="path", help="STORAGE_MODE for the server")
+    args = parser.parse_args()
+
+    directory = Path(tempfile.mkdtemp(prefix="bench-upload-"))
+    port = free_port()
+    server = start_server(port, directory / "uploads", args.mode)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=600) as client:
+            # The default admin gets every permission, including disputes.create.
+            response = client.post("/auth/sign-up", json={"email": "admin@example.com", "password": "pw", "full_name": "Bench"})
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            dispute = client.post("/disputes", json={"title": "Upload bench", "amount": 1}, headers=headers).json()
+
+            baseline = rss_mb(server.pid)
+            sampler = RssSampler(server.pid)
+            sampler.start()
+            boundary = uuid.uuid4().hex
+            started = time.perf_counter()
+            response = client.post(
+                f"/disputes/{dispute['id']}/documents",
+                content=multipart_body(boundary, args.files, args.file_mb * 1024 * 1024),
+                headers={**headers, "Content-Type": f"multipart/form-data; boundary={boundary}"},
+            )
+            elapsed = time.perf_counter() - started
+            sampler.done.set()
+            sampler.join()
+            response.raise_for_status()
+            peak = sampler.peak
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    total_mb = sum(doc["size_bytes"] for doc in response.json()["documents"]) / 1024 / 1024
+    print(f"written:        {total_mb:,.0f} MB in {elapsed:.2f}s ({total_mb / elapsed:,.0f} MB/s)")
+    print(f"peak RSS:       {peak:,.1f} MB (baseline {baseline:,.1f} MB)")
+    print(f"peak RSS delta: {peak - baseline:,.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Throughput of the auth and list endpoints as uvicorn workers are added.
+
+Run from the repository root (needs uvicorn)::
+
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --duration 10
+
+For each worker count a fresh SQLite database is created and served by
+``uvicorn app.main:app --workers N`` with ``DATABASE_BACKEND=sql``, the
+shared-state mode. Users sign up, are granted permissions by an admin and
+create disputes over HTTP, so each worker serves tokens, permission
+changes and rows written by the others. Then ``--clients``
+load-generator processes each keep ``--concurrency`` requests in flight
+against ``GET /me/profile`` (auth only) and ``GET /disputes`` (auth plus a
+keyset page) for ``--duration`` seconds.
+
+After the load, one user signs out and the revoked token is replayed over
+fresh connections, so requests land on different workers; every one must
+be rejected, or the run fails. Scaling is bounded by the host's cores,
+which the clients share with the workers: with 1 CPU the curve is flat.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = {"me": "/me/profile", "disputes": "/disputes?limit=50"}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, directory: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_BACKEND": "sql",
+        "DATABASE_URL": f"sqlite:///{directory / 'lms.db'}",
+        "STORAGE_BUCKET": str(directory / "uploads"),
+    }
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("server did not start")
+
+
+def sign_up(client: httpx.Client, email: str) -> Tuple[str, Dict[str, str]]:
+    response = client.post("/auth/sign-up", json={"email": email, "password": "pw", "full_name": email.split("@")[0]})
+    response.raise_for_status()
+    token = response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    return client.get("/me/profile", headers=headers).json()["user_id"], headers
+
+
+def seed(base_url: str, users: int, disputes: int) -> List[str]:
+    tokens = []
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        # The default admin email gets every permission; the grants below land on
+        # whichever worker accepts them and must reach the worker serving the user.
+        _, admin = sign_up(client, "admin@example.com")
+        for index in range(users):
+            user_id, headers = sign_up(client, f"worker-bench-{index}@example.com")
+            client.post("/admin/permissions", json={"user_id": user_id, "permissions": ["disputes.create"]}, headers=admin).raise_for_status()
+            for number in range(disputes):
+                client.post("/disputes", json={"title": f"Dispute {number}", "amount": number}, headers=headers).raise_for_status()
+            tokens.append(headers["Authorization"].split()[1])
+    return tokens
+
+
+async def load(base_url: str, path: str, tokens: List[str], concurrency: int, duration: float) -> Tuple[int, int]:
+    done = errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def worker(offset: int) -> None:
+        nonlocal done, errors
+        index = offset
+        while time.perf_counter() < deadline:
+            response = await client.get(path, headers={"Authorization": f"Bearer {tokens[index % len(tokens)]}"})
+            done += 1
+            errors += response.status_code != 200
+            index += concurrency
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    return done, errors
+
+
+def client_process(args: Tuple[str, str, List[str], int, float]) -> Tuple[int, int]:
+    return asyncio.run(load(*args))
+
+
+def check_revocation(base_url: str, token: str, attempts: int) -> int:
+    with httpx.Client(base_url=base_url) as client:
+        client.post("/auth/sign-out", headers={"Authorization": f"Bearer {token}"}).raise_for_status()
+    accepted = 0
+    for _ in range(attempts):
+        # A new connection per request lets the kernel hand each one to any worker.
+        with httpx.Client(base_url=base_url) as client:
+            accepted += client.get("/me/profile", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    return accepted
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--disputes", type=int, default=50, help="disputes created per user")
+    parser.add_argument("--clients", type=int, default=min(8, os.cpu_count() or 1), help="load-generator processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per client process")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} client processes x {args.concurrency} in flight, {args.duration:g}s per scenario")
+    print(f"{'workers':>7} {'scenario':<9} {'req/s':>9} {'speedup':>8} {'errors':>7}")
+    baseline: Dict[str, float] = {}
+    failed = False
+    for workers in args.workers:
+        directory = Path(tempfile.mkdtemp(prefix="bench-workers-"))
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_server(workers, port, directory)
+        try:
+            tokens = seed(base_url, args.users, args.disputes)
+            with multiprocessing.Pool(args.clients) as pool:
+                for name, path in SCENARIOS.items():
+                    results = pool.map(client_process, [(base_url, path, tokens, args.concurrency, args.duration)] * args.clients)
+                    throughput = sum(done for done, _ in results) / args.duration
+                    errors = sum(errors for _, errors in results)
+                    baseline.setdefault(name, throughput)
+                    print(f"{workers:>7} {name:<9} {throughput:>9.1f} {throughput / baseline[name]:>7.2f}x {errors:>7}")
+                    failed = failed or errors > 0
+            accepted = check_revocation(base_url, tokens[0], attempts=4 * workers)
+            if accepted:
+                print(f"{workers:>7} revoked token accepted {accepted} time(s)")
+                failed = True
+        finally:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(directory, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
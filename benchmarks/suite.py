@@ -0,0 +1,321 @@
+"""End-to-end load scenarios with stored baselines and a regression gate.
+
+Run from the repository root::
+
+    python -m benchmarks.suite                       # run and compare with the baseline
+    python -m benchmarks.suite --update-baseline     # run and overwrite the baseline
+    python -m benchmarks.suite --only list_disputes sign_in --threshold 0.5
+
+Both apps are driven in process over ``httpx.ASGITransport``: the main
+service from ``app.main:create_app()`` and the standalone courses app in
+``api/index.py``. Before the scenarios run, ``--users`` accounts are seeded
+with ``--disputes`` disputes and ``--cases`` litigation cases each, plus a
+signed-in session per user, so list and update scenarios hit realistic
+table sizes.
+
+Each scenario warms up, then sends ``--requests`` requests ``--repeat``
+times (sign-in is capped, since every call costs one scrypt) with
+``--concurrency`` in flight, and reports throughput and p50/p95/p99 latency
+of the run with the median p95. Against a baseline, a scenario regresses
+when its p95 grows, or its throughput drops, by more than ``--threshold``
+(a fraction). The process then exits with status 1. Baselines are
+machine-specific; refresh them with ``--update-baseline`` on the machine that
+runs the gate.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+BASELINE_PATH = Path(__file__).with_name("baselines") / "suite.json"
+SIGN_IN_REQUESTS = 50
+DASHBOARD_PATHS = ("/me/profile", "/me/alerts", "/disputes?limit=20", "/litigation-cases?limit=20")
+
+
+@dataclass
+class Result:
+    requests: int
+    seconds: float
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+@dataclass
+class Scenario:
+    name: str
+    app: str
+    call: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+    requests: Optional[int] = None
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def drive(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> Result:
+    latencies: List[float] = []
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        for i in counter:
+            start = time.perf_counter()
+            response = await scenario.call(client, i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{scenario.name}: HTTP {response.status_code} {response.text[:200]}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    ordered = sorted(latencies)
+    return Result(
+        requests=requests,
+        seconds=seconds,
+        throughput=requests / seconds,
+        p50_ms=statistics.median(ordered) * 1e3,
+        p95_ms=percentile(ordered, 0.95) * 1e3,
+        p99_ms=percentile(ordered, 0.99) * 1e3,
+    )
+
+
+class Fixture:
+    """Seeded data shared by the scenarios."""
+
+    def __init__(self, users: int, disputes: int, cases: int) -> None:
+        from app.database import DB
+        from app.services.auth import issue_session
+        from app.services.passwords import hash_password_sync
+        from app.services.permissions import set_user_permissions
+        from app.config import get_settings
+
+        password = hash_password_sync("pw")
+        now = datetime.utcnow()
+        self.emails: List[str] = []
+        self.user_ids: List[str] = []
+        self.headers: List[Dict[str, str]] = []
+        self.refresh_tokens: List[str] = []
+        self.dispute_ids: List[List[str]] = []
+        granted = ["disputes.create", "disputes.update", "disputes.delete", "litigation.create", "litigation.delete"]
+
+        for i in range(users):
+            email = f"load{i}@example.com"
+            user = DB.create_user(email, f"Load {i}", password)
+            set_user_permissions(user["id"], granted)
+            access, refresh, access_exp, refresh_exp = issue_session(user["id"])
+            DB.create_session(user["id"], access, access_exp, refresh, refresh_exp)
+            self.emails.append(email)
+            self.user_ids.append(user["id"])
+            self.headers.append({"Authorization": f"Bearer {access}"})
+            self.refresh_tokens.append(refresh)
+            rows = DB.insert_many(
+                DB.disputes,
+                (
+                    {"user_id": user["id"], "title": f"Dispute {j}", "status": "open", "amount": float(j), "created_at": now - timedelta(seconds=j), "documents": []}
+                    for j in range(disputes)
+                ),
+            )
+            self.dispute_ids.append([row["id"] for row in rows])
+            DB.insert_many(
+                DB.litigation_cases,
+                (
+                    {"user_id": user["id"], "docket_number": f"{i}-{j}", "case_name": f"Case {j}", "status": "filed", "amount": float(j), "created_at": now - timedelta(seconds=j)}
+                    for j in range(cases)
+                ),
+            )
+
+        admin = DB.create_user(get_settings().default_admin_email, "Admin", password)
+        set_user_permissions(admin["id"], ["admin.manage"])
+        access, refresh, access_exp, refresh_exp = issue_session(admin["id"])
+        DB.create_session(admin["id"], access, access_exp, refresh, refresh_exp)
+        self.admin_headers = {"Authorization": f"Bearer {access}"}
+
+    def user(self, i: int) -> int:
+        return i % len(self.user_ids)
+
+
+def build_scenarios(fixture: Fixture) -> List[Scenario]:
+    async def sign_in(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post("/auth/sign-in", json={"email": fixture.emails[fixture.user(i)], "password": "pw"})
+
+    async def refresh(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        # Refresh rotates the session, so keep the new token pair for the next round.
+        user = fixture.user(i)
+        response = await client.post("/auth/refresh", json={"refresh_token": fixture.refresh_tokens[user]})
+        if response.status_code == 200:
+            tokens = response.json()
+            fixture.refresh_tokens[user] = tokens["refresh_token"]
+            fixture.headers[user] = {"Authorization": f"Bearer {tokens['access_token']}"}
+        return response
+
+    async def list_disputes(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get("/disputes", headers=fixture.headers[fixture.user(i)])
+
+    async def create_dispute(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post("/disputes", json={"title": f"Load {i}", "amount": 10.0}, headers=fixture.headers[fixture.user(i)])
+
+    async def update_dispute(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        user = fixture.user(i)
+        ids = fixture.dispute_ids[user]
+        status = ("open", "pending", "closed")[i % 3]
+        return await client.put(f"/disputes/{ids[i % len(ids)]}", json={"status": status}, headers=fixture.headers[user])
+
+    async def bulk_litigation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        cases = [{"docket_number": f"bulk-{i}-{j}", "case_name": "Bulk", "amount": 1.0} for j in range(50)]
+        return await client.post("/litigation-cases/bulk", json={"cases": cases}, headers=fixture.headers[fixture.user(i)])
+
+    async def upload_document(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        user = fixture.user(i)
+        ids = fixture.dispute_ids[user]
+        files = {"files": (f"evidence-{i}.txt", os.urandom(16 * 1024), "text/plain")}
+        return await client.post(f"/disputes/{ids[i % len(ids)]}/documents", files=files, headers=fixture.headers[user])
+
+    async def dashboard_fanout(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        # The frontend's dashboard load as four separate requests; the slowest status is reported.
+        headers = fixture.headers[fixture.user(i)]
+        responses = await asyncio.gather(*(client.get(path, headers=headers) for path in DASHBOARD_PATHS))
+        return max(responses, key=lambda response: response.status_code)
+
+    async def dashboard_batch(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        requests = [{"path": path} for path in DASHBOARD_PATHS]
+        response = await client.post("/batch", json={"requests": requests}, headers=fixture.headers[fixture.user(i)])
+        failed = [item["status"] for item in response.json()["responses"] if item["status"] >= 400] if response.status_code == 200 else []
+        return httpx.Response(failed[0], request=response.request) if failed else response
+
+    async def admin_users(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get("/admin/users", headers=fixture.admin_headers)
+
+    async def list_courses(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get("/courses")
+
+    async def create_course(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post("/courses", json={"title": f"Course {i} {time.time_ns()}", "description": "Load test"})
+
+    return [
+        Scenario("sign_in", "main", sign_in, requests=SIGN_IN_REQUESTS),
+        Scenario("refresh", "main", refresh),
+        Scenario("list_disputes", "main", list_disputes),
+        Scenario("create_dispute", "main", create_dispute),
+        Scenario("update_dispute", "main", update_dispute),
+        Scenario("bulk_litigation", "main", bulk_litigation),
+        Scenario("upload_document", "main", upload_document),
+        Scenario("dashboard_fanout", "main", dashboard_fanout),
+        Scenario("dashboard_batch", "main", dashboard_batch),
+        Scenario("admin_users", "main", admin_users),
+        Scenario("create_course", "courses", create_course),
+        Scenario("list_courses", "courses", list_courses),
+    ]
+
+
+def compare(results: Dict[str, Result], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    regressions = []
+    print(f"\n{'scenario':<18} {'p95 vs base':>12} {'req/s vs base':>14}")
+    for name, result in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            print(f"{name:<18} {'(no baseline)':>12}")
+            continue
+        latency_delta = result.p95_ms / base["p95_ms"] - 1
+        throughput_delta = result.throughput / base["throughput"] - 1
+        flag = ""
+        if latency_delta > threshold or throughput_delta < -threshold:
+            regressions.append(name)
+            flag = "  REGRESSED"
+        print(f"{name:<18} {latency_delta:>+11.0%} {throughput_delta:>+13.0%}{flag}")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Result]:
+    from app.main import create_app
+
+    # api/index.py opens ./lms.db on its first request; the caller has chdir'd into a scratch directory.
+    from api.index import app as courses_app
+
+    fixture = Fixture(args.users, args.disputes, args.cases)
+    scenarios = [scenario for scenario in build_scenarios(fixture) if not args.only or scenario.name in args.only]
+    apps = {"main": create_app(), "courses": courses_app}
+    results: Dict[str, Result] = {}
+
+    print(f"{args.users} users x {args.disputes} disputes / {args.cases} cases, concurrency {args.concurrency}")
+    print(f"{'scenario':<18} {'requests':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for scenario in scenarios:
+        transport = httpx.ASGITransport(app=apps[scenario.app])
+        async with httpx.AsyncClient(transport=transport, base_url="http://suite") as client:
+            requests = min(scenario.requests or args.requests, args.requests)
+            await drive(client, scenario, max(1, requests // 10), args.concurrency)
+            runs = [await drive(client, scenario, requests, args.concurrency) for _ in range(args.repeat)]
+        # The run with the median p95 damps one-off scheduler noise without hiding a real slowdown.
+        result = sorted(runs, key=lambda run: run.p95_ms)[len(runs) // 2]
+        results[scenario.name] = result
+        print(
+            f"{scenario.name:<18} {result.requests:>8} {result.throughput:>9.1f} "
+            f"{result.p50_ms:>8.2f} {result.p95_ms:>8.2f} {result.p99_ms:>8.2f}"
+        )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--disputes", type=int, default=200, help="disputes seeded per user")
+    parser.add_argument("--cases", type=int, default=200, help="litigation cases seeded per user")
+    parser.add_argument("--requests", type=int, default=300, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per scenario; the median one is reported")
+    parser.add_argument("--only", nargs="*", help="run only these scenarios")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed fractional regression")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    root = Path.cwd()
+    sys.path.insert(0, str(root))
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ.setdefault("STORAGE_BUCKET", os.path.join(scratch, "uploads"))
+        os.chdir(scratch)
+        try:
+            results = asyncio.run(run(args))
+        finally:
+            os.chdir(root)
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "config": {key: getattr(args, key) for key in ("users", "disputes", "cases", "requests", "concurrency", "repeat")},
+            "scenarios": {name: asdict(result) for name, result in results.items()},
+        }
+        args.baseline.write_text(json.dumps(payload, indent=2) + "\n")
+        print(f"\nbaseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\nno baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    config = {key: getattr(args, key) for key in baseline.get("config", {})}
+    if config != baseline.get("config"):
+        print(f"\nwarning: baseline was recorded with {baseline.get('config')}, this run used {config}")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} scenario(s) regressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nno regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
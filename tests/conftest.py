@@ -0,0 +1,47 @@
+"""Shared fixtures.
+
+Settings are read once per process, so the environment is pointed at a
+scratch bucket before anything under ``app`` is imported. The tests reset
+and inspect the in-memory store directly, so they always run on it,
+without persistence, whatever the shell exports.
+"""
+import os
+import tempfile
+from typing import Dict, Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("STORAGE_BUCKET", tempfile.mkdtemp(prefix="lms-tests-"))
+os.environ["DATABASE_BACKEND"] = "memory"
+os.environ.pop("PERSISTENCE_DIR", None)
+
+
+@pytest.fixture
+def client() -> Iterator[TestClient]:
+    """A client for a fresh app over an emptied in-memory database."""
+    from app.database import DB
+    from app.main import create_app
+    from app.services.principals import PRINCIPALS
+
+    DB.__init__()
+    PRINCIPALS.clear()
+    with TestClient(create_app()) as client:
+        yield client
+
+
+def sign_up(client: TestClient, email: str) -> Dict[str, str]:
+    response = client.post("/auth/sign-up", json={"email": email, "password": "pw", "full_name": email.split("@")[0]})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def admin_headers(client: TestClient) -> Dict[str, str]:
+    # DEFAULT_ADMIN_EMAIL gets every permission on sign-up.
+    return sign_up(client, "admin@example.com")
+
+
+@pytest.fixture
+def user_headers(client: TestClient) -> Dict[str, str]:
+    return sign_up(client, "user@example.com")
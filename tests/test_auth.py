@@ -0,0 +1,17 @@
+from fastapi.testclient import TestClient
+
+
+def test_refresh_rotates_the_token_pair(client: TestClient) -> None:
+    pair = client.post("/auth/sign-up", json={"email": "user@example.com", "password": "pw", "full_name": "User"}).json()
+
+    rotated = client.post("/auth/refresh", json={"refresh_token": pair["refresh_token"]})
+    assert rotated.status_code == 200, rotated.text
+    fresh = rotated.json()
+    assert fresh["refresh_token"] != pair["refresh_token"]
+    assert fresh["expires_in"] > 0
+    assert client.get("/me/profile", headers={"Authorization": f"Bearer {fresh['access_token']}"}).status_code == 200
+
+    # The old pair is revoked by the rotation.
+    assert client.post("/auth/refresh", json={"refresh_token": pair["refresh_token"]}).status_code == 401
+    assert client.get("/me/profile", headers={"Authorization": f"Bearer {pair['access_token']}"}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": fresh["refresh_token"]}).status_code == 200
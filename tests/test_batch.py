@@ -0,0 +1,82 @@
+import asyncio
+from typing import Dict
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.database import DB
+from app.dependencies import PRINCIPAL_SCOPE_KEY, _authenticate, get_current_principal
+from app.services.principals import CachedPrincipal
+
+
+def batch(client: TestClient, headers: Dict[str, str], *requests: Dict) -> list:
+    response = client.post("/batch", json={"requests": list(requests)}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["responses"]
+
+
+def test_sub_responses_keep_order_and_own_status(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    responses = batch(
+        client,
+        admin_headers,
+        {"path": "/me/profile"},
+        {"method": "POST", "path": "/disputes", "body": {"title": "new", "amount": 2}},
+        {"method": "POST", "path": "/disputes", "body": {"title": "no amount"}},
+        {"path": "/nope"},
+        {"method": "DELETE", "path": "/me/profile"},
+    )
+    assert [item["status"] for item in responses] == [200, 200, 422, 404, 405]
+    assert responses[0]["body"]["full_name"] == "admin"
+    assert responses[0]["headers"]["etag"] == '"1"'
+    assert responses[1]["body"]["id"] in DB.disputes
+    assert responses[4]["headers"]["allow"] == "GET"
+
+
+def test_sub_requests_use_the_batch_principal(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    # A header on the item cannot switch identity; conditional headers still apply.
+    [item] = batch(client, admin_headers, {"path": "/me/profile", "headers": {"Authorization": "Bearer junk", "If-None-Match": '"1"'}})
+    assert item["status"] == 304
+    assert item["body"] is None
+
+
+def test_streams_and_nested_batches_are_refused(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    responses = batch(client, admin_headers, {"path": "/events"}, {"method": "POST", "path": "/batch"})
+    assert [item["status"] for item in responses] == [400, 400]
+
+
+def test_batch_limits(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    assert client.post("/batch", json={"requests": [{"path": "/me/profile"}]}).status_code == 401
+    assert client.post("/batch", json={"requests": [{"path": "/me/profile"}] * 21}, headers=admin_headers).status_code == 413
+    assert client.post("/batch", json={"requests": [{"path": "me"}]}, headers=admin_headers).status_code == 422
+
+
+def test_sign_out_inside_a_batch_revokes_later_sub_requests(client: TestClient, user_headers: Dict[str, str]) -> None:
+    # Sub-requests run concurrently, so the order is forced with a second batch on the same token.
+    [signed_out] = batch(client, user_headers, {"method": "POST", "path": "/auth/sign-out-all"})
+    assert signed_out["status"] == 200
+    assert client.post("/batch", json={"requests": [{"path": "/me/profile"}]}, headers=user_headers).status_code == 401
+
+
+def test_inherited_principal_is_rechecked(client: TestClient, user_headers: Dict[str, str]) -> None:
+    token = user_headers["Authorization"].removeprefix("Bearer ")
+    principal, _ = _authenticate(token)
+    user_id = principal.session["user_id"]
+
+    def resolve() -> CachedPrincipal:
+        request = Request({"type": "http", "headers": [], PRINCIPAL_SCOPE_KEY: principal})
+        return asyncio.run(get_current_principal(request, None))
+
+    assert resolve() is principal
+
+    # A permission change bumps the auth version: the session still holds, so it is reloaded.
+    DB.bump_auth_version(user_id)
+    refreshed = resolve()
+    assert refreshed is not principal
+    assert refreshed.version == DB.auth_version(user_id)
+
+    # Once the sessions are revoked the inherited principal is refused.
+    DB.revoke_user_sessions(user_id)
+    with pytest.raises(HTTPException) as raised:
+        resolve()
+    assert raised.value.status_code == 401
@@ -0,0 +1,53 @@
+import asyncio
+import signal
+import time
+
+from app.database import DB
+from app.services.changefeed import ChangeFeed
+
+
+def make_feed() -> ChangeFeed:
+    return ChangeFeed(buffer_events=10, replay_events=10, heartbeat_seconds=60)
+
+
+def test_stop_restores_signal_handlers() -> None:
+    def original(received: int, frame: object) -> None:
+        pass
+
+    previous = signal.signal(signal.SIGTERM, original)
+    try:
+        feed = make_feed()
+
+        async def cycle() -> None:
+            await feed.start()
+            assert signal.getsignal(signal.SIGTERM) is not original
+            await feed.stop()
+
+        # Every restart must leave exactly the handler it found.
+        for _ in range(3):
+            asyncio.run(cycle())
+            assert signal.getsignal(signal.SIGTERM) is original
+        assert DB.on_change is None
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+def test_exit_signal_closes_open_streams() -> None:
+    received = []
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: received.append(signum))
+    try:
+        feed = make_feed()
+
+        async def scenario() -> None:
+            await feed.start()
+            subscriber = feed.subscribe("user", time.time() + 60, 0)
+            signal.raise_signal(signal.SIGTERM)
+            await asyncio.sleep(0)
+            assert subscriber.closed
+            await feed.stop()
+
+        asyncio.run(scenario())
+        # The handler the feed wrapped still ran.
+        assert received == [signal.SIGTERM]
+    finally:
+        signal.signal(signal.SIGTERM, previous)
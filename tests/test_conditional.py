@@ -0,0 +1,79 @@
+from typing import Dict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.database import DB, VersionConflict
+
+
+def create_dispute(client: TestClient, headers: Dict[str, str], title: str = "Chargeback") -> Dict:
+    response = client.post("/disputes", json={"title": title, "amount": 10}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_record_etag_and_if_none_match(client: TestClient, user_headers: Dict[str, str]) -> None:
+    first = client.get("/me/profile", headers=user_headers)
+    tag = first.headers["etag"]
+    assert tag == '"1"'
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    cached = client.get("/me/profile", headers={**user_headers, "If-None-Match": tag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == tag
+    assert client.get("/me/profile", headers={**user_headers, "If-None-Match": f"W/{tag}"}).status_code == 304
+
+    client.put("/me/profile", json={"full_name": "Renamed"}, headers=user_headers)
+    assert client.get("/me/profile", headers={**user_headers, "If-None-Match": tag}).status_code == 200
+
+
+def test_if_match_guards_updates(client: TestClient, user_headers: Dict[str, str]) -> None:
+    tag = client.get("/me/alerts", headers=user_headers).headers["etag"]
+
+    updated = client.put("/me/alerts", json={"sms_alerts": True}, headers={**user_headers, "If-Match": tag})
+    assert updated.status_code == 200
+    new_tag = updated.headers["etag"]
+    assert new_tag != tag
+
+    stale = client.put("/me/alerts", json={"sms_alerts": False}, headers={**user_headers, "If-Match": tag})
+    assert stale.status_code == 412
+    assert stale.headers["etag"] == new_tag
+    assert client.get("/me/alerts", headers=user_headers).json()["sms_alerts"] is True
+
+    # Weak tags never satisfy If-Match; "*" always does.
+    assert client.put("/me/alerts", json={"sms_alerts": False}, headers={**user_headers, "If-Match": f"W/{new_tag}"}).status_code == 412
+    assert client.put("/me/alerts", json={"sms_alerts": False}, headers={**user_headers, "If-Match": "*"}).status_code == 200
+
+
+def test_if_match_guards_deletes(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    dispute = create_dispute(client, admin_headers)
+    client.put(f"/disputes/{dispute['id']}", json={"status": "closed"}, headers=admin_headers)
+
+    stale = client.delete(f"/disputes/{dispute['id']}", headers={**admin_headers, "If-Match": '"1"'})
+    assert stale.status_code == 412
+    assert dispute["id"] in DB.disputes
+    assert client.delete(f"/disputes/{dispute['id']}", headers={**admin_headers, "If-Match": '"2"'}).status_code == 200
+
+
+def test_require_if_match(client: TestClient, user_headers: Dict[str, str], monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "require_if_match", True)
+    assert client.put("/me/alerts", json={"sms_alerts": True}, headers=user_headers).status_code == 428
+
+
+def test_collection_etag_changes_with_the_list(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    create_dispute(client, admin_headers)
+    tag = client.get("/disputes", headers=admin_headers).headers["etag"]
+    assert client.get("/disputes", headers={**admin_headers, "If-None-Match": tag}).status_code == 304
+
+    create_dispute(client, admin_headers, "Second")
+    relisted = client.get("/disputes", headers={**admin_headers, "If-None-Match": tag})
+    assert relisted.status_code == 200
+    assert len(relisted.json()) == 2
+
+
+def test_lost_update_raises_version_conflict(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    dispute = create_dispute(client, admin_headers)
+    DB.update(DB.disputes, dispute["id"], {"status": "closed"})
+    with pytest.raises(VersionConflict):
+        DB.update(DB.disputes, dispute["id"], {"status": "open"}, expected_version=1)
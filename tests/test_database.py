@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import Any, Dict
+
+import pytest
+
+from app.database import InMemoryDB
+
+
+def dispute(db: InMemoryDB, user_id: str, status: str = "open", amount: float = 10.0) -> Dict[str, Any]:
+    return db.insert(
+        db.disputes,
+        {"user_id": user_id, "title": "Chargeback", "status": status, "amount": amount, "created_at": datetime.utcnow(), "documents": []},
+    )
+
+
+def test_email_index_rejects_case_folded_duplicates() -> None:
+    db = InMemoryDB()
+    user = db.create_user("Owner@Example.com", "Owner", "pw")
+    with pytest.raises(ValueError):
+        db.create_user(" owner@EXAMPLE.com", "Copy", "pw")
+    assert len(db.users) == 1
+    assert db.get_user_by_email("OWNER@example.COM")["id"] == user["id"]
+
+
+def test_updates_move_rows_between_index_entries() -> None:
+    db = InMemoryDB()
+    user = db.create_user("old@example.com", "Owner", "pw")
+    db.update(db.users, user["id"], {"email": "new@example.com"})
+    assert db.get_user_by_email("old@example.com") is None
+    assert db.get_user_by_email("NEW@example.com")["id"] == user["id"]
+    # The old address is free again, and an update cannot take one that is in use.
+    taken = db.create_user("old@example.com", "Other", "pw")
+    with pytest.raises(ValueError):
+        db.update(db.users, user["id"], {"email": "OLD@example.com"})
+    assert db.get_user_by_email("new@example.com")["id"] == user["id"]
+    assert db.get_user_by_email("old@example.com")["id"] == taken["id"]
+
+    other = db.create_user("third@example.com", "Third", "pw")
+    row = dispute(db, user["id"])
+    db.update(db.disputes, row["id"], {"user_id": other["id"]})
+    assert db.find_by(db.disputes, "user_id", user["id"]) == []
+    assert [found["id"] for found in db.find_by(db.disputes, "user_id", other["id"])] == [row["id"]]
+
+    db.delete(db.disputes, row["id"])
+    assert db.find_by(db.disputes, "user_id", other["id"]) == []
+
+
+def test_tallies_follow_inserts_updates_and_deletes() -> None:
+    db = InMemoryDB()
+    first = dispute(db, "u1", amount=10)
+    second = dispute(db, "u1", amount=5)
+    dispute(db, "u2", status="closed", amount=1)
+    assert db.status_totals(db.disputes) == {"open": (2, 15.0), "closed": (1, 1.0)}
+    assert db.status_totals(db.disputes, "u1") == {"open": (2, 15.0)}
+
+    db.update(db.disputes, first["id"], {"status": "closed", "amount": 12})
+    assert db.status_totals(db.disputes) == {"open": (1, 5.0), "closed": (2, 13.0)}
+    assert db.status_totals(db.disputes, "u1") == {"open": (1, 5.0), "closed": (1, 12.0)}
+
+    db.delete(db.disputes, second["id"])
+    assert db.status_totals(db.disputes) == {"closed": (2, 13.0)}
+    assert db.status_totals(db.disputes, "u1") == {"closed": (1, 12.0)}
+    assert db.status_totals(db.disputes, "nobody") == {}
+
+
+def test_account_tally_follows_access_toggles() -> None:
+    db = InMemoryDB()
+    users = [db.create_user(f"user{index}@example.com", "User", "pw") for index in range(3)]
+    assert db.account_totals() == {True: 3}
+
+    db.set_user_enabled(users[0]["id"], False)
+    assert db.account_totals() == {True: 2, False: 1}
+    db.set_user_enabled(users[0]["id"], False)
+    assert db.account_totals() == {True: 2, False: 1}
+    db.set_user_enabled(users[0]["id"], True)
+    assert db.account_totals() == {True: 3}
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Dict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+
+
+def _import(client: TestClient, headers: Dict[str, str], body: bytes, content_type: str) -> dict:
+    response = client.post("/litigation-cases/import", content=body, headers={**headers, "content-type": content_type})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _dockets(client: TestClient, headers: Dict[str, str]) -> list:
+    return sorted(case["docket_number"] for case in client.get("/litigation-cases", headers=headers).json())
+
+
+def test_undecodable_ndjson_line_is_a_row_error(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    body = b'{"docket_number":"1","case_name":"a","amount":1}\n\xff\xfe\n{"docket_number":"3","case_name":"c","amount":3}\n'
+    summary = _import(client, admin_headers, body, "application/x-ndjson")
+    assert (summary["received"], summary["inserted"], summary["failed"]) == (3, 2, 1)
+    assert summary["errors"][0]["line"] == 2
+    assert "UTF-8" in summary["errors"][0]["detail"]
+    assert _dockets(client, admin_headers) == ["1", "3"]
+
+
+def test_quoted_multiline_csv_field(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    body = b'docket_number,case_name,amount\n1,"Smith v.\nJones",5\n2,"Caf\xe9",6\n'
+    summary = _import(client, admin_headers, body, "text/csv")
+    assert (summary["inserted"], summary["failed"]) == (1, 1)
+    assert summary["errors"] == [{"line": 4, "detail": "Invalid UTF-8 at byte 6"}]
+    cases = client.get("/litigation-cases", headers=admin_headers).json()
+    assert [case["case_name"] for case in cases] == ["Smith v.\nJones"]
+
+
+def test_over_long_line_is_skipped(client: TestClient, admin_headers: Dict[str, str], monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "ingest_max_line_bytes", 64)
+    long_line = b'{"docket_number":"2","case_name":"' + b"x" * 500 + b'","amount":2}'
+    body = b'{"docket_number":"1","case_name":"a","amount":1}\n' + long_line + b'\n{"docket_number":"3","case_name":"c","amount":3}'
+    summary = _import(client, admin_headers, body, "application/x-ndjson")
+    assert (summary["inserted"], summary["failed"]) == (2, 1)
+    assert summary["errors"] == [{"line": 2, "detail": "Line longer than 64 bytes"}]
+    assert _dockets(client, admin_headers) == ["1", "3"]
+
+
+def test_over_long_line_is_dropped_while_streaming() -> None:
+    from app.services.ingest import iter_lines
+
+    async def chunks():
+        yield b"ok\n" + b"x" * 40
+        for _ in range(10):
+            yield b"x" * 40
+        yield b"\nnext"
+
+    async def collect():
+        return [line async for line in iter_lines(chunks(), 64)]
+
+    assert asyncio.run(collect()) == [(1, "ok", None), (2, "", "Line longer than 64 bytes"), (3, "next", None)]
+
+
+def test_unterminated_quote_is_bounded(client: TestClient, admin_headers: Dict[str, str], monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "ingest_max_line_bytes", 64)
+    body = b'docket_number,case_name,amount\n1,a,1\n2,"open\n' + b"filler line\n" * 20
+    summary = _import(client, admin_headers, body, "text/csv")
+    assert summary["inserted"] == 1
+    assert summary["errors"][0] == {"line": 3, "detail": "Quoted field longer than 64 bytes"}
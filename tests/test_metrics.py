@@ -0,0 +1,20 @@
+from typing import Dict
+
+from fastapi.testclient import TestClient
+
+
+def test_metrics_requires_admin(client: TestClient, admin_headers: Dict[str, str], user_headers: Dict[str, str]) -> None:
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=user_headers).status_code == 403
+    response = client.get("/metrics", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+
+def test_unknown_methods_share_one_label(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    for method in ("BREW", "PROPFIND", "X-ANYTHING"):
+        client.request(method, "/health")
+    body = client.get("/metrics", headers=admin_headers).text
+    assert 'method="OTHER",route="/health"' in body
+    for method in ("BREW", "PROPFIND", "X-ANYTHING"):
+        assert f'method="{method}"' not in body
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.services.notifications import DISPATCHER, FakeTransport
+from tests.conftest import sign_up
+
+
+@pytest.fixture
+def transport(monkeypatch: pytest.MonkeyPatch) -> FakeTransport:
+    fake = FakeTransport()
+    monkeypatch.setattr(DISPATCHER, "transport", fake)
+    monkeypatch.setattr(DISPATCHER, "stats", dict.fromkeys(DISPATCHER.stats, 0))
+    # Nothing is flushed on a timer during a test; digests go out when the lifespan drains them.
+    monkeypatch.setattr(get_settings(), "notification_coalesce_seconds", 60.0)
+    monkeypatch.setattr(get_settings(), "notification_retry_base_seconds", 0.05)
+    return fake
+
+
+def fresh_client() -> TestClient:
+    """A client for a fresh app; leaving its ``with`` block runs the lifespan shutdown."""
+    from app.database import DB
+    from app.main import create_app
+    from app.services.principals import PRINCIPALS
+
+    DB.__init__()
+    PRINCIPALS.clear()
+    return TestClient(create_app())
+
+
+def test_duplicates_coalesce_into_one_digest_drained_at_exit(transport: FakeTransport) -> None:
+    with fresh_client() as client:
+        headers = sign_up(client, "admin@example.com")
+        for title in ("first", "second", "third"):
+            assert client.post("/disputes", json={"title": title, "amount": 1}, headers=headers).status_code == 200
+        # Nothing is sent while the coalescing window is open.
+        assert transport.deliveries == []
+
+    assert [channel for channel, _ in transport.deliveries] == ["email"]
+    digest = transport.deliveries[0][1]
+    assert digest.subject == "3 new updates"
+    assert [message.split(":")[0] for message in digest.messages] == ["Dispute created"] * 3
+    assert DISPATCHER.stats["enqueued"] == 3
+    assert DISPATCHER.stats["delivered"] == 1
+    assert not DISPATCHER.running
+
+
+def test_failed_delivery_is_retried_with_backoff(transport: FakeTransport) -> None:
+    transport.fail_times = 2
+    with fresh_client() as client:
+        headers = sign_up(client, "admin@example.com")
+        client.post("/disputes", json={"title": "flaky", "amount": 1}, headers=headers)
+        started = time.monotonic()
+
+    assert transport.attempts == 3
+    assert len(transport.deliveries) == 1
+    assert (DISPATCHER.stats["retried"], DISPATCHER.stats["delivered"], DISPATCHER.stats["failed"]) == (2, 1, 0)
+    # Waits 0.05s, then 0.1s, before the third attempt.
+    assert time.monotonic() - started >= 0.15
+
+
+def test_delivery_gives_up_after_max_attempts(transport: FakeTransport, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "notification_max_attempts", 3)
+    transport.fail_times = 10
+    with fresh_client() as client:
+        headers = sign_up(client, "admin@example.com")
+        client.post("/disputes", json={"title": "down", "amount": 1}, headers=headers)
+
+    assert transport.attempts == 3
+    assert transport.deliveries == []
+    assert (DISPATCHER.stats["retried"], DISPATCHER.stats["failed"]) == (2, 1)
@@ -0,0 +1,18 @@
+from collections import Counter
+
+from fastapi.testclient import TestClient
+
+
+def test_openapi_schema_builds(client: TestClient) -> None:
+    schema = client.app.openapi()
+    assert "/events" in schema["paths"]
+    assert set(schema["paths"]["/storage/{user_id}/{filename}"]) == {"get", "head"}
+    assert client.get("/openapi.json").status_code == 200
+    assert client.get("/docs").status_code == 200
+
+
+def test_operation_ids_are_unique(client: TestClient) -> None:
+    operation_ids = Counter(
+        operation["operationId"] for path in client.app.openapi()["paths"].values() for operation in path.values()
+    )
+    assert [name for name, count in operation_ids.items() if count > 1] == []
@@ -0,0 +1,52 @@
+import json
+from datetime import datetime
+from typing import Dict
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip() -> None:
+    row = {"id": "abc/+=", "created_at": datetime(2024, 5, 1, 12, 30, 0, 123456)}
+    cursor = encode_cursor(row)
+    assert "=" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor) == (row["created_at"], "abc/+=")
+    assert decode_cursor(encode_cursor({"user_id": "u1", "created_at": None}, key="user_id")) == (datetime.min, "u1")
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "!!!", "WyJub3QgYSBkYXRlIiwgMV0", "bnVsbA"])
+def test_garbage_cursors_are_rejected(cursor: str) -> None:
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor)
+    assert raised.value.status_code == 400
+
+
+def test_pages_follow_the_link_header(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    created = [client.post("/disputes", json={"title": str(index), "amount": 1}, headers=admin_headers).json()["id"] for index in range(5)]
+
+    seen = []
+    url = "/disputes?limit=2"
+    while url:
+        response = client.get(url, headers=admin_headers)
+        assert response.status_code == 200
+        seen += [row["id"] for row in response.json()]
+        link = response.headers.get("link")
+        if link is None:
+            assert "x-next-cursor" not in response.headers
+            break
+        assert link.endswith('>; rel="next"')
+        assert f"cursor={response.headers['x-next-cursor']}" in link
+        url = link[1 : link.index(">")]
+    assert seen == created
+
+    streamed = client.get("/disputes", params={"format": "ndjson"}, headers=admin_headers)
+    assert [json.loads(line)["id"] for line in streamed.text.splitlines()] == created
+
+
+def test_garbage_cursor_is_a_bad_request(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    response = client.get("/disputes", params={"cursor": "not-a-cursor"}, headers=admin_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
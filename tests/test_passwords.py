@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from app.services import passwords
+
+
+def test_hash_round_trip_across_event_loops() -> None:
+    # Each asyncio.run() is a new loop, as with a restarted server or a new test client.
+    stored = asyncio.run(passwords.hash_password("secret"))
+    for _ in range(2):
+        assert asyncio.run(passwords.verify_password(stored, "secret")) == (True, False)
+    assert asyncio.run(passwords.verify_password(stored, "wrong")) == (False, False)
+
+
+def test_contended_hashing_on_a_second_loop() -> None:
+    async def burst() -> None:
+        await asyncio.gather(*(passwords.hash_password(str(index)) for index in range(4)))
+
+    # The semaphore only binds to a loop once a caller has to wait, so contend on both.
+    asyncio.run(burst())
+    asyncio.run(burst())
+
+
+def test_busy_when_queue_is_full(monkeypatch) -> None:
+    monkeypatch.setattr(passwords._settings, "password_hash_max_pending", 0)
+
+    async def attempt() -> None:
+        await passwords.hash_password("secret")
+
+    with pytest.raises(passwords.PasswordHasherBusy):
+        asyncio.run(attempt())
@@ -0,0 +1,50 @@
+import threading
+from typing import Dict
+
+from fastapi.testclient import TestClient
+
+from app.services.permissions import PermissionRegistry
+
+
+def test_grant_and_revoke_take_effect(client: TestClient, admin_headers: Dict[str, str], user_headers: Dict[str, str]) -> None:
+    user_id = client.get("/me/profile", headers=user_headers).json()["user_id"]
+    dispute = {"title": "Chargeback", "amount": 10}
+
+    denied = client.post("/disputes", json=dispute, headers=user_headers)
+    assert denied.status_code == 403
+    assert denied.json()["detail"] == "Missing permissions: disputes.create"
+    assert client.get("/admin/stats", headers=user_headers).status_code == 403
+
+    grant = {"user_id": user_id, "permissions": ["disputes.create", "admin.manage"]}
+    assert client.post("/admin/permissions", json=grant, headers=admin_headers).status_code == 200
+    assert client.post("/disputes", json=dispute, headers=user_headers).status_code == 200
+    assert client.get("/admin/stats", headers=user_headers).status_code == 200
+
+    revoke = {"user_id": user_id, "permissions": ["admin.manage"]}
+    assert client.post("/admin/permissions", json=revoke, headers=admin_headers).status_code == 200
+    assert client.post("/disputes", json=dispute, headers=user_headers).status_code == 403
+    assert client.get("/admin/stats", headers=user_headers).status_code == 200
+
+
+def test_bits_are_unique_across_threads() -> None:
+    registry = PermissionRegistry(max_entries=10)
+    barrier = threading.Barrier(8)
+    bits = []
+
+    def intern(offset: int) -> None:
+        barrier.wait()
+        bits.extend(registry.bit(f"perm.{offset}.{index}") for index in range(200))
+
+    threads = [threading.Thread(target=intern, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(bits)) == len(bits) == 1600
+
+
+def test_mask_cache_is_bounded(client: TestClient) -> None:
+    registry = PermissionRegistry(max_entries=2)
+    for index in range(5):
+        registry.assign(f"user-{index}", ["disputes.create"])
+    assert list(registry._masks) == ["user-3", "user-4"]
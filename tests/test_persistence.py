@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+from app.database import InMemoryDB
+from app.persistence import wal_generations, wal_path
+
+
+def open_db(directory: Path, snapshot_bytes: int = 1 << 40) -> InMemoryDB:
+    db = InMemoryDB()
+    db.enable_persistence(directory, fsync_interval=60, snapshot_bytes=snapshot_bytes)
+    return db
+
+
+def crash(db: InMemoryDB) -> None:
+    """Stop journaling like a killed process whose last group commit made it to disk."""
+    db.journal.wait_for_snapshot()
+    db.journal.close()
+    db.journal = None
+
+
+def rows(table: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {key: dict(row) for key, row in table.items()}
+
+
+def seed(db: InMemoryDB) -> str:
+    user = db.create_user("owner@example.com", "Owner", "pw")
+    for index in range(3):
+        db.insert(db.disputes, {"user_id": user["id"], "title": f"d{index}", "status": "open", "amount": 1.0, "created_at": datetime.utcnow(), "documents": []})
+    first, second, _ = db.disputes
+    db.update(db.disputes, first, {"status": "closed"})
+    db.delete(db.disputes, second)
+    db.set_permissions(user["id"], ["disputes.create"])
+    return user["id"]
+
+
+def test_wal_replay_restores_every_write(tmp_path: Path) -> None:
+    db = open_db(tmp_path)
+    user_id = seed(db)
+    crash(db)
+
+    recovered = open_db(tmp_path)
+    assert rows(recovered.disputes) == rows(db.disputes)
+    assert recovered.get_user_by_email("owner@example.com")["id"] == user_id
+    assert recovered.permissions[user_id] == ["disputes.create"]
+    assert recovered.status_totals(recovered.disputes) == db.status_totals(db.disputes)
+    crash(recovered)
+
+
+def test_snapshot_plus_wal_tail(tmp_path: Path) -> None:
+    db = open_db(tmp_path)
+    user_id = seed(db)
+    db.snapshot()
+    db.journal.wait_for_snapshot()
+    generation = db.journal.generation
+    assert wal_generations(tmp_path) == [generation]
+
+    db.insert(db.disputes, {"user_id": user_id, "title": "after", "status": "open", "amount": 2.0, "created_at": datetime.utcnow(), "documents": []})
+    crash(db)
+
+    recovered = open_db(tmp_path)
+    assert rows(recovered.disputes) == rows(db.disputes)
+    assert [row["title"] for row in recovered.disputes.values()][-1] == "after"
+    crash(recovered)
+
+
+def test_snapshot_runs_when_wal_grows(tmp_path: Path) -> None:
+    db = open_db(tmp_path, snapshot_bytes=1)
+    seed(db)
+    db.journal.wait_for_snapshot()
+    assert (tmp_path / "snapshot.bin").exists()
+    crash(db)
+
+    recovered = open_db(tmp_path)
+    assert rows(recovered.disputes) == rows(db.disputes)
+    crash(recovered)
+
+
+def test_torn_wal_tail_is_truncated(tmp_path: Path) -> None:
+    db = open_db(tmp_path)
+    seed(db)
+    generation = db.journal.generation
+    crash(db)
+    path = wal_path(tmp_path, generation)
+    intact = path.stat().st_size
+    with open(path, "ab") as handle:
+        handle.write(b"\x10\x00\x00\x00garbage")
+
+    recovered = open_db(tmp_path)
+    assert rows(recovered.disputes) == rows(db.disputes)
+    assert path.stat().st_size == intact
+    crash(recovered)
+
+
+def test_wait_synced_resolves_after_fsync(tmp_path: Path) -> None:
+    db = open_db(tmp_path)
+
+    async def scenario() -> None:
+        db.create_user("owner@example.com", "Owner", "pw")
+        waiter = asyncio.create_task(db.journal.wait_synced(db.journal.appended))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        db.journal.flush()
+        await asyncio.wait_for(waiter, timeout=1)
+        await db.journal.wait_synced(db.journal.appended)
+
+    asyncio.run(scenario())
+    crash(db)
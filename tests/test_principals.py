@@ -0,0 +1,48 @@
+from typing import Dict
+
+from fastapi.testclient import TestClient
+
+from app.services.principals import PRINCIPALS, CachedPrincipal, PrincipalCache
+
+
+def principal(user_id: str, version: int = 0, expires_at: float = 2e9) -> CachedPrincipal:
+    return CachedPrincipal({"user_id": user_id}, {"id": user_id}, expires_at, version)
+
+
+def test_entries_are_dropped_when_the_auth_version_moves() -> None:
+    cache = PrincipalCache(max_entries=10)
+    versions = {"u1": 0}
+    cache.put("token", principal("u1"))
+    assert cache.get("token", versions.__getitem__) is not None
+
+    versions["u1"] += 1
+    assert cache.get("token", versions.__getitem__) is None
+    assert (len(cache), cache.stale) == (0, 1)
+
+
+def test_expired_and_evicted_entries_are_not_served() -> None:
+    cache = PrincipalCache(max_entries=2)
+    cache.put("expired", principal("u1", expires_at=100.0))
+    assert cache.get("expired", lambda user_id: 0, now=100.0) is None
+
+    for token in ("a", "b", "c"):
+        cache.put(token, principal(token))
+    assert cache.get("a", lambda user_id: 0) is None
+    assert cache.evictions == 1
+
+
+def test_permission_change_and_sign_out_invalidate_cached_principals(
+    client: TestClient, admin_headers: Dict[str, str], user_headers: Dict[str, str]
+) -> None:
+    user_id = client.get("/me/profile", headers=user_headers).json()["user_id"]
+    client.get("/me/profile", headers=user_headers)
+    hits, stale = PRINCIPALS.hits, PRINCIPALS.stale
+
+    client.post("/admin/permissions", json={"user_id": user_id, "permissions": ["disputes.create"]}, headers=admin_headers)
+    assert client.post("/disputes", json={"title": "Chargeback", "amount": 1}, headers=user_headers).status_code == 200
+    assert PRINCIPALS.stale == stale + 1
+    assert client.get("/me/profile", headers=user_headers).status_code == 200
+    assert PRINCIPALS.hits > hits
+
+    assert client.post("/auth/sign-out", headers=user_headers).status_code == 200
+    assert client.get("/me/profile", headers=user_headers).status_code == 401
@@ -0,0 +1,48 @@
+import pickle
+from datetime import datetime
+
+import pytest
+
+from app.database import InMemoryDB
+from app.records import DisputeRecord
+from app.schemas import Dispute
+
+
+def make_dispute(**values: object) -> DisputeRecord:
+    return DisputeRecord.from_mapping({"id": "d1", "user_id": "u1", "title": "Chargeback", "amount": 10.0, "created_at": datetime(2024, 1, 1), **values})
+
+
+def test_records_behave_like_dict_rows() -> None:
+    row = make_dispute()
+    assert not hasattr(row, "__dict__")
+    assert dict(row) == row.to_dict()
+    assert row["status"] == "open" and row.get("missing", "fallback") == "fallback"
+    assert Dispute(**row) == row.to_model()
+
+    row.update({"status": "closed"}, amount=12.5)
+    assert (row["status"], row["amount"]) == ("closed", 12.5)
+    with pytest.raises(KeyError):
+        row["unknown"] = 1
+    with pytest.raises(KeyError):
+        row["unknown"]
+
+
+def test_status_values_are_interned() -> None:
+    first = make_dispute(status="".join(["pend", "ing"]))
+    second = make_dispute(id="d2")
+    second["status"] = "".join(["pend", "ing"])
+    assert first["status"] is second["status"]
+
+
+def test_records_pickle_by_value() -> None:
+    row = make_dispute(documents=[{"filename": "a.pdf"}])
+    restored = pickle.loads(pickle.dumps(row))
+    assert type(restored) is DisputeRecord
+    assert restored.to_dict() == row.to_dict()
+
+
+def test_tables_store_records() -> None:
+    db = InMemoryDB()
+    stored = db.insert(db.disputes, {"user_id": "u1", "title": "Chargeback", "amount": 1.0, "created_at": datetime.utcnow()})
+    assert isinstance(db.disputes[stored["id"]], DisputeRecord)
+    assert db.disputes[stored["id"]]["documents"] == []
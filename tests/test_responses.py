@@ -0,0 +1,48 @@
+import json
+from datetime import datetime
+from typing import Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from app.database import DB
+from app.records import DisputeRecord, UserRecord
+from app.responses import dumps, row_encoder
+from app.schemas import Dispute, UserBase
+
+
+def as_json(value: object) -> object:
+    return json.loads(dumps(value))
+
+
+def test_row_encoder_matches_the_pydantic_response() -> None:
+    row = DisputeRecord.from_mapping(
+        {
+            "id": "d1",
+            "user_id": "u1",
+            "title": "Chargeback",
+            "amount": 10.0,
+            "status": "pending",
+            "created_at": datetime(2024, 1, 1, 9, 30, 15, 250000),
+            "documents": [{"filename": "a.pdf", "url": "/storage/u1/a.pdf", "size_bytes": 3, "sha256": None, "storage_key": None}],
+        }
+    )
+    expected = jsonable_encoder(Dispute(**row))
+    assert as_json(row_encoder(Dispute)(row)) == expected
+    # Dict rows (the SQL backend's) fall back to the schema's defaults for missing fields.
+    assert as_json(row_encoder(Dispute)({key: row[key] for key in row if key != "version"})) == expected
+
+
+def test_row_encoder_drops_fields_the_schema_hides() -> None:
+    user = UserRecord.from_mapping(
+        {"id": "u1", "email": "a@example.com", "full_name": "A", "password": "hash", "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 1)}
+    )
+    encoded = row_encoder(UserBase)(user)
+    assert "password" not in encoded
+    assert as_json(encoded) == jsonable_encoder(UserBase(**user))
+
+
+def test_list_endpoint_matches_the_response_model(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    created = client.post("/disputes", json={"title": "Chargeback", "amount": 10}, headers=admin_headers).json()
+    listed = client.get("/disputes", headers=admin_headers).json()
+    assert listed == [created] == [jsonable_encoder(Dispute(**DB.disputes[created["id"]]))]
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from app.database import SessionStore
+
+NOW = datetime(2030, 1, 1)
+
+
+def session(user_id: str, name: str, access_minutes: int = 60, refresh_minutes: int = 600) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "access_token": f"{name}-access",
+        "refresh_token": f"{name}-refresh",
+        "expires_at": NOW + timedelta(minutes=access_minutes),
+        "refresh_expires_at": NOW + timedelta(minutes=refresh_minutes),
+    }
+
+
+def test_revoke_drops_both_tokens() -> None:
+    store = SessionStore()
+    store.add(session("u", "a"), now=NOW)
+    store.add(session("u", "b"), now=NOW)
+
+    assert store.revoke("a-refresh")["access_token"] == "a-access"
+    assert "a-access" not in store and "a-refresh" not in store
+    assert [s["access_token"] for s in store.user_sessions("u")] == ["b-access"]
+    assert store.revoke("a-access") is None
+
+
+def test_revoke_user_leaves_other_users() -> None:
+    store = SessionStore()
+    store.add(session("u", "a"), now=NOW)
+    store.add(session("u", "b"), now=NOW)
+    store.add(session("v", "c"), now=NOW)
+
+    assert store.revoke_user("u") == 2
+    assert store.user_sessions("u") == []
+    assert len(store) == 2 and "c-access" in store
+    assert store.revoke_user("u") == 0
+
+
+def test_sweep_expires_access_then_refresh() -> None:
+    store = SessionStore()
+    store.add(session("u", "a", access_minutes=5, refresh_minutes=50), now=NOW)
+
+    assert store.sweep(NOW + timedelta(minutes=10)) == 1
+    assert "a-access" not in store and "a-refresh" in store
+    # The session stays indexed while its refresh token lives, so revoke_user still reaches it.
+    assert len(store.user_sessions("u")) == 1
+
+    assert store.sweep(NOW + timedelta(minutes=60)) == 1
+    assert len(store) == 0 and store.user_sessions("u") == []
+
+
+def test_revoked_tokens_do_not_resurface_and_heap_is_compacted() -> None:
+    store = SessionStore()
+    count = SessionStore.COMPACT_SLACK + 10
+    for index in range(count):
+        store.add(session("u", str(index)), now=NOW)
+    for index in range(count):
+        store.revoke(f"{index}-access")
+
+    assert len(store) == 0
+    assert len(store._expiry) <= SessionStore.COMPACT_SLACK
+    assert store.sweep(NOW + timedelta(days=1)) == 0
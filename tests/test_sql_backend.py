@@ -0,0 +1,112 @@
+"""The same API over the SQL backend, on a scratch SQLite file."""
+from pathlib import Path
+from typing import Dict, Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings, get_settings
+from app.database import DB, InMemoryDB, VersionConflict
+from app.sql_database import SQLDatabase, create_sql_engine
+from tests.conftest import sign_up
+
+
+def _sqlite_settings(path: Path) -> Settings:
+    return get_settings().copy(update={"database_backend": "sql", "database_url": f"sqlite:///{path}"})
+
+
+@pytest.fixture
+def sql_client(tmp_path: Path) -> Iterator[TestClient]:
+    from app.main import create_app
+    from app.services.principals import PRINCIPALS
+
+    # Routes hold the module-level DB, so it is turned into a SQL store in place.
+    DB.__class__ = SQLDatabase
+    DB.__init__(create_sql_engine(_sqlite_settings(tmp_path / "app.db")))
+    PRINCIPALS.clear()
+    try:
+        with TestClient(create_app()) as client:
+            yield client
+    finally:
+        DB.__class__ = InMemoryDB
+        DB.__init__()
+        PRINCIPALS.clear()
+
+
+@pytest.fixture
+def admin(sql_client: TestClient) -> Dict[str, str]:
+    return sign_up(sql_client, "admin@example.com")
+
+
+def test_email_is_unique_regardless_of_case(sql_client: TestClient, admin: Dict[str, str]) -> None:
+    response = sql_client.post("/auth/sign-up", json={"email": "Admin@Example.COM", "password": "pw", "full_name": "Dup"})
+    assert response.status_code == 400
+    signed_in = sql_client.post("/auth/sign-in", json={"email": "ADMIN@example.com", "password": "pw"})
+    assert signed_in.status_code == 200
+
+
+def test_if_match_and_version_conflict(sql_client: TestClient, admin: Dict[str, str]) -> None:
+    dispute = sql_client.post("/disputes", json={"title": "Chargeback", "amount": 10}, headers=admin).json()
+
+    updated = sql_client.put(f"/disputes/{dispute['id']}", json={"status": "closed"}, headers={**admin, "If-Match": '"1"'})
+    assert updated.status_code == 200
+    stale = sql_client.put(f"/disputes/{dispute['id']}", json={"status": "open"}, headers={**admin, "If-Match": '"1"'})
+    assert stale.status_code == 412
+    assert sql_client.delete(f"/disputes/{dispute['id']}", headers={**admin, "If-Match": '"1"'}).status_code == 412
+
+    with pytest.raises(VersionConflict):
+        DB.update(DB.disputes, dispute["id"], {"status": "open"}, expected_version=dispute["version"])
+    assert DB.disputes[dispute["id"]]["status"] == "closed"
+
+
+def test_since_reads_the_change_log(sql_client: TestClient, admin: Dict[str, str]) -> None:
+    kept = sql_client.post("/disputes", json={"title": "kept", "amount": 1}, headers=admin).json()
+    cursor = sql_client.get("/disputes", headers=admin).headers["x-sync-cursor"]
+
+    gone = sql_client.post("/disputes", json={"title": "gone", "amount": 2}, headers=admin).json()
+    sql_client.put(f"/disputes/{kept['id']}", json={"status": "closed"}, headers=admin)
+    sql_client.delete(f"/disputes/{gone['id']}", headers=admin)
+    sql_client.post("/disputes", json={"title": "not mine", "amount": 3}, headers=sign_up(sql_client, "other@example.com"))
+
+    delta = sql_client.get("/disputes", params={"since": cursor}, headers=admin).json()
+    assert [row["id"] for row in delta["changed"]] == [kept["id"]]
+    assert delta["deleted"] == [gone["id"]]
+    again = sql_client.get("/disputes", params={"since": delta["cursor"]}, headers=admin).json()
+    assert again["changed"] == [] and again["deleted"] == []
+
+
+def test_stats_follow_updates_and_deletes(sql_client: TestClient, admin: Dict[str, str]) -> None:
+    first = sql_client.post("/disputes", json={"title": "a", "amount": 10}, headers=admin).json()
+    second = sql_client.post("/disputes", json={"title": "b", "amount": 5}, headers=admin).json()
+    sql_client.put(f"/disputes/{first['id']}", json={"status": "closed", "amount": 12}, headers=admin)
+    sql_client.delete(f"/disputes/{second['id']}", headers=admin)
+
+    disputes = sql_client.get("/admin/stats", headers=admin).json()["disputes"]
+    assert (disputes["count"], disputes["amount"]) == (1, 12)
+    assert disputes["by_status"] == {"closed": {"count": 1, "amount": 12}}
+
+
+def test_auth_changes_reach_other_processes(sql_client: TestClient, admin: Dict[str, str], tmp_path: Path) -> None:
+    user = sign_up(sql_client, "user@example.com")
+    user_id = sql_client.get("/me/profile", headers=user).json()["user_id"]
+    # Caches the user's principal and permission mask in this process.
+    assert sql_client.get("/admin/stats", headers=user).status_code == 403
+
+    # Another worker on the same database file; its bumps reach this one through auth_events.
+    other = SQLDatabase(create_sql_engine(_sqlite_settings(tmp_path / "app.db")))
+    try:
+        before = DB.auth_version(user_id)
+        other.set_permissions(user_id, ["admin.manage"])
+        other.bump_auth_version(user_id)
+        assert DB.auth_version(user_id) != before
+        assert sql_client.get("/admin/stats", headers=user).status_code == 200
+
+        other.set_user_enabled(user_id, False)
+    finally:
+        other.close()
+    assert sql_client.get("/me/profile", headers=user).status_code == 401
+
+
+def test_sign_out_revokes_the_session(sql_client: TestClient, admin: Dict[str, str]) -> None:
+    assert sql_client.post("/auth/sign-out", headers=admin).status_code == 200
+    assert sql_client.get("/me/profile", headers=admin).status_code == 401
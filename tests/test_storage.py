@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import os
+import time
+import tracemalloc
+from pathlib import Path
+from typing import AsyncIterator, Dict, List
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.database import DB
+from app.services.storage import _GC_GRACE_SECONDS, _sweep
+
+BOUNDARY = "upload-boundary"
+
+
+def create_dispute(client: TestClient, headers: Dict[str, str]) -> Dict:
+    response = client.post("/disputes", json={"title": "Chargeback", "amount": 10}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_large_upload_streams_to_disk(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    dispute = create_dispute(client, admin_headers)
+    chunk = bytes(range(256)) * 256
+    chunks = 512  # 32 MiB
+    expected = hashlib.sha256()
+    for _ in range(chunks):
+        expected.update(chunk)
+
+    async def body() -> AsyncIterator[bytes]:
+        yield (
+            f"--{BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="files"; filename="big.bin"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        for _ in range(chunks):
+            yield chunk
+        yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+    async def upload() -> httpx.Response:
+        # The test client buffers request bodies, so the app is driven through httpx's ASGI transport instead.
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as streaming:
+            return await streaming.post(
+                f"/disputes/{dispute['id']}/documents",
+                content=body(),
+                headers={**admin_headers, "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+            )
+
+    tracemalloc.start()
+    try:
+        response = asyncio.run(upload())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert response.status_code == 200, response.text
+    document = response.json()["documents"][0]
+    assert document["size_bytes"] == len(chunk) * chunks
+    assert document["sha256"] == expected.hexdigest()
+    user_id = dispute["user_id"]
+    assert (Path(get_settings().storage_bucket) / user_id / "big.bin").stat().st_size == len(chunk) * chunks
+    assert peak < 8 * 1024 * 1024, f"peak {peak} bytes"
+
+
+def upload(client: TestClient, headers: Dict[str, str], dispute_id: str, filename: str, content: bytes) -> Dict:
+    response = client.post(f"/disputes/{dispute_id}/documents", files={"files": (filename, content)}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["documents"][0]
+
+
+@pytest.fixture
+def bucket(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(get_settings(), "storage_bucket", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def content_mode(bucket: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(get_settings(), "storage_mode", "content")
+    return bucket
+
+
+def blob_files(bucket: Path) -> List[str]:
+    return sorted(path.name for path in (bucket / "blobs").glob("**/*") if path.is_file())
+
+
+def test_content_mode_stores_identical_uploads_once(client: TestClient, admin_headers: Dict[str, str], content_mode: Path) -> None:
+    first = upload(client, admin_headers, create_dispute(client, admin_headers)["id"], "a.pdf", b"same bytes")
+    second = upload(client, admin_headers, create_dispute(client, admin_headers)["id"], "b.pdf", b"same bytes")
+
+    assert first["storage_key"] == second["storage_key"] == hashlib.sha256(b"same bytes").hexdigest()
+    assert DB.blobs[first["storage_key"]]["ref_count"] == 2
+    assert blob_files(content_mode) == [first["storage_key"]]
+    assert client.get(second["url"], headers=admin_headers).content == b"same bytes"
+
+
+def test_deleting_disputes_releases_blobs_for_gc(client: TestClient, admin_headers: Dict[str, str], content_mode: Path) -> None:
+    disputes = [create_dispute(client, admin_headers)["id"] for _ in range(2)]
+    digest = [upload(client, admin_headers, dispute_id, "doc.pdf", b"shared") for dispute_id in disputes][0]["storage_key"]
+
+    client.delete(f"/disputes/{disputes[0]}", headers=admin_headers)
+    assert DB.blobs[digest]["ref_count"] == 1
+    assert client.post("/admin/storage/gc", headers=admin_headers).json() == {"reclaimed": 0, "reclaimed_bytes": 0}
+    assert blob_files(content_mode) == [digest]
+
+    client.delete(f"/disputes/{disputes[1]}", headers=admin_headers)
+    assert DB.blobs[digest]["ref_count"] == 0
+    assert client.post("/admin/storage/gc", headers=admin_headers).json() == {"reclaimed": 1, "reclaimed_bytes": 6}
+    assert digest not in DB.blobs
+    assert blob_files(content_mode) == []
+
+
+def test_sweep_spares_untracked_files_inside_the_grace_window(client: TestClient, content_mode: Path) -> None:
+    directory = content_mode / "blobs" / "ab"
+    directory.mkdir(parents=True)
+    abandoned, in_flight = directory / ".upload-abandoned", directory / ".upload-in-flight"
+    abandoned.write_bytes(b"12345")
+    in_flight.write_bytes(b"123")
+    expired = time.time() - _GC_GRACE_SECONDS - 1
+    os.utime(abandoned, (expired, expired))
+
+    assert _sweep([]) == (1, 5)
+    assert not abandoned.exists()
+    assert in_flight.exists()
+
+
+def test_ranged_and_conditional_downloads(client: TestClient, admin_headers: Dict[str, str], bucket: Path) -> None:
+    content = bytes(range(256)) * 4
+    document = upload(client, admin_headers, create_dispute(client, admin_headers)["id"], "scan.pdf", content)
+    url = document["url"]
+
+    whole = client.get(url, headers=admin_headers)
+    assert whole.status_code == 200
+    assert whole.content == content
+    assert whole.headers["accept-ranges"] == "bytes"
+    etag = whole.headers["etag"]
+
+    partial = client.get(url, headers={**admin_headers, "Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == "bytes 10-19/1024"
+    assert partial.content == content[10:20]
+    assert client.get(url, headers={**admin_headers, "Range": "bytes=-4"}).content == content[-4:]
+
+    unsatisfiable = client.get(url, headers={**admin_headers, "Range": "bytes=5000-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == "bytes */1024"
+
+    cached = client.get(url, headers={**admin_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    # A stale If-Range validator gets the whole file instead of the range.
+    assert client.get(url, headers={**admin_headers, "Range": "bytes=0-0", "If-Range": '"stale"'}).status_code == 200
+
+    head = client.head(url, headers=admin_headers)
+    assert head.status_code == 200
+    assert head.headers["content-length"] == "1024"
+    assert head.headers["etag"] == etag
+    assert head.content == b""
+    ranged_head = client.head(url, headers={**admin_headers, "Range": "bytes=0-99"})
+    assert (ranged_head.status_code, ranged_head.headers["content-length"], ranged_head.content) == (206, "100", b"")
+
+
+def test_download_is_private(client: TestClient, admin_headers: Dict[str, str], user_headers: Dict[str, str], bucket: Path) -> None:
+    document = upload(client, admin_headers, create_dispute(client, admin_headers)["id"], "scan.pdf", b"secret")
+    assert client.get(document["url"], headers=user_headers).status_code == 404
+    assert client.get(document["url"].replace("scan.pdf", "missing.pdf"), headers=admin_headers).status_code == 404
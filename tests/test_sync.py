@@ -0,0 +1,71 @@
+from typing import Dict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import database
+from app.database import ChangeLog, ChangesExpired
+from tests.conftest import sign_up
+
+
+def test_since_returns_changes_and_tombstones(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    kept = client.post("/disputes", json={"title": "kept", "amount": 1}, headers=admin_headers).json()
+    cursor = client.get("/disputes", headers=admin_headers).headers["x-sync-cursor"]
+
+    gone = client.post("/disputes", json={"title": "gone", "amount": 2}, headers=admin_headers).json()
+    client.put(f"/disputes/{kept['id']}", json={"status": "closed"}, headers=admin_headers)
+    client.delete(f"/disputes/{gone['id']}", headers=admin_headers)
+    other = sign_up(client, "other@example.com")
+    client.post("/disputes", json={"title": "not mine", "amount": 3}, headers=other)
+
+    delta = client.get("/disputes", params={"since": cursor}, headers=admin_headers).json()
+    assert [row["id"] for row in delta["changed"]] == [kept["id"]]
+    assert delta["changed"][0]["status"] == "closed"
+    assert delta["deleted"] == [gone["id"]]
+    assert delta["has_more"] is False
+
+    again = client.get("/disputes", params={"since": delta["cursor"]}, headers=admin_headers).json()
+    assert again["changed"] == [] and again["deleted"] == []
+
+
+def test_since_pages_through_changes(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    cursor = client.get("/disputes", headers=admin_headers).headers["x-sync-cursor"]
+    created = [client.post("/disputes", json={"title": str(index), "amount": 1}, headers=admin_headers).json()["id"] for index in range(5)]
+
+    seen = []
+    has_more = True
+    while has_more:
+        delta = client.get("/disputes", params={"since": cursor, "limit": 2}, headers=admin_headers).json()
+        seen += [row["id"] for row in delta["changed"]]
+        cursor, has_more = delta["cursor"], delta["has_more"]
+    assert seen == created
+
+
+def test_since_rejects_bad_and_foreign_cursors(client: TestClient, admin_headers: Dict[str, str]) -> None:
+    assert client.get("/disputes", params={"since": "nonsense"}, headers=admin_headers).status_code == 400
+    # A cursor from before a restart carries another epoch.
+    assert client.get("/litigation-cases", params={"since": "deadbeef.1"}, headers=admin_headers).status_code == 410
+
+
+def test_change_log_compaction_expires_old_cursors(monkeypatch: pytest.MonkeyPatch) -> None:
+    clock = [1_000.0]
+    monkeypatch.setattr(database.time, "time", lambda: clock[0])
+    log = ChangeLog(retention_seconds=600)
+
+    log.add({"id": "a", "user_id": "u"})
+    log.add({"id": "b", "user_id": "u"})
+    log.discard({"id": "b", "user_id": "u"})
+    assert log.since("u", 0, 10) == ([("a", False), ("b", True)], 3, False)
+
+    # The next mark lands after the retention window, so everything up to the first mark is dropped.
+    clock[0] += 601
+    log.add({"id": "c", "user_id": "u"})
+    clock[0] += ChangeLog.MARK_INTERVAL_SECONDS
+    log.add({"id": "d", "user_id": "u"})
+
+    assert log.floor == 1
+    with pytest.raises(ChangesExpired):
+        log.since("u", 0, 10)
+    assert log.since("u", 1, 10) == ([("b", True), ("c", False), ("d", False)], 5, False)
+    assert log.stamp("u") == 5
+    assert log.stamp("nobody") == log.floor